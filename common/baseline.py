@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+from common.findings import SEVERITIES, UNKNOWN
+from common.dedupe import normalize_location
+
+# Baselines keep a fingerprint of every finding of a run, so the findings of a
+# later run can be split into new, fixed and unchanged ones. Line numbers move
+# whenever code is edited, so they aren't part of the fingerprint. Instead, the
+# findings of a rule in the same location are told apart by their order.
+#
+# Neither is the absolute path of directory targets: their finding locations are
+# already relative to the target, and the target is named by its path relative to
+# the working directory of cosca. The same repository checked out in another CI
+# workspace keeps its fingerprints when cosca runs from the workspace, and
+# directories with the same name in different folders are told apart.
+
+VERSION = 2
+
+
+def get_target_name(target):
+    """Name of the target in its fingerprints. Directories inside the working directory
+    are named by their relative path, others by their absolute path."""
+    if os.path.isdir(target):
+        path = os.path.realpath(target)
+        root = os.path.realpath(os.getcwd())
+        if os.path.commonpath([path, root]) == root:
+            return os.path.relpath(path, root)
+        return path
+    return target
+
+
+def fingerprint(target_name, rule_id, location, n):
+    """Fingerprint of the n-th finding (by line) of a rule in a location of the target"""
+    return hashlib.sha256(json.dumps([target_name, rule_id, location, n]).encode("utf-8")).hexdigest()
+
+
+def get_fingerprints(index):
+    """Returns {fingerprint: severity} for the findings of a common.dedupe.FindingIndex"""
+    groups = {}
+    for (target, rule_id, location, line), (severity, _) in index.entries.items():
+        groups.setdefault((target, rule_id, location), []).append((line is not None, line or 0, severity))
+    fingerprints = {}
+    names = {}
+    for (target, rule_id, location), occurrences in groups.items():
+        if target not in names:
+            names[target] = get_target_name(target)
+        occurrences.sort()
+        for n, (_, _, severity) in enumerate(occurrences):
+            fingerprints[fingerprint(names[target], rule_id, location, n)] = severity
+    return fingerprints
+
+
+def iter_fingerprints(target, findings):
+    """Yields (fingerprint, finding) for the findings of a scan of the target"""
+    target_name = get_target_name(target)
+    groups = {}
+    for f in findings:
+        groups.setdefault((f.rule_id, normalize_location(f.location)), []).append(f)
+    for (rule_id, location), group in groups.items():
+        group.sort(key=lambda f: (f.line is not None, f.line or 0))
+        for n, f in enumerate(group):
+            yield fingerprint(target_name, rule_id, location, n), f
+
+
+def load_baseline(path):
+    """Reads a baseline written by write_baseline. path may also be the folder containing baseline.json"""
+    if os.path.isdir(path):
+        path = os.path.join(path, "baseline.json")
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != VERSION:
+        raise ValueError(f"unsupported baseline version {data.get('version')}")
+    return data["fingerprints"]
+
+
+def write_baseline(path, fingerprints):
+    if os.path.isdir(path):
+        path = os.path.join(path, "baseline.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": VERSION, "fingerprints": fingerprints}, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def compare(current, baseline):
+    """Splits the findings into new, fixed and unchanged. Returns their counts by severity."""
+    result = {name: [0] * len(SEVERITIES) for name in ("new", "fixed", "unchanged")}
+    for fingerprint, severity in current.items():
+        result["unchanged" if fingerprint in baseline else "new"][severity] += 1
+    for fingerprint, severity in baseline.items():
+        if fingerprint not in current:
+            result["fixed"][severity] += 1
+    return result
+
+
+def count_at_or_above(counts, severity):
+    """Findings of the given severity or higher. Findings of unknown severity aren't counted."""
+    threshold = SEVERITIES.index(severity)
+    return sum(c for i, c in enumerate(counts) if threshold <= i < UNKNOWN)
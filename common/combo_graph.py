@@ -0,0 +1,65 @@
+from common.findings import SEVERITIES, UNKNOWN
+
+# The scanners of a combo mapping form a dependency graph. An entry is either
+# the name of a scanner or a node:
+#
+#   {"name": "semgrep", "needs": ["trufflehog"], "timeout": 900,
+#    "resources": "large", "fail_fast": "high"}
+#
+# needs: scanners of the same mapping that must pass before this one starts
+# timeout: seconds after which the scan is stopped
+# resources: resource class of combos.json (cpus and memory of the containers)
+# fail_fast: the scanners that need this one are skipped when it finds
+#            findings of this severity or higher
+
+
+class Node:
+    __slots__ = ("name", "needs", "timeout", "resources", "fail_fast")
+
+    def __init__(self, name, needs=(), timeout=None, resources=None, fail_fast=None):
+        self.name = name
+        self.needs = list(needs)
+        self.timeout = timeout
+        self.resources = resources
+        self.fail_fast = fail_fast
+
+    def __repr__(self):
+        return f"Node({self.name!r}, needs={self.needs!r})"
+
+
+def parse_node(entry):
+    if isinstance(entry, str):
+        return Node(entry)
+    try:
+        node = Node(entry["name"], entry.get("needs", []), entry.get("timeout"),
+                    entry.get("resources"), entry.get("fail_fast"))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"invalid scanner entry {entry!r}") from e
+    if node.timeout is not None and (not isinstance(node.timeout, (int, float)) or node.timeout <= 0):
+        raise ValueError(f"the timeout of {node.name} must be a positive number of seconds")
+    if node.fail_fast is not None and node.fail_fast not in SEVERITIES[:UNKNOWN]:
+        raise ValueError(f"the fail_fast of {node.name} must be one of {', '.join(SEVERITIES[:UNKNOWN])}")
+    return node
+
+
+def get_nodes(entries):
+    """Parses the scanners of a mapping. Nodes are returned in their declared order,
+    except that every node comes after the nodes it needs."""
+    nodes = [parse_node(e) for e in entries]
+    by_name = {n.name: n for n in nodes}
+    if len(by_name) != len(nodes):
+        raise ValueError("a scanner appears more than once in the same mapping")
+    for node in nodes:
+        for need in node.needs:
+            if need not in by_name:
+                raise ValueError(f"{node.name} needs {need}, which isn't a scanner of the mapping")
+    ordered = []
+    placed = set()
+    while len(ordered) < len(nodes):
+        node = next((n for n in nodes if n.name not in placed and placed.issuperset(n.needs)), None)
+        if node is None:
+            cycle = [n.name for n in nodes if n.name not in placed]
+            raise ValueError(f"the needs of {', '.join(cycle)} form a cycle")
+        ordered.append(node)
+        placed.add(node.name)
+    return ordered
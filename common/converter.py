@@ -2,11 +2,13 @@ import xml.etree.ElementTree as ET
 from urllib.parse import urlparse, urlunparse
 import hashlib
 import json
+import copy
 
 
 class JUnit2Sarif():
     """
-    Converts JUnit file format to SARIF
+    Converts JUnit file format to SARIF.
+    SARIF and RUN are templates, copied by every conversion.
     """
     SARIF = {
         "$schema": "https://raw.githubusercontent.com/microsoft/sarif-python-om\
@@ -56,13 +58,15 @@ class JUnit2Sarif():
     def convert(self, source_file, destination_file):
         tree = ET.parse(source_file)
         root = tree.getroot()
+        sarif = copy.deepcopy(self.SARIF)
+        run = copy.deepcopy(self.RUN)
         rule_index = 0
         for suite in root.findall('testsuite'):
-            if JUnit2Sarif.RUN['originalUriBaseIds']['target']['uri'] == "PLACEHOLDER":
+            if run['originalUriBaseIds']['target']['uri'] == "PLACEHOLDER":
                 parsed_url = urlparse(suite.attrib['name'])
                 stripped_url = urlunparse(
                     (parsed_url.scheme, parsed_url.netloc, '', '', parsed_url.query, ''))
-                JUnit2Sarif.RUN['originalUriBaseIds']['target']['uri'] = stripped_url + "/"
+                run['originalUriBaseIds']['target']['uri'] = stripped_url + "/"
             if int(suite.attrib['failures']) == 0:
                 continue
             for case in suite.findall('testcase'):
@@ -98,7 +102,7 @@ class JUnit2Sarif():
                     severity_failure)
                 rule['properties']['security-severity'] = self.sarif_security_severity(
                     severity_failure)
-                self.RUN['tool']['driver']['rules'].append(rule)
+                run['tool']['driver']['rules'].append(rule)
                 parsed_url = urlparse(suite.attrib['name'])
                 result = {
                     "ruleId": rule_id,
@@ -121,11 +125,11 @@ class JUnit2Sarif():
                     ],
                     "hostedViewerUri": suite.attrib['name']
                 }
-                self.RUN['results'].append(result)
+                run['results'].append(result)
                 rule_index += 1
-        self.SARIF['runs'].append(self.RUN)
+        sarif['runs'].append(run)
         with open(destination_file, 'w', encoding='utf-8') as f:
-            json.dump(self.SARIF, f, indent=4)
+            json.dump(sarif, f, indent=4)
         return destination_file
 
 
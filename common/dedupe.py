@@ -0,0 +1,66 @@
+from common.findings import SEVERITIES, UNKNOWN
+from common.incremental import to_relpath
+
+# Scanners mount directory targets here, so the paths they report start with it
+CONTAINER_TARGET_DIRECTORY = "/src"
+
+
+def normalize_location(location):
+    """Location of a finding, with the paths reported inside the scanner
+    containers made relative to the target. Packages and URLs are kept as they are."""
+    if not location or "://" in location:
+        return location or ""
+    return to_relpath(location, CONTAINER_TARGET_DIRECTORY)
+
+
+def get_key(target, finding):
+    """Key shared by the findings that are the same issue, whichever scanner reported it:
+    (target, vulnerability id, package@version) for vulnerabilities and
+    (target, rule, file, line) for findings in files"""
+    return (target, finding.rule_id, normalize_location(finding.location), finding.line)
+
+
+def merge_severity(a, b):
+    """Highest of both severities. Unknown only when neither is known."""
+    if a == UNKNOWN:
+        return b
+    if b == UNKNOWN:
+        return a
+    return max(a, b)
+
+
+class FindingIndex:
+    """
+    Hash index of the findings of a run. The same finding reported by several
+    scanners (e.g. a CVE found by grype and trivy) is kept once, with the highest
+    severity given to it. Adding a finding is O(1), so building the index is
+    linear in the number of findings.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.raw_counts = {}
+
+    def add(self, target, findings):
+        for f in findings:
+            key = get_key(target, f)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = [f.severity, {f.scanner}]
+            else:
+                entry[0] = merge_severity(entry[0], f.severity)
+                entry[1].add(f.scanner)
+            counts = self.raw_counts.setdefault(target, [0] * len(SEVERITIES))
+            counts[f.severity] += 1
+
+    def get_summary(self):
+        """Raw and deduplicated findings count of each target, by severity"""
+        unique = {}
+        for (target, *_), (severity, _) in self.entries.items():
+            counts = unique.setdefault(target, [0] * len(SEVERITIES))
+            counts[severity] += 1
+        targets = {t: {"raw": raw, "unique": unique.get(t, [0] * len(SEVERITIES))}
+                   for t, raw in self.raw_counts.items()}
+        raw_total = sum(sum(t["raw"]) for t in targets.values())
+        return {"targets": targets, "raw": raw_total, "unique": len(self.entries),
+                "duplicates": raw_total - len(self.entries)}
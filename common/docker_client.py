@@ -0,0 +1,211 @@
+import atexit
+import logging
+import posixpath
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+import docker
+from docker.context import ContextAPI
+from docker.errors import DockerException, ImageNotFound, NotFound
+from common.logging_setup import setup_logger
+
+# One Docker client (and its HTTP connection pool) is shared by every scanner
+# in the process. Containers started through it are tracked until they are
+# removed, so an interrupted run doesn't leave detached scanners behind.
+
+_client = None
+_client_lock = threading.Lock()
+_containers = {}
+_containers_lock = threading.Lock()
+_pools = {}
+logger = setup_logger("docker", "🐳", level=logging.INFO)
+
+
+def get_client(max_pool_size=None):
+    """Returns the process-wide Docker client, creating it on first use.
+    max_pool_size only has effect on the call that creates the client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            kwargs = {"max_pool_size": max_pool_size} if max_pool_size else {}
+            _client = docker.from_env(**kwargs)
+            atexit.register(remove_containers)
+        return _client
+
+
+class DockerHost:
+    """
+    A Docker endpoint of the host pool. url is None for the daemon configured in
+    the environment (DOCKER_HOST or the local socket). Containers of remote hosts
+    can't bind mount the directories of this machine, so they are copied instead.
+    """
+
+    def __init__(self, url=None, weight=1, tls=None, max_pool_size=None):
+        self.url = url
+        self.weight = weight
+        self.tls = tls
+        self.max_pool_size = max_pool_size
+        self.running = 0
+        self.client = None
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return self.url or "local"
+
+    @property
+    def is_remote(self):
+        return self.url is not None and not self.url.startswith("unix://")
+
+    def get_client(self):
+        if self.url is None:
+            return get_client(self.max_pool_size)
+        with self.lock:
+            if self.client is None:
+                kwargs = {"max_pool_size": self.max_pool_size} if self.max_pool_size else {}
+                self.client = docker.DockerClient(base_url=self.url, tls=self.tls, **kwargs)
+                atexit.register(remove_containers)
+            return self.client
+
+
+class HostPool:
+    """Places each scan on the host with the fewest running scans relative to its weight"""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            host = min(self.hosts, key=lambda h: (h.running / h.weight, -h.weight))
+            host.running += 1
+            return host
+
+    def release(self, host):
+        with self.lock:
+            host.running -= 1
+
+    @contextmanager
+    def use(self):
+        host = self.acquire()
+        try:
+            yield host
+        finally:
+            self.release(host)
+
+
+def parse_host(spec, max_pool_size=None):
+    """Parses URL[=WEIGHT] or CONTEXT[=WEIGHT], e.g. tcp://build2:2376=2 or build2"""
+    url, sep, weight = spec.rpartition("=")
+    if not sep:
+        url, weight = spec, "1"
+    try:
+        weight = float(weight)
+    except ValueError as e:
+        raise ValueError(f"invalid weight in docker host {spec}") from e
+    if weight <= 0:
+        raise ValueError(f"the weight of docker host {spec} must be positive")
+    if "://" in url:
+        return DockerHost(url, weight, max_pool_size=max_pool_size)
+    context = ContextAPI.get_context(url)
+    if context is None:
+        raise ValueError(f"docker context {url} not found")
+    return DockerHost(context.Host, weight, tls=context.TLSConfig or None, max_pool_size=max_pool_size)
+
+
+def get_host_pool(specs=None, max_pool_size=None):
+    """Returns the pool of the given host specs, only the local daemon when there are none.
+    Pools are shared within the process, so the service balances the scans of every job."""
+    key = tuple(specs or ())
+    with _client_lock:
+        if key not in _pools:
+            hosts = [parse_host(s, max_pool_size) for s in key] or [DockerHost(max_pool_size=max_pool_size)]
+            _pools[key] = HostPool(hosts)
+        return _pools[key]
+
+
+def copy_to_container(container, host_path, container_path):
+    """Copies a host directory or file to container_path, as a bind mount would expose it.
+    Directories are writable by any user, as some scanners don't run as root."""
+    def reset_owner(info):
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        if info.isdir():
+            info.mode = 0o777
+        return info
+    with tempfile.TemporaryFile() as f:
+        with tarfile.open(fileobj=f, mode="w") as tar:
+            tar.add(host_path, arcname=container_path.strip("/"), filter=reset_owner)
+        f.seek(0)
+        container.put_archive("/", f)
+
+
+def copy_from_container(container, container_path, host_path):
+    """Copies the content of the container_path directory into the host_path directory"""
+    prefix = posixpath.basename(container_path.rstrip("/")) + "/"
+    stream, _ = container.get_archive(container_path)
+    with tempfile.TemporaryFile() as f:
+        for chunk in stream:
+            f.write(chunk)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            members = []
+            for member in tar.getmembers():
+                name = member.name[len(prefix):]
+                if member.name.startswith(prefix) and ".." not in name.split("/"):
+                    member.name = name
+                    members.append(member)
+            # The data filter (Python 3.10.12+) also rejects links that point outside host_path
+            kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+            tar.extractall(host_path, members=members, **kwargs)
+
+
+def get_image_digest(image, client=None):
+    """Returns the id of the local image, or the registry digest when the image
+    hasn't been pulled yet. None if neither can be resolved."""
+    client = client or get_client()
+    try:
+        return client.images.get(image).id
+    except ImageNotFound:
+        pass
+    except DockerException as e:
+        logger.debug("Couldn't inspect image %s: %s", image, e)
+        return None
+    try:
+        return client.images.get_registry_data(image).id
+    except DockerException as e:
+        logger.debug("Couldn't resolve digest of image %s: %s", image, e)
+        return None
+
+
+def track_container(container):
+    with _containers_lock:
+        _containers[container.id] = container
+
+
+def untrack_container(container):
+    with _containers_lock:
+        _containers.pop(container.id, None)
+
+
+def remove_container(container):
+    """Force-removes a container (killing it if still running) and stops tracking it."""
+    try:
+        container.remove(force=True)
+    except NotFound:
+        pass
+    finally:
+        untrack_container(container)
+
+
+def remove_containers():
+    """Force-removes every container that is still tracked."""
+    with _containers_lock:
+        containers = list(_containers.values())
+    if containers:
+        logger.warning("Removing %d running scanner container(s)...", len(containers))
+    for container in containers:
+        try:
+            remove_container(container)
+        except DockerException as e:
+            logger.error("Couldn't remove container %s: %s", container.short_id, e)
@@ -0,0 +1,183 @@
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Normalized findings of the scanner reports. Each report format has a parser
+# that yields Finding objects one at a time. When ijson is installed, reports
+# are parsed as a stream, so memory doesn't grow with the size of the report.
+
+# Index of each severity in the findings count lists (json_findings)
+SEVERITIES = ["info", "low", "medium", "high", "critical", "unknown"]
+INFO, LOW, MEDIUM, HIGH, CRITICAL, UNKNOWN = range(len(SEVERITIES))
+
+SEVERITY_ALIASES = {
+    "info": INFO, "informational": INFO, "information": INFO, "negligible": INFO,
+    "trace": INFO, "none": INFO,
+    "low": LOW, "note": LOW,
+    "medium": MEDIUM, "moderate": MEDIUM, "warning": MEDIUM,
+    "high": HIGH, "error": HIGH,
+    "critical": CRITICAL,
+}
+
+
+class Finding:
+    """A finding of a scanner. location is a file path, a URL or a package,
+    depending on the scanner. severity is an index of SEVERITIES."""
+
+    __slots__ = ("scanner", "rule_id", "severity", "title", "location", "line")
+
+    def __init__(self, scanner, rule_id, severity, title="", location="", line=None):
+        self.scanner = scanner
+        self.rule_id = rule_id
+        self.severity = severity
+        self.title = title
+        self.location = location
+        self.line = line
+
+    def __repr__(self):
+        return (f"Finding({self.scanner!r}, {self.rule_id!r}, {SEVERITIES[self.severity]}, "
+                f"location={self.location!r}, line={self.line!r})")
+
+
+def normalize_severity(value):
+    if value is None:
+        return UNKNOWN
+    return SEVERITY_ALIASES.get(str(value).strip().lower(), UNKNOWN)
+
+
+def cvss_severity(score):
+    """Severity of a CVSS score, as used by SARIF security-severity"""
+    score = float(score)
+    if score >= 9.0:
+        return CRITICAL
+    if score >= 7.0:
+        return HIGH
+    if score >= 4.0:
+        return MEDIUM
+    if score >= 0.1:
+        return LOW
+    return INFO
+
+
+def iter_items(json_file, prefix):
+    """Yields the items found at prefix, in ijson notation (e.g. "matches.item").
+    Falls back to loading the whole document when ijson isn't installed."""
+    with open(json_file, 'rb') as file:
+        if ijson is not None:
+            yield from ijson.items(file, prefix, use_float=True)
+            return
+        data = json.load(file)
+    nodes = [data]
+    for key in prefix.split("."):
+        if key == "item":
+            nodes = [i for n in nodes if isinstance(n, list) for i in n]
+        else:
+            nodes = [n[key] for n in nodes if isinstance(n, dict) and key in n]
+    yield from nodes
+
+
+def parse_grype(json_file, scanner="grype"):
+    for match in iter_items(json_file, "matches.item"):
+        vulnerability = match["vulnerability"]
+        artifact = match.get("artifact", {})
+        yield Finding(scanner, vulnerability["id"], normalize_severity(vulnerability.get("severity")),
+                      vulnerability.get("description", ""),
+                      f'{artifact.get("name", "")}@{artifact.get("version", "")}')
+
+
+def parse_trivy(json_file, scanner="trivy"):
+    for result in iter_items(json_file, "Results.item"):
+        for v in result.get("Vulnerabilities") or []:
+            yield Finding(scanner, v["VulnerabilityID"], normalize_severity(v.get("Severity")),
+                          v.get("Title", ""), f'{v.get("PkgName", "")}@{v.get("InstalledVersion", "")}')
+        for s in result.get("Secrets") or []:
+            yield Finding(scanner, s.get("RuleID", ""), normalize_severity(s.get("Severity")),
+                          s.get("Title", ""), result.get("Target", ""), s.get("StartLine"))
+
+
+def parse_kics(json_file, scanner="kics"):
+    for query in iter_items(json_file, "queries.item"):
+        severity = normalize_severity(query.get("severity"))
+        for f in query.get("files", []):
+            yield Finding(scanner, query["query_id"], severity, query.get("query_name", ""),
+                          f.get("file_name", ""), f.get("line"))
+
+
+def parse_semgrep(json_file, scanner="semgrep"):
+    for result in iter_items(json_file, "results.item"):
+        extra = result.get("extra", {})
+        # Security rules rate their impact. Other rules only have a severity (ERROR, WARNING, INFO)
+        severity = extra.get("metadata", {}).get("impact") or extra.get("severity")
+        yield Finding(scanner, result["check_id"], normalize_severity(severity), extra.get("message", ""),
+                      result.get("path", ""), result.get("start", {}).get("line"))
+
+
+def parse_zap(json_file, scanner="zap"):
+    for site in iter_items(json_file, "site.item"):
+        for alert in site.get("alerts", []):
+            # riskcode goes from 0 (informational) to 3 (high)
+            risk = int(alert["riskcode"])
+            yield Finding(scanner, str(alert.get("pluginid", "")), risk if INFO <= risk <= HIGH else UNKNOWN,
+                          alert.get("name", ""), site.get("@name", ""))
+
+
+def parse_sarif(json_file, scanner="sarif"):
+    # Rules are read first, as results refer to them for their security severity
+    rules = {}
+    for rule in iter_items(json_file, "runs.item.tool.driver.rules.item"):
+        score = rule.get("properties", {}).get("security-severity")
+        if score is not None:
+            rules[rule["id"]] = cvss_severity(score)
+    for result in iter_items(json_file, "runs.item.results.item"):
+        severity = rules.get(result.get("ruleId"))
+        if severity is None:
+            severity = normalize_severity(result.get("level", "warning"))
+        location = ""
+        line = None
+        for loc in result.get("locations", [])[:1]:
+            physical = loc.get("physicalLocation", {})
+            location = physical.get("artifactLocation", {}).get("uri", "")
+            line = physical.get("region", {}).get("startLine")
+        yield Finding(scanner, result.get("ruleId", ""), severity,
+                      result.get("message", {}).get("text", ""), location, line)
+
+
+def parse_trufflehog(jsonl_file, scanner="trufflehog"):
+    with open(jsonl_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            location, line_number = "", None
+            for source in (r.get("SourceMetadata") or {}).get("Data", {}).values():
+                location = source.get("file") or source.get("link") or ""
+                line_number = source.get("line")
+            yield Finding(scanner, r.get("DetectorName", ""), CRITICAL if r.get("Verified") else HIGH,
+                          f'{r.get("DetectorName", "")} secret', location, line_number)
+
+
+PARSERS = {
+    "grype": parse_grype,
+    "trivy": parse_trivy,
+    "kics": parse_kics,
+    "semgrep": parse_semgrep,
+    "zap": parse_zap,
+    "sarif": parse_sarif,
+    "trufflehog": parse_trufflehog,
+}
+
+
+def parse_findings(report_path, report_format, scanner=None):
+    """Yields the findings of a report in one of the PARSERS formats"""
+    return PARSERS[report_format](report_path, scanner or report_format)
+
+
+def count_by_severity(findings):
+    """Number of findings of each severity, in SEVERITIES order"""
+    counts = [0] * len(SEVERITIES)
+    for f in findings:
+        counts[f.severity] += 1
+    return counts
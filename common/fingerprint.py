@@ -0,0 +1,101 @@
+import os
+import hashlib
+import subprocess
+import threading
+from common import docker_client
+from common.target_type import TargetType
+
+# Fingerprints identify the content of a target: a hash of a directory tree,
+# the digest of a docker image or the commit a Github repository points to.
+# They are computed once per target and run, even when several scanners ask
+# for them concurrently. Each run has its own Fingerprints, so a long-running
+# service doesn't keep the digest of an image or the HEAD of a repository
+# after they changed.
+
+
+def hash_file(path, h):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+
+
+def walk_tree(directory):
+    """Yields (path, rel_path) for every file and every link to a directory in
+    directory, in the order they are hashed. Linked directories aren't entered."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        links = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+        for name in sorted(files + links):
+            path = os.path.join(root, name)
+            yield path, os.path.relpath(path, directory)
+
+
+def hash_entry(h, path, rel_path):
+    """Adds a file of a tree to h, except for the content of regular files,
+    which the caller adds after it"""
+    h.update(rel_path.encode("utf-8", errors="surrogateescape") + b"\0")
+    if os.path.islink(path):
+        h.update(b"l" + os.readlink(path).encode("utf-8", errors="surrogateescape") + b"\0")
+    elif os.path.isfile(path):
+        h.update(oct(os.stat(path).st_mode & 0o777).encode() + b"\0")
+
+
+def hash_tree(directory):
+    """sha256 over the relative path, mode and content of every file in directory"""
+    h = hashlib.sha256()
+    for path, rel_path in walk_tree(directory):
+        hash_entry(h, path, rel_path)
+        if os.path.isfile(path) and not os.path.islink(path):
+            hash_file(path, h)
+    return h.hexdigest()
+
+
+def get_remote_head(url):
+    try:
+        result = subprocess.run(["git", "ls-remote", url, "HEAD"], capture_output=True,
+                                text=True, timeout=60, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    sha = result.stdout.split()
+    return sha[0] if sha else None
+
+
+def compute_fingerprint(target, target_type):
+    if target_type == TargetType.DIRECTORY:
+        try:
+            return f"tree:{hash_tree(target)}"
+        except OSError:
+            # Unreadable files
+            return None
+    if target_type == TargetType.DOCKER:
+        digest = docker_client.get_image_digest(target)
+        return f"image:{digest}" if digest else None
+    if target_type == TargetType.GITHUB:
+        sha = get_remote_head(target)
+        return f"git:{sha}" if sha else None
+    # Live websites and APIs can change at any time
+    return None
+
+
+class Fingerprints:
+    """Fingerprints of the targets of a run"""
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def set(self, target, target_type, fingerprint):
+        """Records a fingerprint computed elsewhere, e.g. while taking a snapshot of the target"""
+        with self.lock:
+            self.fingerprints[(target, target_type)] = fingerprint
+
+    def get(self, target, target_type):
+        """Returns the fingerprint of a target, or None if its content can't be pinned down"""
+        key = (target, target_type)
+        with self.lock:
+            lock = self.locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self.fingerprints:
+                self.fingerprints[key] = compute_fingerprint(target, target_type)
+            return self.fingerprints[key]
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from docker.errors import DockerException, ImageNotFound
+from docker.utils import parse_repository_tag
+from common import docker_client
+from common.logging_setup import setup_logger
+from common.metrics import Metrics
+
+
+class ImagePuller:
+    """
+    Pulls the scanner images before the scans start. Images are pulled
+    concurrently and only when the registry digest differs from the local one.
+    The registry isn't checked again for an image within ttl seconds of its last check.
+    Images are pulled on the given Docker host, the local daemon by default.
+    """
+
+    def __init__(self, state_file, ttl, jobs=4, log_level=logging.INFO, host=None, metrics=None):
+        self.state_file = os.path.expanduser(state_file)
+        self.metrics = metrics or Metrics()
+        self.ttl = ttl
+        self.jobs = jobs
+        self.host = host
+        self.logger = setup_logger("pull", "🐳", level=log_level)
+        self.lock = threading.Lock()
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.last_checked = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.last_checked = {}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.last_checked, f)
+
+    def get_client(self):
+        return self.host.get_client() if self.host else docker_client.get_client()
+
+    def get_state_key(self, image):
+        if self.host and self.host.url:
+            return f"{self.host.url} {image}"
+        return image
+
+    def get_local_digests(self, image):
+        """Returns the repo digests of the local image, or None if it isn't present"""
+        try:
+            return self.get_client().images.get(image).attrs.get("RepoDigests", [])
+        except ImageNotFound:
+            return None
+
+    def pull(self, image, force=False):
+        client = self.get_client()
+        key = self.get_state_key(image)
+        repository, tag = parse_repository_tag(image)
+        local_digests = self.get_local_digests(image)
+        if local_digests is not None:
+            if tag and tag.startswith("sha256:"):
+                return
+            if not force and time.time() - self.last_checked.get(key, 0) < self.ttl:
+                self.logger.debug("%s checked less than %ds ago", image, self.ttl)
+                return
+            try:
+                registry_digest = client.images.get_registry_data(image).id
+            except DockerException as e:
+                self.logger.warning("Couldn't check %s in the registry. Using the local image. %s", image, e)
+                return
+            if any(d.endswith(f"@{registry_digest}") for d in local_digests):
+                self.logger.debug("%s is up to date", image)
+                with self.lock:
+                    self.last_checked[key] = time.time()
+                return
+        if self.host and self.host.url:
+            self.logger.info("Pulling %s on %s...", image, self.host)
+        else:
+            self.logger.info("Pulling %s...", image)
+        with self.metrics.timer("image_pull", image=image):
+            client.images.pull(repository, tag=tag or "latest")
+        with self.lock:
+            self.last_checked[key] = time.time()
+
+    def pull_all(self, images, force=False):
+        """Pulls the given images concurrently. Returns the images that couldn't be pulled."""
+        failed = []
+        images = sorted(set(images))
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs), thread_name_prefix="pull") as executor:
+            futures = {image: executor.submit(self.pull, image, force) for image in images}
+        for image, future in futures.items():
+            try:
+                future.result()
+            except DockerException as e:
+                self.logger.error("Couldn't pull %s: %s", image, e)
+                failed.append(image)
+        self.save_state()
+        return failed
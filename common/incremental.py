@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from common.fingerprint import hash_file
+
+# Baselines for incremental scans of directory targets. A baseline keeps, per
+# (directory, scanner), the hash of every file seen in the last scan and the
+# complete report produced by it. The next scan only covers the files that
+# changed since then and its findings are merged into the baseline report.
+
+MAX_CHANGED_FILES = 500
+IGNORED_DIRS = {".git"}
+
+
+def to_relpath(path, container_dir):
+    """Turns a path reported by a scanner inside the container into a path relative to the target"""
+    path = path.replace("\\", "/")
+    marker = container_dir.rstrip("/") + "/"
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    return os.path.normpath(path)
+
+
+class IncrementalBaseline:
+
+    FILES = "files.json"
+    STATE = "state.json"
+
+    def __init__(self, baselines_dir, target, scanner):
+        target_id = hashlib.sha256(os.path.abspath(target).encode("utf-8")).hexdigest()[:16]
+        self.dir = os.path.join(os.path.expanduser(baselines_dir), target_id, scanner)
+        self.target = target
+        self.previous_files = self.load_json(self.FILES) or {}
+        self.state = self.load_json(self.STATE)
+
+    def load_json(self, name):
+        try:
+            with open(os.path.join(self.dir, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def hash_files(self):
+        """Returns {relative path: [size, mtime_ns, sha256]} for the files of the target.
+        Files whose size and mtime didn't change since the baseline are not read again."""
+        files = {}
+        for root, dirs, names in os.walk(self.target):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for name in names:
+                path = os.path.join(root, name)
+                if not os.path.isfile(path) or os.path.islink(path):
+                    continue
+                rel_path = os.path.relpath(path, self.target)
+                st = os.stat(path)
+                previous = self.previous_files.get(rel_path)
+                if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+                    files[rel_path] = previous
+                    continue
+                h = hashlib.sha256()
+                hash_file(path, h)
+                files[rel_path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return files
+
+    def get_git_changes(self, ref):
+        """Files changed (including untracked ones) in the working tree since ref.
+        Raises ValueError when ref isn't a commit of the target."""
+        if ref.startswith("-"):
+            # Would be parsed as an option by git, e.g. --output=<path>
+            raise ValueError(f"invalid git ref {ref}")
+        result = subprocess.run(
+            ["git", "-C", self.target, "rev-parse", "--verify", "--quiet", "--end-of-options", f"{ref}^{{commit}}"],
+            capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise ValueError(f"unknown git ref {ref}")
+        commit = result.stdout.strip()
+        changed = set()
+        for command in (["git", "-C", self.target, "diff", "--name-only", "--relative", commit, "--"],
+                        ["git", "-C", self.target, "ls-files", "--others", "--exclude-standard"]):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            changed.update(os.path.normpath(p) for p in result.stdout.splitlines() if p)
+        return changed
+
+    def get_changes(self, files, images, ref=None):
+        """Returns (changed, removed) relative paths since the baseline, or None when
+        a full scan is required: no baseline, new scanner images or too many changes."""
+        if not self.state or self.state.get("images") != images:
+            return None
+        if ref:
+            try:
+                paths = self.get_git_changes(ref)
+            except (OSError, ValueError, subprocess.CalledProcessError):
+                return None
+            changed = {p for p in paths if p in files}
+            removed = {p for p in paths if p not in files}
+        else:
+            changed = {p for p, h in files.items()
+                       if p not in self.previous_files or self.previous_files[p][2] != h[2]}
+            removed = set(self.previous_files) - set(files)
+        if len(changed) + len(removed) > MAX_CHANGED_FILES:
+            return None
+        return changed, removed
+
+    def get_report_path(self):
+        return os.path.join(self.dir, self.state["report_name"])
+
+    def save(self, files, images, report_path):
+        os.makedirs(self.dir, exist_ok=True)
+        report_name = os.path.basename(report_path)
+        for name in os.listdir(self.dir):
+            if name not in (self.FILES, self.STATE):
+                os.remove(os.path.join(self.dir, name))
+        shutil.copyfile(report_path, os.path.join(self.dir, report_name))
+        with open(os.path.join(self.dir, self.FILES), 'w', encoding='utf-8') as f:
+            json.dump(files, f)
+        with open(os.path.join(self.dir, self.STATE), 'w', encoding='utf-8') as f:
+            json.dump({"images": images, "report_name": report_name}, f)
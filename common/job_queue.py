@@ -0,0 +1,107 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# Persistent queue of the scan jobs of the service. Jobs survive restarts of
+# the service: the ones that were running when it stopped are queued again.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    args TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    exit_code INTEGER,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+COLUMNS = ("id", "status", "args", "created_at", "started_at", "finished_at", "exit_code", "result", "error")
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class JobQueue:
+
+    def __init__(self, path):
+        path = os.path.expanduser(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+
+    def submit(self, args):
+        """Queues a job with the given cosca arguments and returns its id"""
+        with self.lock:
+            with self.conn:
+                job_id = self.conn.execute(
+                    "INSERT INTO jobs (status, args, created_at) VALUES (?, ?, ?)",
+                    (QUEUED, json.dumps(args), now())).lastrowid
+            self.available.notify()
+        return job_id
+
+    def claim(self, timeout=None):
+        """Marks the oldest queued job as running and returns (id, args).
+        Waits up to timeout seconds for a job; returns None if there is none."""
+        with self.available:
+            while True:
+                row = self.conn.execute(
+                    "SELECT id, args FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)).fetchone()
+                if row:
+                    with self.conn:
+                        self.conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                                          (RUNNING, now(), row[0]))
+                    return row[0], json.loads(row[1])
+                if not self.available.wait(timeout):
+                    return None
+
+    def finish(self, job_id, exit_code, result=None, error=None):
+        status = DONE if error is None else FAILED
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, exit_code = ?, result = ?, error = ? WHERE id = ?",
+                (status, now(), exit_code, json.dumps(result) if result is not None else None, error, job_id))
+
+    def wake_all(self):
+        with self.available:
+            self.available.notify_all()
+
+    def to_dict(self, row):
+        job = dict(zip(COLUMNS, row))
+        job["args"] = json.loads(job["args"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.to_dict(row) if row else None
+
+    def list(self, status=None, limit=100):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE ? IS NULL OR status = ? ORDER BY id DESC LIMIT ?",
+                (status, status, limit)).fetchall()
+        return [self.to_dict(r) for r in rows]
+
+    def count(self):
+        """Number of jobs by status"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
@@ -0,0 +1,20 @@
+class LogStream:
+    """
+    Container output persisted on disk, exposed as a re-iterable stream of lines.
+    Every iteration reopens the files, so several consumers can read the same
+    output without ever holding it in memory.
+    """
+
+    def __init__(self, *paths):
+        self.paths = [p for p in paths if p]
+
+    def __iter__(self):
+        for path in self.paths:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                yield from f
+
+    def __add__(self, other):
+        return LogStream(*self.paths, *other.paths)
+
+    def __str__(self):
+        return "".join(self)
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Metrics of a run. Each run has its own Metrics, shared with its scanners and
+# image pullers, which time phases and record values in it. Cosca writes them
+# at the end of the run as JSON and Prometheus text format.
+
+
+class Metrics:
+
+    PREFIX = "cosca_"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+        self.started = time.time()
+
+    def observe(self, name, value, **labels):
+        """Records a value. name is prefixed with cosca_ on export."""
+        sample = {"name": name, "value": value,
+                  "labels": {k: str(v) for k, v in labels.items()}, "time": time.time()}
+        with self.lock:
+            self.samples.append(sample)
+
+    @contextmanager
+    def timer(self, phase, **labels):
+        """Records the duration of the block in seconds as phase_duration_seconds{phase=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_duration_seconds", time.perf_counter() - start, phase=phase, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.samples = []
+            self.started = time.time()
+
+    def to_json(self):
+        with self.lock:
+            samples = list(self.samples)
+        return {"started": self.started, "finished": time.time(), "samples": samples}
+
+    @staticmethod
+    def format_labels(labels):
+        if not labels:
+            return ""
+        escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                   for k, v in labels]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def to_prometheus(self):
+        """Prometheus text format. Every metric is exported as a summary: samples with
+        the same name and labels are added up in <name>_sum and counted in <name>_count."""
+        totals = {}
+        with self.lock:
+            for s in self.samples:
+                key = (s["name"], tuple(sorted(s["labels"].items())))
+                value, count = totals.get(key, (0, 0))
+                totals[key] = (value + s["value"], count + 1)
+        lines = []
+        name = None
+        for (n, labels), (value, count) in sorted(totals.items()):
+            if n != name:
+                name = n
+                lines.append(f"# TYPE {self.PREFIX}{name} summary")
+            label_text = self.format_labels(labels)
+            lines.append(f"{self.PREFIX}{name}_sum{label_text} {value}")
+            lines.append(f"{self.PREFIX}{name}_count{label_text} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path):
+        """Writes json_path and a .prom file next to it"""
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, indent=2)
+        with open(f"{os.path.splitext(json_path)[0]}.prom", 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
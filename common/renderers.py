@@ -0,0 +1,74 @@
+import json
+
+# Human readable renderings of machine readable scanner reports. They let
+# scanners run their tool once, in JSON mode, and still print a table or
+# plain output to the console.
+
+TRIVY_SEVERITIES = ["UNKNOWN", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+
+def format_table(headers, rows):
+    """Yields the lines of a plain text table"""
+    widths = [len(h) for h in headers]
+    for row in rows:
+        widths = [max(w, len(str(c))) for w, c in zip(widths, row)]
+    separator = "+" + "+".join("-" * (w + 2) for w in widths) + "+\n"
+
+    def line(cells):
+        return "|" + "|".join(f" {str(c):<{w}} " for c, w in zip(cells, widths)) + "|\n"
+
+    yield separator
+    yield line(headers)
+    yield separator
+    for row in rows:
+        yield line(row)
+    yield separator
+
+
+def render_trivy_table(json_file):
+    """Yields a table per result of a trivy JSON report, similar to --format table"""
+    with open(json_file, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    for r in data.get("Results") or []:
+        vulnerabilities = r.get("Vulnerabilities") or []
+        secrets = r.get("Secrets") or []
+        if not vulnerabilities and not secrets:
+            continue
+        findings = vulnerabilities + secrets
+        totals = ", ".join(
+            f"{s}: {sum(1 for f in findings if f.get('Severity') == s)}"
+            for s in TRIVY_SEVERITIES)
+        yield "\n"
+        yield f"{r.get('Target', '')} ({r.get('Type', r.get('Class', ''))})\n"
+        yield f"Total: {len(findings)} ({totals})\n"
+        yield "\n"
+        if vulnerabilities:
+            yield from format_table(
+                ["Library", "Vulnerability", "Severity", "Installed Version", "Fixed Version", "Title"],
+                [[v.get("PkgName", ""), v.get("VulnerabilityID", ""), v.get("Severity", ""),
+                  v.get("InstalledVersion", ""), v.get("FixedVersion", ""), v.get("Title", "")]
+                 for v in vulnerabilities])
+        if secrets:
+            yield from format_table(
+                ["Category", "Rule", "Severity", "Line", "Title"],
+                [[s.get("Category", ""), s.get("RuleID", ""), s.get("Severity", ""),
+                  s.get("StartLine", ""), s.get("Title", "")]
+                 for s in secrets])
+
+
+def render_trufflehog_plain(jsonl_file):
+    """Yields one block per trufflehog JSON line, similar to its plain output"""
+    with open(jsonl_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            verified = "verified" if r.get("Verified") else "unverified"
+            yield f"Found {verified} result 🐷🔑\n"
+            yield f"Detector Type: {r.get('DetectorName', r.get('DetectorType', ''))}\n"
+            yield f"Decoder Type: {r.get('DecoderName', '')}\n"
+            yield f"Raw result: {r.get('Redacted') or r.get('Raw', '')}\n"
+            for source in (r.get("SourceMetadata") or {}).get("Data", {}).values():
+                for key, value in (source or {}).items():
+                    yield f"{key.capitalize()}: {value}\n"
+            yield "\n"
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+from common.findings import SEVERITIES
+
+# SQLite database with the history of the runs: the scans of every run and
+# their normalized findings. Written by the sqlite output handler and read by
+# cosca_query.py.
+
+DEFAULT_PATH = os.path.join("~", ".cache", "cosca", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    target TEXT NOT NULL,
+    scanner TEXT NOT NULL,
+    scanned_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    fingerprint TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    title TEXT,
+    location TEXT,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS scans_run ON scans(run_id);
+CREATE INDEX IF NOT EXISTS scans_target ON scans(target, scanner, id);
+CREATE INDEX IF NOT EXISTS findings_scan ON findings(scan_id);
+CREATE INDEX IF NOT EXISTS findings_fingerprint ON findings(fingerprint);
+"""
+
+# Findings of each target per week, taken from the last scan of each scanner in the week
+WEEKLY_FINDINGS = """
+WITH last_scans AS (
+    SELECT target, strftime('%Y-%W', scanned_at) AS week, MAX(id) AS scan_id
+    FROM scans
+    WHERE (:target IS NULL OR target = :target) AND scanned_at >= date('now', :since)
+    GROUP BY target, scanner, week
+)
+SELECT l.target, l.week, f.severity, COUNT(DISTINCT f.fingerprint)
+FROM last_scans l
+LEFT JOIN findings f ON f.scan_id = l.scan_id
+GROUP BY l.target, l.week, f.severity
+ORDER BY l.target, l.week
+"""
+
+# A finding is fixed by the first scan of the same target and scanner after the last one that reported it
+TIME_TO_FIX = """
+WITH seen AS (
+    SELECT s.target, s.scanner, f.fingerprint, MAX(f.severity) AS severity,
+           MIN(s.scanned_at) AS first_seen, MAX(s.id) AS last_scan_id
+    FROM findings f JOIN scans s ON s.id = f.scan_id
+    WHERE :target IS NULL OR s.target = :target
+    GROUP BY s.target, s.scanner, f.fingerprint
+), fixed AS (
+    SELECT seen.severity, seen.first_seen,
+           (SELECT MIN(n.scanned_at) FROM scans n
+            WHERE n.target = seen.target AND n.scanner = seen.scanner
+              AND n.id > seen.last_scan_id) AS fixed_at
+    FROM seen
+)
+SELECT severity,
+       COUNT(fixed_at),
+       COUNT(*) - COUNT(fixed_at),
+       AVG(julianday(fixed_at) - julianday(first_seen)),
+       MAX(julianday(fixed_at) - julianday(first_seen))
+FROM fixed
+GROUP BY severity
+ORDER BY severity
+"""
+
+
+def connect(path=DEFAULT_PATH):
+    path = os.path.expanduser(path)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_weekly_findings(conn, target=None, weeks=12):
+    """Returns {(target, week): [count by severity]}"""
+    result = {}
+    for target_, week, severity, count in conn.execute(
+            WEEKLY_FINDINGS, {"target": target, "since": f"-{weeks * 7} days"}):
+        counts = result.setdefault((target_, week), [0] * len(SEVERITIES))
+        if severity is not None:
+            counts[severity] = count
+    return result
+
+
+def get_time_to_fix(conn, target=None):
+    """Returns rows of (severity, fixed, open, average days to fix, maximum days to fix)"""
+    return conn.execute(TIME_TO_FIX, {"target": target}).fetchall()
@@ -0,0 +1,84 @@
+import os
+import json
+from datetime import datetime, timezone
+
+# Journal of a run, kept in its working directory: one JSON object per line,
+# appended and synced as soon as each (target, scanner) scan is processed, so
+# it survives a crash of the process. A resumed run replays the completed
+# scans from the journal and only runs the others again.
+
+FILE_NAME = "journal.jsonl"
+
+COMPLETED = "completed"
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class RunJournal:
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.path = os.path.join(run_dir, FILE_NAME)
+
+    @property
+    def run_id(self):
+        return os.path.basename(self.run_dir)
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def read(self):
+        """Returns the entries of the journal. A line cut by a crash is ignored."""
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def get_argv(self):
+        """Arguments the run was started with"""
+        for entry in self.read():
+            if entry.get("event") == "run":
+                return entry["argv"]
+        raise ValueError(f"{self.path} doesn't record the arguments of the run")
+
+    def get_completed(self):
+        """Scanner state of the completed scans, by (target, scanner).
+        The latest entry of a scan wins, as failed scans are run again on resume."""
+        units = {}
+        for entry in self.read():
+            if entry.get("event") == "scan":
+                key = (entry["target"], entry["scanner"])
+                if entry["status"] == COMPLETED:
+                    units[key] = entry["state"]
+                else:
+                    units.pop(key, None)
+        return units
+
+    def write(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({**entry, "time": now()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, argv):
+        if self.exists():
+            self.write({"event": "resume"})
+        else:
+            self.write({"event": "run", "argv": argv})
+
+    def record(self, target, scanner, status, state=None, error=None):
+        entry = {"event": "scan", "target": target, "scanner": scanner, "status": status}
+        if state is not None:
+            entry["state"] = state
+        if error:
+            entry["error"] = error
+        self.write(entry)
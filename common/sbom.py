@@ -0,0 +1,124 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from common import docker_client
+from common.fingerprint import Fingerprints
+from common.logging_setup import setup_logger
+from common.scan_cache import ScanCache
+from common.target_type import TargetType
+
+# Cataloging a target (generating its SBOM) is the expensive part of the SBOM
+# based scanners. Each SBOM tool catalogs a target once per run and every
+# scanner using the tool matches the vulnerabilities of that same SBOM.
+# The SBOMs are also kept by target fingerprint and reused by later runs.
+
+SYFT_IMAGE = "anchore/syft"
+CDXGEN_IMAGE = "ghcr.io/cyclonedx/cdxgen"
+
+# Files of an SBOM directory, which is a subdirectory of the scanner working directory
+SBOM_DIRECTORY = "sbom"
+SYFT_FILE = "sbom.json"
+CYCLONEDX_FILE = "sbom.cdx.json"
+TABLE_FILE = "sbom.txt"
+
+CONTAINER_TARGET_DIRECTORY = "/src"
+
+
+def get_volumes(scanner, target, sbom_dir, target_mode="ro"):
+    volumes = {sbom_dir: {"bind": scanner.CONTAINER_REPORT_DIRECTORY, "mode": "rw"}}
+    if scanner.target_type == TargetType.DIRECTORY:
+        volumes[target] = {"bind": CONTAINER_TARGET_DIRECTORY, "mode": target_mode}
+    return volumes
+
+
+def generate_syft(scanner, target, sbom_dir):
+    """Syft SBOM in its own format and in CycloneDX, for matchers that don't read the former"""
+    if scanner.target_type == TargetType.DIRECTORY:
+        source = f"dir:{CONTAINER_TARGET_DIRECTORY} --source-name artifact_dir --source-version 1.0"
+    else:
+        source = target
+    report_dir = scanner.CONTAINER_REPORT_DIRECTORY
+    # A single syft run prints the table and writes both SBOM formats
+    command = (f"scan {source} -o table -o json={report_dir}/{SYFT_FILE} "
+               f"-o cyclonedx-json={report_dir}/{CYCLONEDX_FILE}")
+    scanner.run_container(SYFT_IMAGE, command, get_volumes(scanner, target, sbom_dir),
+                          log_path=os.path.join(sbom_dir, TABLE_FILE))
+
+
+def generate_cdxgen(scanner, target, sbom_dir):
+    command = f"-r {CONTAINER_TARGET_DIRECTORY} -o {scanner.CONTAINER_REPORT_DIRECTORY}/{CYCLONEDX_FILE} -p"
+    if scanner.target_type != TargetType.DIRECTORY:
+        scanner.run_container(CDXGEN_IMAGE, command, get_volumes(scanner, target, sbom_dir),
+                              log_path=os.path.join(sbom_dir, TABLE_FILE))
+        return
+    # cdxgen installs the dependencies of projects without lock files to resolve
+    # their transitive dependencies, so it gets a private writable copy of the target
+    copy_dir = tempfile.mkdtemp(prefix="cdxgen_", dir=os.path.dirname(sbom_dir))
+    try:
+        target_copy = os.path.join(copy_dir, "src")
+        shutil.copytree(target, target_copy, symlinks=True)
+        scanner.run_container(CDXGEN_IMAGE, command, get_volumes(scanner, target_copy, sbom_dir, "rw"),
+                              log_path=os.path.join(sbom_dir, TABLE_FILE))
+    finally:
+        shutil.rmtree(copy_dir, ignore_errors=True)
+
+
+GENERATORS = {
+    SYFT_IMAGE: generate_syft,
+    CDXGEN_IMAGE: generate_cdxgen,
+}
+
+
+def get_source_hash():
+    """Hash of this module, which defines the SBOM commands"""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class SbomStore:
+    """
+    SBOMs of the targets of a run, by SBOM image and target. The first scanner that
+    needs an SBOM generates it while the others wait, then it's copied into the
+    working directory of every scanner. With a cache (a ScanCache), SBOMs are also
+    stored by target fingerprint and SBOM image digest for later runs.
+    """
+
+    def __init__(self, cache=None, log_level=logging.INFO, fingerprints=None):
+        self.cache = cache
+        self.fingerprints = fingerprints or Fingerprints()
+        self.logger = setup_logger("sbom", "📦", level=log_level)
+        self.sboms = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get_cache_key(self, scanner, target):
+        fingerprint = self.fingerprints.get(target, scanner.target_type)
+        if not fingerprint:
+            return None
+        digest = docker_client.get_image_digest(scanner.SBOM_IMAGE, scanner.get_docker_client())
+        if not digest:
+            return None
+        return ScanCache.get_key("sbom", scanner.SBOM_IMAGE, digest, get_source_hash(), fingerprint)
+
+    def get(self, scanner, target, sbom_dir):
+        """Puts the SBOM of target generated with scanner.SBOM_IMAGE in sbom_dir"""
+        key = (scanner.SBOM_IMAGE, target)
+        with self.lock:
+            lock = self.locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self.sboms:
+                self.logger.info("Reusing the SBOM of %s generated in this run", target)
+                shutil.copytree(self.sboms[key], sbom_dir, dirs_exist_ok=True)
+                return
+            cache_key = self.get_cache_key(scanner, target) if self.cache else None
+            if cache_key and self.cache.restore(cache_key, sbom_dir) is not None:
+                self.logger.info("Reusing the cached SBOM of %s", target)
+            else:
+                self.logger.info("Generating the SBOM of %s...", target)
+                GENERATORS[scanner.SBOM_IMAGE](scanner, target, sbom_dir)
+                if cache_key:
+                    self.cache.store(cache_key, sbom_dir, {})
+            self.sboms[key] = sbom_dir
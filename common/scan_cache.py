@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from common.logging_setup import setup_logger
+
+
+class ScanCache:
+    """
+    Persistent, content addressed cache of scan results.
+    Each entry is a copy of a scanner working directory plus the scanner state
+    (see Scanner.get_state), stored under the sha256 of the key parts.
+    Entries are evicted least recently used first once max_size bytes are exceeded.
+    Entries older than ttl seconds are missed, e.g. so that scanners downloading
+    their vulnerability database at runtime match the target against a new one.
+    """
+
+    MANIFEST = "manifest.json"
+    FILES = "files"
+
+    def __init__(self, cache_dir, max_size, log_level=logging.INFO, ttl=None):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.logger = setup_logger("cache", "🗄️ ", level=log_level)
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(*parts):
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get_entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key, working_dir):
+        """Copies a cached entry into working_dir and returns its scanner state, or None on a miss"""
+        entry_dir = self.get_entry_dir(key)
+        manifest_path = os.path.join(entry_dir, self.MANIFEST)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if self.ttl is not None and time.time() - manifest.get("created", 0) >= self.ttl:
+                self.logger.debug("Cache entry %s expired", key)
+                return None
+            shutil.copytree(os.path.join(entry_dir, self.FILES), working_dir, dirs_exist_ok=True)
+            os.utime(manifest_path)
+        except (FileNotFoundError, json.JSONDecodeError, shutil.Error, OSError):
+            return None
+        self.logger.debug("Cache hit %s", key)
+        return manifest["state"]
+
+    def store(self, key, working_dir, state):
+        """Saves working_dir and the scanner state under key"""
+        entry_dir = self.get_entry_dir(key)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}_", dir=self.cache_dir)
+        try:
+            shutil.copytree(working_dir, os.path.join(tmp_dir, self.FILES))
+            manifest = {"state": state, "size": self.get_size(tmp_dir), "created": time.time()}
+            with open(os.path.join(tmp_dir, self.MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            with self.lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            self.logger.error("Couldn't store scan results in cache: %s", e)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.logger.debug("Cached %s", key)
+        self.evict()
+
+    def get_size(self, directory):
+        size = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if not os.path.islink(path):
+                    size += os.path.getsize(path)
+        return size
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_size"""
+        with self.lock:
+            entries = []
+            for key in os.listdir(self.cache_dir):
+                if key.startswith("."):
+                    continue
+                manifest_path = os.path.join(self.cache_dir, key, self.MANIFEST)
+                try:
+                    with open(manifest_path, 'r', encoding='utf-8') as f:
+                        size = json.load(f)["size"]
+                    entries.append((os.path.getmtime(manifest_path), size, key))
+                except (OSError, ValueError, KeyError):
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_size:
+                    break
+                shutil.rmtree(self.get_entry_dir(key), ignore_errors=True)
+                total -= size
+                self.logger.debug("Evicted %s from cache", key)
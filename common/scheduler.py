@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Skipped:
+    """Result of a job that didn't run because one of the jobs it needs failed"""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+class ScanScheduler:
+    """
+    Runs (target, scanner) jobs on a pool of worker threads. A job may need other
+    jobs, submitted before it: it starts once they all finished, as long as they
+    passed (no exception and passed(result) is true), and is skipped otherwise.
+    Results are handed back in submission order so that a single consumer
+    (the output handlers) always sees them in a deterministic sequence.
+    """
+
+    def __init__(self, jobs=1, max_pending=None, passed=None):
+        self.jobs = max(1, jobs)
+        self.max_pending = max_pending or self.jobs * 2
+        self.passed = passed or (lambda result: True)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.jobs, thread_name_prefix="cosca")
+        self.pending = deque()
+
+    def submit(self, key, fn, *args, needs=(), **kwargs):
+        """Schedules fn(*args, **kwargs) after the jobs in needs, which are futures
+        returned by submit. key is returned along with the result."""
+        if needs:
+            future = Future()
+            Dependency(self, future, needs, fn, args, kwargs)
+        else:
+            future = self.executor.submit(fn, *args, **kwargs)
+        self.pending.append((key, future))
+        return future
+
+    def has_passed(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return False
+        result = future.result()
+        return not isinstance(result, Skipped) and self.passed(result)
+
+    def ready(self):
+        """Yields (key, result) for the finished jobs at the head of the queue.
+        Blocks on the oldest job while there are more than max_pending in flight."""
+        while self.pending and (self.pending[0][1].done()
+                                or len(self.pending) > self.max_pending):
+            key, future = self.pending.popleft()
+            yield key, future.result()
+
+    def drain(self):
+        """Yields (key, result) for every remaining job, in submission order."""
+        while self.pending:
+            key, future = self.pending.popleft()
+            yield key, future.result()
+
+    def shutdown(self):
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+
+
+class Dependency:
+    """Submits a job to the executor once the jobs it needs are done, and
+    hands its outcome to future, the one returned to the consumer."""
+
+    def __init__(self, scheduler, future, needs, fn, args, kwargs):
+        self.scheduler = scheduler
+        self.future = future
+        self.call = (fn, args, kwargs)
+        self.needs = list(needs)
+        self.remaining = len(self.needs)
+        self.lock = threading.Lock()
+        for need in self.needs:
+            need.add_done_callback(self.need_done)
+
+    def need_done(self, _):
+        with self.lock:
+            self.remaining -= 1
+            if self.remaining:
+                return
+        if not self.future.set_running_or_notify_cancel():
+            return
+        if not all(self.scheduler.has_passed(need) for need in self.needs):
+            self.future.set_result(Skipped("a scan it needs failed"))
+            return
+        fn, args, kwargs = self.call
+        try:
+            job = self.scheduler.executor.submit(fn, *args, **kwargs)
+        except RuntimeError as e:
+            # The scheduler was shut down
+            self.future.set_exception(e)
+            return
+        job.add_done_callback(self.job_done)
+
+    def job_done(self, job):
+        if job.cancelled():
+            self.future.set_exception(RuntimeError("job cancelled"))
+        elif job.exception() is not None:
+            self.future.set_exception(job.exception())
+        else:
+            self.future.set_result(job.result())
@@ -0,0 +1,122 @@
+import os
+import shutil
+import hashlib
+import logging
+from common.fingerprint import Fingerprints, walk_tree, hash_entry
+from common.logging_setup import setup_logger
+from common.target_type import TargetType
+
+# With --snapshot, the scanners of a directory target all scan one snapshot of
+# it, taken before its first scan, so they don't see changes made to the target
+# while it's scanned. The hash of the snapshot, computed while taking it, is the
+# fingerprint of the target. Targets are mounted read-only either way.
+#
+# none: no snapshot, the target is scanned in place. The default.
+# link: files are hard links to those of the target, or copies when the target
+#       is on another file system than the working directory of the run.
+#       Files edited in place (not replaced) while the target is scanned
+#       still show through.
+# copy: files are copied.
+#
+# Snapshots are removed at the end of the run, and taken again by a resumed run.
+
+SNAPSHOT_MODES = ["none", "link", "copy"]
+
+SNAPSHOT_DIRECTORY = "snapshots"
+
+
+def copy_file(source, dest, h):
+    """Copies a regular file and adds its content to h in a single read"""
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            h.update(chunk)
+            dst.write(chunk)
+    shutil.copymode(source, dest)
+
+
+def link_file(source, dest, h):
+    try:
+        os.link(source, dest)
+    except OSError:
+        # Another file system, or one without hard links
+        copy_file(source, dest, h)
+        return
+    with open(dest, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+
+
+def snapshot_tree(source, dest, link=True):
+    """Copies the tree of source into dest. Symbolic links, to files or directories,
+    are copied as links and other special files are left out. Returns the hash of the
+    tree, the same as hash_tree, and the files that couldn't be copied. The hash
+    doesn't identify the tree when some files couldn't be copied."""
+    h = hashlib.sha256()
+    skipped = []
+    os.makedirs(dest)
+    for path, rel_path in walk_tree(source):
+        dest_path = os.path.join(dest, rel_path)
+        try:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            hash_entry(h, path, rel_path)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), dest_path)
+            elif os.path.isfile(path):
+                (link_file if link else copy_file)(path, dest_path, h)
+        except OSError:
+            skipped.append(rel_path)
+    return h.hexdigest(), skipped
+
+
+class SnapshotStore:
+    """Snapshots of the directory targets of a run, kept in its working directory.
+    Targets with the same content share a snapshot."""
+
+    def __init__(self, mode="none", log_level=logging.INFO, fingerprints=None):
+        self.mode = mode
+        self.fingerprints = fingerprints or Fingerprints()
+        self.logger = setup_logger("snapshot", "📸", level=log_level)
+        self.snapshots = {}
+
+    def take(self, target, working_dir):
+        """Takes the snapshot of target unless it was already taken in this run"""
+        if self.mode == "none" or target in self.snapshots:
+            return self.get_path(target)
+        snapshot_dir = os.path.join(working_dir, SNAPSHOT_DIRECTORY)
+        tmp_dir = os.path.join(snapshot_dir, f"tmp_{hashlib.sha256(target.encode()).hexdigest()[:8]}")
+        # Leftovers of an interrupted run
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.logger.info("Taking a snapshot of %s...", target)
+        try:
+            tree_hash, skipped = snapshot_tree(target, tmp_dir, link=self.mode == "link")
+        except OSError as e:
+            self.logger.warning("Couldn't take a snapshot of %s. Scanning it in place. %s", target, e)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return target
+        if skipped:
+            # Not a fingerprint of the target, nor shared with other targets
+            self.logger.warning("%d files of %s couldn't be read and aren't in its snapshot: %s",
+                                len(skipped), target, ", ".join(skipped[:5]))
+            path = tmp_dir
+        else:
+            path = os.path.join(snapshot_dir, tree_hash[:16])
+            if os.path.isdir(path):
+                shutil.rmtree(tmp_dir)
+            else:
+                os.rename(tmp_dir, path)
+            fingerprint = f"tree:{tree_hash}"
+            self.fingerprints.set(target, TargetType.DIRECTORY, fingerprint)
+            self.fingerprints.set(path, TargetType.DIRECTORY, fingerprint)
+        self.snapshots[target] = path
+        self.logger.debug("Snapshot of %s: %s", target, path)
+        return path
+
+    def remove_all(self):
+        """Removes the snapshots taken in this run"""
+        for path in set(self.snapshots.values()):
+            shutil.rmtree(path, ignore_errors=True)
+        self.snapshots = {}
+
+    def get_path(self, target):
+        """Directory the scanners of target mount: its snapshot, or target itself without one"""
+        return self.snapshots.get(target, target)
@@ -0,0 +1,58 @@
+import sys
+import json
+from common.target_type import TargetType
+
+
+class TargetSpec:
+    """A target to scan, with optional per-target overrides of the combo and the target type"""
+
+    __slots__ = ("target", "combo", "target_type")
+
+    def __init__(self, target, combo=None, target_type=None):
+        self.target = target
+        self.combo = combo
+        self.target_type = target_type
+
+    def __repr__(self):
+        return f"TargetSpec({self.target!r}, combo={self.combo!r}, target_type={self.target_type!r})"
+
+
+def parse_line(line):
+    """Parses a line of a targets file: either a plain target or a JSON object
+    like {"target": "...", "combo": "...", "type": "..."}. Returns None for
+    blank lines and comments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if not line.startswith("{"):
+        return TargetSpec(line)
+    entry = json.loads(line)
+    target_type = TargetType(entry["type"]) if entry.get("type") else None
+    return TargetSpec(entry["target"], entry.get("combo"), target_type)
+
+
+def iter_targets(targets=None, targets_file=None, on_error=None):
+    """Lazily yields the targets given in the command line, then those read from
+    targets_file ('-' reads from stdin) as soon as each line is available.
+    Invalid lines are passed to on_error, with the error message, and skipped.
+    Without on_error, they raise ValueError."""
+    for t in targets or []:
+        yield TargetSpec(t)
+    if not targets_file:
+        return
+    file = sys.stdin if targets_file == "-" else open(targets_file, 'r', encoding='utf-8')
+    try:
+        for number, line in enumerate(file, start=1):
+            try:
+                spec = parse_line(line)
+            except (json.JSONDecodeError, KeyError, ValueError, TypeError, AttributeError) as e:
+                message = f"{targets_file}:{number}: invalid target entry. {e}"
+                if on_error is None:
+                    raise ValueError(message) from e
+                on_error(message)
+                continue
+            if spec:
+                yield spec
+    finally:
+        if file is not sys.stdin:
+            file.close()
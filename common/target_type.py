@@ -1,4 +1,9 @@
 import os
+import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import validators
 from urllib.parse import urlparse
 from enum import Enum
@@ -7,6 +12,72 @@ import requests
 
 # python -m unittest discover -s tests
 
+PROBE_TIMEOUT = (5, 15)
+PROBE_MAX_BYTES = 1024 * 1024
+
+
+class TargetTypeCache:
+    """Types detected for URL targets, persisted across runs for ttl seconds.
+    New entries are written every SAVE_EVERY entries and by save, at the end of the run."""
+
+    SAVE_EVERY = 50
+
+    def __init__(self, path, ttl):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.unsaved = 0
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, target):
+        with self.lock:
+            entry = self.entries.get(target)
+        if entry and time.time() - entry[1] < self.ttl:
+            return TargetType(entry[0])
+        return None
+
+    def set(self, target, target_type):
+        with self.lock:
+            self.entries[target] = [target_type.value, time.time()]
+            self.unsaved += 1
+            if self.unsaved < self.SAVE_EVERY:
+                return
+        self.save()
+
+    def save(self):
+        """Writes the new entries, along with those written by other runs in the meantime.
+        The file is replaced atomically, so it's never left half written."""
+        with self.lock:
+            if not self.unsaved:
+                return
+            entries = self.load()
+            for target, entry in self.entries.items():
+                if target not in entries or entries[target][1] < entry[1]:
+                    entries[target] = entry
+            self.entries = entries
+            directory = os.path.dirname(self.path)
+            tmp_path = None
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=".target_types_", dir=directory)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # Only a cache: the types are detected again by the next run
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self.unsaved = 0
+
+
 class TargetType(Enum):
     DIRECTORY = 'directory'
     GITHUB = 'github'
@@ -16,12 +87,36 @@ class TargetType(Enum):
     SOAP = 'soap'
     DOCKER = 'docker'
 
+    @staticmethod
+    def parse_target(target):
+        """Splits the explicit 'type=target' syntax. Returns (target, type), with a
+        None type when the target doesn't start with a known type.
+        '=' can't appear in image references, unlike ':' (docker:dind, web:latest)"""
+        prefix, sep, rest = target.partition("=")
+        if sep and rest and prefix in {t.value for t in TargetType}:
+            return rest, TargetType(prefix)
+        return target, None
+
+    @staticmethod
+    def probe(method, url, **kwargs):
+        """Sends a request with timeouts and returns (status code, body), reading at most PROBE_MAX_BYTES"""
+        response = method(url, timeout=PROBE_TIMEOUT, stream=True, **kwargs)
+        try:
+            body = b""
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body += chunk
+                if len(body) >= PROBE_MAX_BYTES:
+                    break
+            return response.status_code, body[:PROBE_MAX_BYTES].decode("utf-8", errors="replace")
+        finally:
+            response.close()
+
     @staticmethod
     def is_soap_endpoint(url):
         try:
             wsdl_url = f"{url}?wsdl" if  not url.endswith("?wsdl") else url
-            response = requests.get(wsdl_url)
-            if response.status_code == 200 and 'definitions' in response.text:
+            status_code, text = TargetType.probe(requests.get, wsdl_url)
+            if status_code == 200 and 'definitions' in text:
                 return True
             return False
         except requests.exceptions.RequestException as e:
@@ -29,33 +124,56 @@ class TargetType(Enum):
             return False
 
     @staticmethod
-    def get_target_type(target):
+    def is_graphql_endpoint(url):
+        try:
+            introspection_query = {"query": "{ __schema { types { name } } }"}
+            status_code, text = TargetType.probe(requests.post, url, json=introspection_query)
+            return status_code == 200 and '__schema' in text
+        except requests.exceptions.RequestException:
+            return False
+
+    @staticmethod
+    def get_url_type(target):
+        """Probes the url for OpenAPI, SOAP and GraphQL concurrently"""
+        executor = ThreadPoolExecutor(max_workers=3)
+        content = executor.submit(TargetType.probe, requests.get, target)
+        soap = executor.submit(TargetType.is_soap_endpoint, target)
+        graphql = executor.submit(TargetType.is_graphql_endpoint, target)
+        try:
+            try:
+                _, text = content.result()
+            except requests.exceptions.RequestException:
+                return TargetType.WEB
+            if '"openapi"' in text or '"swagger"' in text:
+                return TargetType.OPENAPI
+            elif soap.result():
+                return TargetType.SOAP
+            # elif '<soapenv:Envelope' in content or 'xmlns:soapenv' in content:
+            #     return TargetType.SOAP
+            elif graphql.result():
+                return TargetType.GRAPHQL
+            else:
+                return TargetType.WEB
+        finally:
+            # Don't wait for probes whose answer isn't needed
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def get_target_type(target, cache=None):
         if validators.url(target):
             if urlparse(target).netloc=="github.com":
                 return TargetType.GITHUB
             else:
-                try:
-                    response = requests.get(target)
-                    content = response.text
-                    if '"openapi"' in content or '"swagger"' in content:
-                        return TargetType.OPENAPI
-                    elif TargetType.is_soap_endpoint(target):
-                        return TargetType.SOAP
-                    # elif '<soapenv:Envelope' in content or 'xmlns:soapenv' in content:
-                    #     return TargetType.SOAP
-                    else:
-                        introspection_query = {"query": "{ __schema { types { name } } }"}
-                        introspection_response = requests.post(target, json=introspection_query)
-                        if introspection_response.status_code == 200 and '__schema' in introspection_response.text:
-                            return TargetType.GRAPHQL
-                        else:
-                            return TargetType.WEB
-                except requests.exceptions.RequestException as e:
-                    return TargetType.WEB
+                target_type = cache.get(target) if cache else None
+                if target_type is None:
+                    target_type = TargetType.get_url_type(target)
+                    if cache:
+                        cache.set(target, target_type)
+                return target_type
         elif os.path.exists(target):
             return TargetType.DIRECTORY
         elif re.match(r'^(?:[a-z0-9]+(?:[._-][a-z0-9]+)*/)?[a-z0-9]+(?:[._-][a-z0-9]+)*(?::[a-zA-Z0-9._-]+|@[A-Za-z0-9:]+)?$', target):
             #TODO add image check in registry
             return TargetType.DOCKER
         else:
-            return None
\ No newline at end of file
+            return None
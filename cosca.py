@@ -2,18 +2,74 @@ import logging
 import json
 import os
 import sys
+import shutil
 import tempfile
 import argparse
 import importlib
-import docker
+import signal
+import threading
+import time
 from docker.errors import DockerException
+from common import docker_client
 from common.logging_setup import setup_logger
-from common.target_type import TargetType
+from common.target_type import TargetType, TargetTypeCache
+from common.target_source import TargetSpec, iter_targets
+from common.scheduler import ScanScheduler, Skipped
+from common.combo_graph import Node, get_nodes
+from common.scan_cache import ScanCache
+from common.sbom import SbomStore
+from common.snapshot import SnapshotStore, SNAPSHOT_MODES
+from common.fingerprint import Fingerprints
+from common.incremental import IncrementalBaseline
+from common.image_puller import ImagePuller
+from common.metrics import Metrics
+from common.dedupe import FindingIndex
+from common import baseline
+from common.findings import SEVERITIES
+from common.run_journal import RunJournal, COMPLETED
+from scanner import ScanStopped
+
+
+_combos = {}
+_combos_lock = threading.Lock()
+
+
+def parse_scanner_timeout(value):
+    """NAME=SECONDS argument of --scanner_timeout"""
+    name, sep, seconds = value.partition("=")
+    try:
+        seconds = float(seconds)
+    except ValueError:
+        seconds = 0
+    if not sep or not name or seconds <= 0:
+        raise argparse.ArgumentTypeError(f"expected SCANNER=SECONDS, got {value}")
+    return name, seconds
+
+
+def load_combos(file_path):
+    """Parses the combos file. The result is kept until the file changes,
+    so a long-running service doesn't parse it again for every job."""
+    mtime = os.stat(file_path).st_mtime_ns
+    with _combos_lock:
+        cached = _combos.get(file_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    with _combos_lock:
+        _combos[file_path] = (mtime, data)
+    return data
 
 
 class Cosca:
 
-    def __init__(self):
+    # Replaced by the service, so invalid job arguments don't exit the process
+    PARSER_CLASS = argparse.ArgumentParser
+
+    def __init__(self, argv=None, check_docker=True):
+        """argv are the command line arguments, sys.argv[1:] by default.
+        The service sets check_docker=False, as it already checked the daemon."""
+        self.argv = argv
         self.args = self.parse_args()
         self.log_level = (
             logging.WARNING
@@ -21,14 +77,63 @@ class Cosca:
             else (logging.DEBUG if self.args.verbose else logging.INFO)
         )
         self.logger = setup_logger(__name__, "❇️ ", level=self.log_level)
-        if not self.is_docker_daemon_running():
+        self.target_type_cache = (
+            TargetTypeCache(
+                os.path.join("~", ".cache", "cosca", "target_types.json"),
+                self.args.target_type_ttl * 3600,
+            )
+            if self.args.target_type_ttl > 0
+            else None
+        )
+        self.findings_index = FindingIndex()
+        # Scans that timed out or were skipped, whose findings are missing
+        self.incomplete_scans = 0
+        self.scanner_timeouts = dict(self.args.scanner_timeout)
+        self.run_deadline = None
+        # Scans running in the workers, stopped when the run is cancelled
+        self.active_scans = set()
+        self.active_lock = threading.Lock()
+        self.cancel_reason = None
+        # Scans that failed or timed out, to be run again with --resume
+        self.failed_scans = 0
+        self.completed_scans = {}
+        # Scanner images already checked in this run
+        self.pulled_images = set()
+        self.cache = (
+            ScanCache(self.args.cache_dir, self.args.cache_max_size * 1024 * 1024, self.log_level,
+                      ttl=self.args.cache_ttl * 3600)
+            if self.args.cache
+            else None
+        )
+        try:
+            self.host_pool = docker_client.get_host_pool(
+                [h.strip() for h in self.args.docker_hosts.split(",") if h.strip()],
+                max_pool_size=max(10, self.args.jobs * 2),
+            )
+        except (ValueError, DockerException) as e:
+            self.logger.error("Invalid --docker_hosts: %s", e)
+            sys.exit(1)
+        self.metrics = Metrics()
+        self.fingerprints = Fingerprints()
+        self.sbom_store = SbomStore(
+            ScanCache(self.args.sbom_cache_dir, self.args.sbom_cache_max_size * 1024 * 1024, self.log_level)
+            if self.args.sbom_cache_max_size > 0
+            else None,
+            self.log_level,
+            self.fingerprints,
+        )
+        if self.args.incremental and self.args.snapshot != "none":
+            self.logger.warning("--snapshot is ignored with --incremental, which scans the changed files in place")
+        self.snapshots = SnapshotStore(
+            "none" if self.args.incremental else self.args.snapshot, self.log_level, self.fingerprints)
+        if check_docker and not self.is_docker_daemon_running():
             self.logger.error(
                 "Docker daemon is not running. Please start docker daemon and run cosca again."
             )
             sys.exit(1)
 
     def parse_args(self):
-        self.parser = argparse.ArgumentParser(
+        self.parser = self.PARSER_CLASS(
             description="Scan targets based on their types."
         )
         self.parser.add_argument(
@@ -41,7 +146,12 @@ class Cosca:
             "-t",
             "--target",
             nargs="+",
-            help="Space separated targets to scan. Could be directory, docker image, website, openapi, graphql, soap or Github repo"
+            help="Space separated targets to scan. Could be directory, docker image, website, openapi, graphql, soap or Github repo. Prefix a target with its type to skip detection, e.g. openapi=https://example.com/v3/api.json"
+        )
+        self.parser.add_argument(
+            "--targets_file",
+            help="File with one target per line, read while scanning. Use - to read from stdin. Lines may also be JSON objects to override the combo or the type of a target, e.g. {\"target\": \"https://example.com\", \"combo\": \"full\", \"type\": \"web\"}",
+            default=None,
         )
         self.parser.add_argument(
             "-o",
@@ -50,6 +160,116 @@ class Cosca:
             help=f"Specify outputs. Separate more than one option with spaces. Options: {' '.join(self.get_filenames('output_handlers'))}",
             default=["pdf", "zip"],
         )
+        self.parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            help="Number of (target, scanner) pairs to scan concurrently.",
+            default=1,
+        )
+        self.parser.add_argument(
+            "--cpus",
+            type=float,
+            help="CPU limit applied to each scanner container (e.g. 1.5). Unlimited by default.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--memory",
+            help="Memory limit applied to each scanner container (e.g. 2g). Unlimited by default.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Reuse the results of previous scans when neither the target nor the scanner image changed, for --cache_ttl hours.",
+            default=False,
+        )
+        self.parser.add_argument(
+            "--cache_dir",
+            help="Folder of the scan results cache.",
+            default=os.path.join("~", ".cache", "cosca", "scans"),
+        )
+        self.parser.add_argument(
+            "--cache_max_size",
+            type=int,
+            help="Maximum size of the scan results cache in MB. Least recently used results are evicted first.",
+            default=2048,
+        )
+        self.parser.add_argument(
+            "--cache_ttl",
+            type=float,
+            help="Hours during which cached scan results are reused. Scanners like trivy and grype download their vulnerability database at runtime, so older results may miss the vulnerabilities disclosed since.",
+            default=24,
+        )
+        self.parser.add_argument(
+            "--snapshot",
+            choices=SNAPSHOT_MODES,
+            help="Scan a snapshot of each directory target, so its scanners don't see the changes made to it while it's scanned: link hard links its files (copies them when the target is on another file system than the temporary directory) and copy copies them. By default (none) targets are scanned in place. Ignored with --incremental.",
+            default="none",
+        )
+        self.parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only scan the files of directory targets that changed since the previous incremental scan, and merge their findings with the previous ones. Applies to semgrep, kics and trufflehog.",
+            default=False,
+        )
+        self.parser.add_argument(
+            "--incremental_ref",
+            help="Git ref of the previous incremental scan. When set, changed files are taken from git diff instead of comparing file hashes.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--incremental_dir",
+            help="Folder where the baselines of incremental scans are kept.",
+            default=os.path.join("~", ".cache", "cosca", "incremental"),
+        )
+        self.parser.add_argument(
+            "--metrics_file",
+            help="Write the run metrics (durations of each phase, log and report sizes, container exit codes) to this JSON file. The same metrics are written in Prometheus text format to a .prom file next to it.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--baseline",
+            help="Baseline written by --write_baseline in a previous run. Findings are reported as new, fixed or unchanged compared to it.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--write_baseline",
+            help="Write the fingerprints of the findings of this run to this file, to be used later with --baseline. It can be the same file as --baseline.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--timeout",
+            type=float,
+            help="Seconds after which a scan is stopped and reported as timed out, for the scanners without a timeout in the combo. 0 means no limit.",
+            default=0,
+        )
+        self.parser.add_argument(
+            "--scanner_timeout",
+            nargs="+",
+            type=parse_scanner_timeout,
+            metavar="SCANNER=SECONDS",
+            help="Timeout of specific scanners, e.g. zap=3600 trufflehog=600. Overrides the combo and --timeout.",
+            default=[],
+        )
+        self.parser.add_argument(
+            "--max_duration",
+            type=float,
+            help="Seconds the whole run may take. Scans still running then are stopped and those not started yet are reported as timed out. 0 means no limit.",
+            default=0,
+        )
+        self.parser.add_argument(
+            "--cancel_on",
+            choices=SEVERITIES[:-1],
+            help="Cancel the remaining scans and exit with code 1 as soon as a scan finds findings of this severity or higher.",
+            default=None,
+        )
+        self.parser.add_argument(
+            "--fail_on",
+            choices=SEVERITIES[:-1],
+            help="Exit with code 1 when there are new findings (all of them without --baseline) of this severity or higher.",
+            default=None,
+        )
         log_group = self.parser.add_mutually_exclusive_group()
         log_group.add_argument(
             "-q",
@@ -65,36 +285,86 @@ class Cosca:
             help="Run in verbose mode (debugging output)",
             default=True,
         )
-        log_group.add_argument(
+        self.parser.add_argument(
+            "--target_type_ttl",
+            type=float,
+            help="Hours during which the detected type of a URL target is reused instead of probing the URL again. 0 disables it.",
+            default=24,
+        )
+        self.parser.add_argument(
             "-f",
             "--force_pull",
             action="store_true",
-            help="Force docker to pull the scanner images from the registry before running the scanners. This ensures that the latest version of the scanners are being are being used. It may also avoid to use tampered images that may reside in the local docker daemon.",
-            default=True,
+            help="Check the registry for newer scanner images before running the scanners, even if they were checked less than --pull_ttl hours ago. This ensures that the latest version of the scanners are being used. It may also avoid to use tampered images that may reside in the local docker daemon.",
+            default=False,
         )
-        log_group.add_argument(
+        self.parser.add_argument(
+            "--pull_ttl",
+            type=float,
+            help="Hours during which a scanner image checked against the registry is considered fresh.",
+            default=24,
+        )
+        self.parser.add_argument(
             "-n",
             "--network",
             help="Docker network to use with the scanner container. Useful to scan local targets.",
             default="",
         )
+        self.parser.add_argument(
+            "--sbom_cache_dir",
+            help="Folder where the SBOMs of the targets are kept, to be reused while the content of a target and the SBOM tool don't change.",
+            default=os.path.join("~", ".cache", "cosca", "sbom"),
+        )
+        self.parser.add_argument(
+            "--sbom_cache_max_size",
+            type=int,
+            help="Maximum size of the SBOM cache in MB. Least recently used SBOMs are evicted first. 0 disables the cache; SBOMs are still shared by the scanners of a run.",
+            default=1024,
+        )
+        self.parser.add_argument(
+            "--docker_hosts",
+            help="Comma separated Docker hosts to spread the scans on, as URL[=WEIGHT] or CONTEXT[=WEIGHT] (e.g. unix:///var/run/docker.sock,tcp://build2:2376=2). Each scan runs on the host with the fewest running scans relative to its weight. Defaults to the local daemon.",
+            default="",
+        )
 
-        args = self.parser.parse_args()
+        self.parser.add_argument(
+            "--resume",
+            metavar="RUN_ID",
+            help="Resume an interrupted or failed run, e.g. cosca_1a2b3c4d. Its completed scans are handed to the output handlers again and only the others are run. The arguments of the run are reused; the arguments given along with --resume override them.",
+            default=None,
+        )
+
+        # The arguments of the output handlers are added by the handlers themselves.
+        # Unknown arguments are rejected in main, once the handlers are loaded.
+        args = self.parser.parse_known_args(self.argv)[0]
+        if args.resume:
+            self.journal = RunJournal(os.path.join(tempfile.gettempdir(), os.path.basename(os.path.normpath(args.resume))))
+            try:
+                self.argv = self.journal.get_argv() + (sys.argv[1:] if self.argv is None else self.argv)
+            except (OSError, ValueError, KeyError) as e:
+                self.parser.error(f"run {args.resume} can't be resumed: {e}")
+            args = self.parser.parse_known_args(self.argv)[0]
+        else:
+            self.journal = None
+        if not args.target and not args.targets_file:
+            self.parser.error("at least one target is required (--target or --targets_file)")
         return args
 
     def get_combo_mappings(self, combo):
         file_path = "combos.json"
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
+            data = load_combos(file_path)
             for c in data["combos"]:
                 if c["name"] == combo:
                     mappings = {}
                     for t in c["mappings"]:
-                        mappings[t["type"]] = t["scanners"]
+                        mappings[t["type"]] = get_nodes(t["scanners"])
                     return mappings
         except json.JSONDecodeError as e:
             self.logger.error("JSONDecodeError: %s", e)
+        except ValueError as e:
+            self.logger.error("Invalid scanners in combo %s: %s", combo, e)
+            sys.exit(1)
         except FileNotFoundError as e:
             self.logger.error("FileNotFoundError: %s", e)
         self.logger.error(
@@ -102,53 +372,383 @@ class Cosca:
         )
         sys.exit(1)
 
+    def get_combo_names(self):
+        try:
+            return {c["name"] for c in load_combos("combos.json")["combos"]}
+        except (OSError, ValueError, KeyError):
+            return set()
+
+    def get_container_resources(self, resource_class=None):
+        """Limits of the scanner containers: those of the resource class of combos.json
+        when the scanner has one, --cpus and --memory otherwise"""
+        cpus, memory = self.args.cpus, self.args.memory
+        if resource_class:
+            classes = load_combos("combos.json").get("resource_classes", {})
+            if resource_class not in classes:
+                self.logger.error("Resource class %s not found in combos.json", resource_class)
+                sys.exit(1)
+            cpus = classes[resource_class].get("cpus", cpus)
+            memory = classes[resource_class].get("memory", memory)
+        resources = {}
+        if cpus:
+            resources["nano_cpus"] = int(cpus * 1e9)
+        if memory:
+            resources["mem_limit"] = memory
+        return resources
+
+    def get_combo_images(self, mappings):
+        """Returns the images of every scanner of the combo"""
+        images = set()
+        for nodes in mappings.values():
+            for node in nodes:
+                try:
+                    module = importlib.import_module(f"scanners.{node.name}")
+                except ModuleNotFoundError:
+                    # Reported when a target actually needs the scanner
+                    continue
+                images.update(module.CustomScanner.get_images())
+        return images
+
+    def pull_images(self, combo):
+        """Pulls the images of the scanners of the combo that weren't already checked in this run"""
+        images = self.get_combo_images(self.get_combo_mappings(combo)) - self.pulled_images
+        if not images:
+            return
+        self.pulled_images.update(images)
+        self.logger.info("Checking %d scanner images...", len(images))
+        for host in self.host_pool.hosts:
+            puller = ImagePuller(
+                os.path.join("~", ".cache", "cosca", "pulls.json"),
+                ttl=self.args.pull_ttl * 3600,
+                jobs=max(4, self.args.jobs),
+                log_level=self.log_level,
+                host=host,
+                metrics=self.metrics,
+            )
+            failed = puller.pull_all(images, force=self.args.force_pull)
+            if failed:
+                self.logger.warning("Scanners using %s may fail on %s", ", ".join(failed), host)
+
+    def get_scanner_instance(self, scanner, target_type, resource_class=None):
+        try:
+            module = importlib.import_module(f"scanners.{scanner}")
+        except ModuleNotFoundError:
+            self.logger.error(
+                "Scanner module scanners.%s not found. Please implement a class inherited from Scanner in scanners/%s.py",
+                scanner,
+                scanner,
+            )
+            sys.exit(1)
+        try:
+            cls = getattr(module, "CustomScanner")
+        except AttributeError as e:
+            self.logger.error("Error while invoking scanner: %s", e)
+            sys.exit(1)
+        instance = cls(
+            log_level=self.log_level,
+            target_type=target_type,
+            resources=self.get_container_resources(resource_class),
+        )
+        instance.sbom_store = self.sbom_store
+        instance.metrics = self.metrics
+        return instance
+
+    def get_cache_key(self, instance, target):
+        """Returns the cache key of a scan, or None if the scan can't be cached"""
+        fingerprint = self.fingerprints.get(target, instance.target_type)
+        if not fingerprint:
+            return None
+        client = instance.get_docker_client()
+        digests = [docker_client.get_image_digest(i, client) for i in instance.get_images()]
+        if not all(digests):
+            return None
+        return ScanCache.get_key(
+            instance.NAME,
+            digests,
+            instance.get_source_hash(),
+            instance.target_type.value,
+            fingerprint,
+        )
+
+    def run_incremental_scan(self, instance, target, scanner_sub_dir, network):
+        """Scans only the files changed since the last incremental scan of the target
+        and merges the findings with those of the unchanged files"""
+        baseline = IncrementalBaseline(self.args.incremental_dir, target, instance.NAME)
+        files = baseline.hash_files()
+        client = instance.get_docker_client()
+        images = [docker_client.get_image_digest(i, client) for i in instance.get_images()]
+        changes = baseline.get_changes(files, images, self.args.incremental_ref)
+        if changes is None:
+            self.logger.info("No usable baseline for %s on %s. Running a full scan.", instance.NAME, target)
+            instance.scan(self.snapshots.get_path(target), scanner_sub_dir, network)
+        else:
+            changed, removed = changes
+            self.logger.info(
+                "%s: %d changed and %d removed files since the baseline of %s",
+                instance.NAME, len(changed), len(removed), target,
+            )
+            if changed:
+                instance.scan_paths = changed
+                instance.scan(self.snapshots.get_path(target), scanner_sub_dir, network)
+                instance.merge_reports(baseline.get_report_path(), changed | removed)
+            else:
+                report_path = os.path.join(scanner_sub_dir, os.path.basename(baseline.get_report_path()))
+                instance.load_state(
+                    {"report_path": report_path, "output_report_path": report_path, "stdout": []},
+                    scanner_sub_dir,
+                )
+                if removed:
+                    instance.merge_reports(baseline.get_report_path(), removed)
+                else:
+                    shutil.copyfile(baseline.get_report_path(), report_path)
+        baseline.save(files, images, instance.report_path)
+
+    def get_deadline(self, node):
+        """Deadline of a scan starting now: its timeout (--scanner_timeout, the combo
+        or --timeout), bounded by the end of the run (--max_duration)"""
+        timeout = self.scanner_timeouts.get(node.name, node.timeout or self.args.timeout)
+        deadlines = [d for d in (timeout and time.monotonic() + timeout, self.run_deadline) if d]
+        return min(deadlines) if deadlines else None
+
+    def cancel_scans(self, reason, source):
+        """Cancels the running scans, except source, and those not started yet"""
+        with self.active_lock:
+            if self.cancel_reason:
+                return
+            self.cancel_reason = reason
+            instances = [i for i in self.active_scans if i is not source]
+        self.logger.warning("%s. Cancelling the remaining scans.", reason)
+        for instance in instances:
+            instance.cancel()
+
+    def run_scan(self, instance, target, scanner_sub_dir, network, node=None, state=None):
+        """Runs a scan in a worker thread. state is the scanner state of the scan
+        completed by the resumed run, which is restored instead of scanning again.
+        Errors of the scanner are recorded in instance.error instead of ending the run."""
+        node = node or Node(instance.NAME)
+        with self.active_lock:
+            if self.cancel_reason:
+                instance.cancelled = True
+                return instance
+            self.active_scans.add(instance)
+        instance.deadline = self.get_deadline(node)
+        try:
+            if state is not None:
+                instance.load_state(state, scanner_sub_dir)
+            else:
+                # The host is chosen when the scan starts, so it reflects the scans running at that time
+                with self.host_pool.use() as host:
+                    instance.docker_host = host
+                    if len(self.host_pool.hosts) > 1:
+                        self.logger.info("Running %s on %s", instance.NAME, host)
+                    with self.metrics.timer("scan", scanner=instance.NAME, target_id=instance.get_target_id(target)):
+                        self.scan_or_restore(instance, target, scanner_sub_dir, network)
+            # The report is parsed here, in the worker, and its findings reused by the
+            # main thread. An unreadable report is recorded as an error of the scan.
+            instance.load_findings()
+        except ScanStopped as e:
+            log = self.logger.error if instance.timed_out else self.logger.warning
+            log("%s on %s: %s", instance.NAME, target, e)
+            return instance
+        except (Exception, SystemExit) as e:  # pylint: disable=broad-except
+            # Scanners exit on errors. Only this scan fails, the others go on.
+            instance.error = f"exited with code {e.code}" if isinstance(e, SystemExit) else str(e) or type(e).__name__
+            self.logger.error("%s failed on %s: %s", instance.NAME, target, instance.error)
+            return instance
+        finally:
+            with self.active_lock:
+                self.active_scans.discard(instance)
+        if self.args.cancel_on:
+            count = baseline.count_at_or_above(instance.count_findings(), self.args.cancel_on)
+            if count:
+                self.cancel_scans(
+                    f"{instance.NAME} found {count} findings of {self.args.cancel_on} severity or higher on {target}",
+                    instance,
+                )
+        if node.fail_fast:
+            count = baseline.count_at_or_above(instance.count_findings(), node.fail_fast)
+            if count:
+                instance.failed_gate = True
+                self.logger.warning(
+                    "%s found %d findings of %s severity or higher on %s. Skipping the scanners that need it.",
+                    instance.NAME, count, node.fail_fast, target,
+                )
+        return instance
+
+    def has_passed(self, instance):
+        """Whether the scanners that need this scan can run"""
+        return not (instance.error or instance.timed_out or instance.cancelled or instance.failed_gate)
+
+    def scan_or_restore(self, instance, target, scanner_sub_dir, network):
+        cache_key = self.get_cache_key(instance, target) if self.cache else None
+        if cache_key:
+            state = self.cache.restore(cache_key, scanner_sub_dir)
+            if state:
+                self.logger.info("Reusing cached %s results for %s", instance.NAME, target)
+                instance.load_state(state, scanner_sub_dir)
+                return instance
+        try:
+            if (self.args.incremental and instance.INCREMENTAL
+                    and instance.target_type == TargetType.DIRECTORY):
+                self.run_incremental_scan(instance, target, scanner_sub_dir, network)
+            else:
+                instance.scan(self.snapshots.get_path(target), scanner_sub_dir, network)
+        except AttributeError as e:
+            self.logger.error("Error while invoking scanner: %s", e)
+            sys.exit(1)
+        if cache_key:
+            self.cache.store(cache_key, scanner_sub_dir, instance.get_state(scanner_sub_dir))
+        return instance
+
+    def get_status(self, instance, result):
+        if isinstance(result, Skipped):
+            return "skipped"
+        if instance.error:
+            return "error"
+        if instance.timed_out:
+            return "timeout"
+        if instance.cancelled:
+            return "cancelled"
+        return COMPLETED
+
+    def process_scan(self, instance, target, scanner_sub_dir, outputs, result=None):
+        """Runs in the main thread, in submission order, so output handlers never run concurrently.
+        result is Skipped when a scan the instance needs failed."""
+        report = {
+            "output": [],
+            "target": target,
+            "target_id": instance.get_target_id(target),
+            "scanner": instance.NAME,
+        }
+        status = self.get_status(instance, result)
+        if status != COMPLETED:
+            if isinstance(result, Skipped):
+                self.logger.warning("%s skipped on %s: %s", instance.NAME, target, result.reason)
+            self.incomplete_scans += 1
+            if status in ("error", "timeout"):
+                self.failed_scans += 1
+            self.journal.record(target, instance.NAME, status, error=instance.error)
+            if instance.error:
+                report["error"] = instance.error
+            return {**report, "status": status}
+        report["output"] = instance.process_outputs(outputs, target)
+        self.findings_index.add(target, instance.get_findings())
+        self.journal.record(target, instance.NAME, status, state=instance.get_state(scanner_sub_dir))
+        return {**report, "status": status, "aux_args": instance.get_aux_args()}
+
+    def is_allowed_target(self, target, target_type):
+        """Whether target may be scanned. Any target may be by default."""
+        return True
+
     def trigger_scans(self, target, combo, working_dir, outputs, network):
-        mappings = self.get_combo_mappings(combo)
+        """Scans the targets as they are read from the target iterable.
+        target yields TargetSpec objects or plain target strings."""
+        mappings_by_combo = {}
         reports = []
+        pending = set()
+        queued = set()
+        scheduler = ScanScheduler(jobs=self.args.jobs, passed=self.has_passed)
         self.logger.info("Combo: %s", combo)
-        for i_target, t in enumerate(target):
-            self.logger.info("Scanning target #%d out of %d", i_target + 1, len(target))
-            target_type = TargetType.get_target_type(t)
-            self.logger.info("Target: %s", t)
-            self.logger.info("Target type: %s", target_type.value)
-            self.logger.info("Working directory: %s", working_dir)
-            for index, scanner in enumerate(mappings[target_type.value]):
-                self.logger.info(
-                    "Running scanner #%d out of %d",
-                    index + 1,
-                    len(mappings[target_type.value]),
-                )
-                try:
-                    self.logger.info("Scanner: %s", scanner)
-                    scanner_sub_dir = os.path.join(working_dir, scanner)
-                    os.makedirs(scanner_sub_dir)
-                    try:
-                        module = importlib.import_module(f"scanners.{scanner}")
-                    except ModuleNotFoundError:
-                        self.logger.error(
-                            "Scanner module scanners.%s not found. Please implement a class inherited from Scanner in scanners/%s.py",
-                            scanner,
-                            scanner,
-                        )
-                        sys.exit(1)
-                    cls = getattr(module, "CustomScanner")
-                    instance = cls(log_level=self.log_level, target_type=target_type)
-                    output_details = instance.scan(t, scanner_sub_dir, outputs, network)
-                    aux_args = instance.get_aux_args()
-                    reports.append(
-                        {
-                            "output": output_details,
-                            "target": t,
-                            "target_id": instance.get_target_id(t),
-                            "scanner": scanner,
-                            "aux_args": aux_args,
-                        }
+        self.logger.info("Working directory: %s", working_dir)
+        try:
+            for i_target, spec in enumerate(target):
+                if self.cancel_reason:
+                    self.logger.warning("Run cancelled. The remaining targets aren't scanned.")
+                    break
+                if not isinstance(spec, TargetSpec):
+                    spec = TargetSpec(spec)
+                self.logger.info("Scanning target #%d", i_target + 1)
+                t, target_type = spec.target, spec.target_type
+                if target_type is None:
+                    t, target_type = TargetType.parse_target(t)
+                if target_type is None:
+                    with self.metrics.timer("target_type", target=t):
+                        target_type = TargetType.get_target_type(t, self.target_type_cache)
+                if target_type is None:
+                    self.logger.warning("Couldn't detect the type of target %s. Skipping it.", t)
+                    continue
+                target_combo = spec.combo or combo
+                if spec.combo and spec.combo not in mappings_by_combo and spec.combo not in self.get_combo_names():
+                    self.logger.warning("Combo %s of target %s not found in combos.json. Skipping it.", spec.combo, t)
+                    continue
+                if target_combo not in mappings_by_combo:
+                    mappings_by_combo[target_combo] = self.get_combo_mappings(target_combo)
+                    # Combos of the targets file are only known once read
+                    with self.metrics.timer("pull"):
+                        self.pull_images(target_combo)
+                mappings = mappings_by_combo[target_combo]
+                self.logger.info("Target: %s", t)
+                self.logger.info("Target type: %s", target_type.value)
+                if target_type.value not in mappings:
+                    self.logger.warning(
+                        "Combo %s has no scanners for %s targets. Skipping %s",
+                        target_combo, target_type.value, t,
+                    )
+                    continue
+                if not self.is_allowed_target(t, target_type):
+                    self.logger.warning("Target %s isn't allowed. Skipping it.", t)
+                    continue
+                # Scans of the target by scanner, for the scanners that need them
+                scans = {}
+                nodes = mappings[target_type.value]
+                if target_type == TargetType.DIRECTORY and any(
+                        (t, n.name) not in self.completed_scans for n in nodes):
+                    with self.metrics.timer("snapshot", target=t):
+                        self.snapshots.take(t, working_dir)
+                for index, node in enumerate(nodes):
+                    self.logger.info(
+                        "Queueing scanner #%d out of %d: %s",
+                        index + 1,
+                        len(nodes),
+                        node.name,
+                    )
+                    instance = self.get_scanner_instance(node.name, target_type, node.resources)
+                    scanner_sub_dir = os.path.join(
+                        working_dir, instance.get_target_id(t), node.name
                     )
-                except (AttributeError, ModuleNotFoundError) as e:
-                    self.logger.error("Error while invoking scanner: %s", e)
-                    sys.exit(1)
+                    if (t, node.name) in queued:
+                        self.logger.warning("%s already scanned %s. Skipping duplicate.", node.name, t)
+                        continue
+                    queued.add((t, node.name))
+                    state = self.completed_scans.get((t, node.name))
+                    if state is not None:
+                        self.logger.info("%s already scanned %s in the resumed run", node.name, t)
+                    else:
+                        # Leftovers of an unfinished scan of the resumed run
+                        shutil.rmtree(scanner_sub_dir, ignore_errors=True)
+                        os.makedirs(scanner_sub_dir)
+                    scans[node.name] = scheduler.submit(
+                        (t, instance, scanner_sub_dir), self.run_scan, instance, t, scanner_sub_dir,
+                        network, node, state,
+                        needs=[scans[n] for n in node.needs if n in scans],
+                    )
+                    pending.add(instance)
+                    for (t_done, instance_done, dir_done), result in scheduler.ready():
+                        pending.discard(instance_done)
+                        reports.append(self.process_scan(instance_done, t_done, dir_done, outputs, result))
+            for (t_done, instance_done, dir_done), result in scheduler.drain():
+                pending.discard(instance_done)
+                reports.append(self.process_scan(instance_done, t_done, dir_done, outputs, result))
+        except (KeyboardInterrupt, SystemExit):
+            # Unblock the workers waiting on their containers before joining them,
+            # and don't let them start new ones. Only the scans of this run, other
+            # runs of the service keep going.
+            for instance in pending:
+                instance.cancel()
+            raise
+        finally:
+            scheduler.shutdown()
         return reports
 
+    def read_targets(self):
+        try:
+            # An invalid line doesn't stop the scans of a long targets file
+            yield from iter_targets(self.args.target, self.args.targets_file,
+                                    on_error=lambda e: self.logger.warning("%s. Skipping it.", e))
+        except (ValueError, OSError) as e:
+            self.logger.error("Couldn't read targets: %s", e)
+            sys.exit(1)
+
     def get_filenames(self, folder_name):
         filenames = []
         for filename in os.listdir(folder_name):
@@ -156,7 +756,65 @@ class Cosca:
                 filenames.append(os.path.splitext(filename)[0])
         return filenames
 
-    def main(self):
+    def compare_with_baseline(self, write=True):
+        """Returns the new, fixed and unchanged findings count by severity, or None without --baseline.
+        The baseline of an interrupted run isn't written, as it would miss findings."""
+        fingerprints = baseline.get_fingerprints(self.findings_index)
+        comparison = None
+        if self.args.baseline:
+            try:
+                comparison = baseline.compare(fingerprints, baseline.load_baseline(self.args.baseline))
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.error("Couldn't read the baseline %s: %s", self.args.baseline, e)
+                sys.exit(1)
+            self.logger.info(
+                "Compared to the baseline: %d new, %d fixed and %d unchanged findings",
+                sum(comparison["new"]), sum(comparison["fixed"]), sum(comparison["unchanged"]),
+            )
+        if self.args.write_baseline and write:
+            path = baseline.write_baseline(self.args.write_baseline, fingerprints)
+            self.logger.info("Baseline written to %s", path)
+        return comparison
+
+    def get_exit_code(self, summary):
+        """1 when --fail_on is set and there are new findings of that severity or higher,
+        when the run was cancelled by --cancel_on or when scans failed"""
+        if self.cancel_reason:
+            self.logger.error("Run cancelled: %s", self.cancel_reason)
+            return 1
+        if self.failed_scans:
+            self.logger.error("%d scans failed or timed out", self.failed_scans)
+            return 1
+        if not self.args.fail_on:
+            return 0
+        if summary.get("baseline"):
+            counts = summary["baseline"]["new"]
+        else:
+            counts = [sum(c) for c in zip(*(t["unique"] for t in summary["targets"].values()))]
+        failing = baseline.count_at_or_above(counts, self.args.fail_on) if counts else 0
+        if failing:
+            self.logger.error("%d new findings of severity %s or higher", failing, self.args.fail_on)
+            return 1
+        return 0
+
+    def finalize_outputs(self, outputs, completed=True):
+        summary = self.findings_index.get_summary()
+        if summary["duplicates"]:
+            self.logger.info(
+                "%d findings, %d after merging the findings reported by more than one scanner",
+                summary["raw"], summary["unique"],
+            )
+        if self.incomplete_scans and self.args.write_baseline:
+            self.logger.warning("%d scans timed out or were skipped. The baseline isn't written.",
+                                self.incomplete_scans)
+        summary["baseline"] = self.compare_with_baseline(write=completed and not self.incomplete_scans)
+        for o in outputs:
+            o.process_summary(summary)
+            with self.metrics.timer("finalize", handler=o.name):
+                o.finalize()
+        return summary
+
+    def load_outputs(self):
         outputs = []
         for output in self.args.output:
             try:
@@ -169,29 +827,89 @@ class Cosca:
                 )
                 sys.exit(1)
             cls = getattr(module, "CustomOutputHandler")
-            instance = cls(output, self.parser, self.log_level)
+            instance = cls(output, self.parser, self.log_level, self.argv)
             outputs.append(instance)
-        with tempfile.TemporaryDirectory(prefix="cosca_") as tmp_dir:
-            json_summary = self.trigger_scans(
-                self.args.target,
-                self.args.combo,
-                tmp_dir,
-                outputs,
-                network=self.args.network,
-            )
-            if self.args.quiet:
-                print(json.dumps(json_summary))
-            self.logger.debug(json_summary)
+        self.parser.parse_args(self.argv)
+        return outputs
 
-    def is_docker_daemon_running(self):
+    def start_run(self):
+        """Creates the working directory of the run, or reopens the one of the resumed run,
+        and returns it"""
+        if self.journal:
+            self.completed_scans = self.journal.get_completed()
+            self.logger.info("Resuming run %s: %d scans already completed",
+                             self.journal.run_id, len(self.completed_scans))
+        else:
+            self.journal = RunJournal(tempfile.mkdtemp(prefix="cosca_"))
+        self.journal.start(sys.argv[1:] if self.argv is None else self.argv)
+        return self.journal.run_dir
+
+    def end_run(self, succeeded):
+        """Removes the working directory of a successful run. The one of a failed or
+        interrupted run is kept, so it can be resumed."""
+        # Snapshots are taken again by a resumed run
+        self.snapshots.remove_all()
+        if self.target_type_cache:
+            self.target_type_cache.save()
+        if succeeded:
+            shutil.rmtree(self.journal.run_dir, ignore_errors=True)
+        else:
+            self.logger.warning(
+                "Run the scans that didn't complete again with --resume %s", self.journal.run_id)
+
+    def run(self):
+        """Runs the scans and returns the exit code and the details of every scan"""
+        outputs = self.load_outputs()
+        if self.args.max_duration:
+            self.run_deadline = time.monotonic() + self.args.max_duration
         try:
-            client = docker.from_env()
-            client.ping()
-            return True
-        except DockerException:
-            return False
+            with self.metrics.timer("run"):
+                with self.metrics.timer("pull"):
+                    self.pull_images(self.args.combo)
+                run_dir = self.start_run()
+                completed = False
+                try:
+                    json_summary = self.trigger_scans(
+                        self.read_targets(),
+                        self.args.combo,
+                        run_dir,
+                        outputs,
+                        network=self.args.network,
+                    )
+                    completed = True
+                finally:
+                    # Also write the outputs of the finished scans when the run is interrupted
+                    summary = self.finalize_outputs(outputs, completed)
+                    self.end_run(completed and not self.failed_scans)
+                self.logger.debug(json_summary)
+        finally:
+            if self.args.metrics_file:
+                self.metrics.write(self.args.metrics_file)
+                self.logger.info("Metrics written to %s", self.args.metrics_file)
+        return self.get_exit_code(summary), json_summary
+
+    def main(self):
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+        exit_code, json_summary = self.run()
+        if self.args.quiet:
+            print(json.dumps(json_summary))
+        sys.exit(exit_code)
+
+    def is_docker_daemon_running(self):
+        for host in self.host_pool.hosts:
+            try:
+                host.get_client().ping()
+            except DockerException as e:
+                if host.url:
+                    self.logger.error("Docker host %s is not reachable: %s", host, e)
+                return False
+        return True
 
 
 if __name__ == "__main__":
-    app = Cosca()
-    app.main()
+    if sys.argv[1:2] == ["serve"]:
+        from service import CoscaService
+        CoscaService(sys.argv[2:]).serve()
+    else:
+        app = Cosca()
+        app.main()
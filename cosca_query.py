@@ -0,0 +1,44 @@
+import argparse
+import sys
+from common import results_db
+from common.findings import SEVERITIES
+from common.renderers import format_table
+
+# Queries the history of the results stored by the sqlite output handler (-o sqlite).
+#   python cosca_query.py trend --weeks 8
+#   python cosca_query.py time_to_fix --target https://example.com
+
+
+def trend(conn, args):
+    rows = [[target, week] + counts
+            for (target, week), counts in results_db.get_weekly_findings(conn, args.target, args.weeks).items()]
+    sys.stdout.writelines(format_table(["Target", "Week"] + [s.capitalize() for s in SEVERITIES], rows))
+
+
+def time_to_fix(conn, args):
+    rows = [[SEVERITIES[severity].capitalize(), fixed, still_open,
+             f"{avg_days:.1f}" if avg_days is not None else "-",
+             f"{max_days:.1f}" if max_days is not None else "-"]
+            for severity, fixed, still_open, avg_days, max_days in results_db.get_time_to_fix(conn, args.target)]
+    sys.stdout.writelines(format_table(["Severity", "Fixed", "Open", "Avg days to fix", "Max days to fix"], rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the history of cosca results stored with -o sqlite.")
+    parser.add_argument("--sqlite_db", help="SQLite database written by the sqlite output handler", default=results_db.DEFAULT_PATH)
+    parser.add_argument("--target", help="Only show this target", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    trend_parser = subparsers.add_parser("trend", help="Findings of each target per week")
+    trend_parser.add_argument("--weeks", type=int, help="Number of weeks to show", default=12)
+    trend_parser.set_defaults(func=trend)
+    subparsers.add_parser("time_to_fix", help="Days from the first scan that reported a finding to the first scan that no longer did, by severity").set_defaults(func=time_to_fix)
+    args = parser.parse_args()
+    conn = results_db.connect(args.sqlite_db)
+    try:
+        args.func(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,10 @@ class OutputHandler(ABC):
     add '-o FILE_NAME'  cosca command (don't include the .py extension).
     """
 
-    def __init__(self, name, parser,log_level=logging.INFO):
+    def __init__(self, name, parser,log_level=logging.INFO, argv=None):
         self.name = name
         self.parser = parser
+        self.argv = argv
         self.logger = setup_logger(name,'📝',level=log_level)
         self.logger.debug("Output Handler initialized.")
         self.setup()
@@ -24,6 +25,12 @@ class OutputHandler(ABC):
         """This method must be overriden to prepare the variables necessary 
         to generate an specific output"""
 
+    def parse_args(self):
+        """Parses the command line once the handler added its arguments to the parser.
+        Arguments of handlers not set up yet are ignored here; cosca rejects unknown
+        arguments after all the handlers are set up."""
+        return self.parser.parse_known_args(self.argv)[0]
+
     @abstractmethod
     def process_files(self, report_path, target, scanner, aux_args) -> Dict[str, str]:
         """This method must be overriden and must return a boolean
@@ -37,5 +44,21 @@ class OutputHandler(ABC):
     @abstractmethod
     def process_stdout(self, stdout):
         """This method must be overriden and must return a boolean
-          depending on the processing result
-          """
\ No newline at end of file
+          depending on the processing result.
+          stdout is an iterable of the lines printed by the scanner containers
+          (a LogStream backed by the log files in the scanner working directory)
+          """
+
+    def process_findings(self, findings, target, scanner):
+        """Override it to process the normalized findings of a scan instead of parsing
+        the report file again. findings is an iterator of common.findings.Finding,
+        shared with the other handlers, that can be iterated once."""
+
+    def process_summary(self, summary):
+        """Called once after all the scans, before finalize, with the findings of
+        the run deduplicated across scanners (see common.dedupe.FindingIndex.get_summary)"""
+
+    def finalize(self):
+        """Called once after all the scans of the run were processed. Override it
+        to write outputs that summarize the whole run instead of rewriting them
+        after every scanner result."""
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import sys
 import tempfile
 from output_handler import OutputHandler
 
@@ -9,12 +10,14 @@ class CustomOutputHandler(OutputHandler):
     """
     def setup(self):
         self.tmp_dir = tempfile.gettempdir()
-        self.args = self.parser.parse_args()
+        self.args = self.parse_args()
 
     def process_files(self, report_path, target, scanner, aux_args):
         return {self.name : []}
 
     def process_stdout(self, stdout):
         self.logger.debug("Standard output from container START")
-        print(stdout)
+        for line in stdout:
+            sys.stdout.write(line)
+        sys.stdout.flush()
         self.logger.debug("Standard output from container END")
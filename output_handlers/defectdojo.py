@@ -1,15 +1,41 @@
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import string
 import sys
 import os
+import json
+import uuid
+import fcntl
+import shutil
 import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from output_handler import OutputHandler
 
 class CustomOutputHandler(OutputHandler):
     """
-    Upload cosca scan output to DefectDojo
+    Upload cosca scan output to DefectDojo.
+    Reports are copied to a spool folder and uploaded in the background while
+    the scans go on. Spooled reports that couldn't be uploaded (e.g. cosca was
+    killed or DefectDojo was down) are uploaded again by the next run.
+    A report of a scanner on a target already uploaded to the engagement is
+    reimported into the same test, so DefectDojo updates it instead of
+    duplicating the findings. Uploads of the same test are serialized, so only
+    the first one creates it.
+    Runs sharing the spool folder each upload the reports they claimed: a
+    spooled report is locked by the run uploading it until it's removed.
     """
+
+    BACKOFF_FACTOR = 2
+    # Statuses for which a spooled report is kept to be uploaded by the next run
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    # Statuses for which an import is retried right away: DefectDojo didn't process
+    # the request. Imports aren't idempotent, so not after 5xx that may follow a commit.
+    IMPORT_RETRY_STATUS = (429, 503)
+    TESTS_FILE = "tests.json"
+
     def setup(self):
         self.dd_url = os.getenv('DEFECTDOJO_URL', '')
         self.api_url = f'{self.dd_url}/api/v2'
@@ -29,29 +55,191 @@ class CustomOutputHandler(OutputHandler):
                             help="Either this argument or the environment variable DEFECTDOJO_PRODUCT_TYPE_ID is required if --defectdojo is set.", default=dd_product_type_id)
         self.parser.add_argument(
             "--dd_engagement_id", help="Either this argument or the environment variable DEFECTDOJO_ENGAGEMENT_ID is required if --defectdojo is set.", default=dd_engagement_id)
-        self.args = self.parser.parse_args()
+        self.parser.add_argument(
+            "--dd_concurrency", type=int, help="Maximum number of reports uploaded to DefectDojo at the same time.", default=4)
+        self.parser.add_argument(
+            "--dd_retries", type=int, help="Times an upload is retried when DefectDojo answers 429 or 503, or can't be connected to, with exponential backoff.", default=5)
+        self.parser.add_argument(
+            "--dd_spool_dir", help="Folder where reports are kept until they are uploaded to DefectDojo.", default=os.path.join("~", ".cache", "cosca", "defectdojo"))
+        self.args = self.parse_args()
         if not self.args.dd_url:
             self.parser.error(
                 "--dd_url or DEFECTDOJO_URL environment variable required when --defectdojo (-d) is specified")
         if not self.args.dd_api_key:
             self.parser.error(
                 "--dd_api_key or DEFECTDOJO_API_KEY environment variable required when --defectdojo (-d) is specified")
+        self.dd_url = self.args.dd_url.rstrip("/")
+        self.api_url = f'{self.dd_url}/api/v2'
+        self.headers = {
+            'Authorization': f'Token {self.args.dd_api_key}'
+        }
+        self.spool_dir = os.path.expanduser(self.args.dd_spool_dir)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # Creating product types, products and engagements isn't retried
+        self.session = self.create_session(retries=0)
+        self.import_session = self.create_session(retries=self.args.dd_retries)
+        self.lock = threading.Lock()
+        self.test_locks = {}
+        self.tests = self.load_tests()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.args.dd_concurrency), thread_name_prefix="defectdojo")
+        self.uploads = []
+        self.resume_spooled_uploads()
+
+    def create_session(self, retries):
+        retry = Retry(
+            total=retries,
+            # A request that was sent may have been processed
+            read=0,
+            backoff_factor=self.BACKOFF_FACTOR,
+            status_forcelist=self.IMPORT_RETRY_STATUS,
+            # Imports are POST requests, which urllib3 doesn't retry by default
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, self.args.dd_concurrency), max_retries=retry)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @staticmethod
+    def lock_dir(path, blocking=True):
+        """Takes an exclusive lock on the folder, released when the returned descriptor is
+        closed or the process ends. Returns None when another descriptor holds it."""
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def load_tests(self):
+        """Ids of the DefectDojo tests created by previous uploads, by engagement, scan type and test title"""
+        try:
+            with open(os.path.join(self.spool_dir, self.TESTS_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_test(self, key, test_id):
+        """Adds the test to the tests file, along with those saved by other runs in the meantime"""
+        with self.lock:
+            fd = self.lock_dir(self.spool_dir)
+            try:
+                self.tests = {**self.load_tests(), key: test_id}
+                tmp_path = os.path.join(self.spool_dir, f".{self.TESTS_FILE}.{uuid.uuid4().hex}")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.tests, f)
+                os.replace(tmp_path, os.path.join(self.spool_dir, self.TESTS_FILE))
+            finally:
+                os.close(fd)
+
+    def resume_spooled_uploads(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            job_dir = os.path.join(self.spool_dir, name)
+            try:
+                claim = self.lock_dir(job_dir, blocking=False)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if claim is None:
+                # Being uploaded by another run
+                continue
+            try:
+                with open(os.path.join(job_dir, "job.json"), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                # Uploaded by the run that held it, or still being spooled
+                os.close(claim)
+                continue
+            if job["dd_url"] != self.dd_url:
+                os.close(claim)
+                continue
+            self.logger.info("Resuming upload of %s from a previous run", job["file_name"])
+            self.uploads.append(self.executor.submit(self.upload, job_dir, claim))
+
+    def spool(self, report_path, job):
+        """Copies the report to the spool folder, so it can be uploaded after the scan folder
+        is removed. Returns the folder of the upload and its claim, held by this run."""
+        job_dir = os.path.join(self.spool_dir, f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}")
+        os.makedirs(job_dir)
+        claim = self.lock_dir(job_dir)
+        shutil.copyfile(report_path, os.path.join(job_dir, job["file_name"]))
+        with open(os.path.join(job_dir, "job.json"), 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        return job_dir, claim
+
+    def upload(self, job_dir, claim):
+        """Imports a spooled report claimed by this run, and releases the claim. Returns the link
+        to the DefectDojo test, or None if the upload failed. The report stays in the spool
+        folder when DefectDojo couldn't be reached."""
+        try:
+            with open(os.path.join(job_dir, "job.json"), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+            key = f'{job["engagement"]}|{job["scan_type"]}|{job["test_title"]}'
+            with self.lock:
+                test_lock = self.test_locks.setdefault(key, threading.Lock())
+            with test_lock:
+                return self.import_report(job_dir, job, key)
+        finally:
+            os.close(claim)
+
+    def import_report(self, job_dir, job, key):
+        data = {
+            'scan_type': job["scan_type"],
+            'active': 'true',
+            'verified': 'true',
+        }
+        test_id = self.tests.get(key)
+        if test_id:
+            url = f"{self.api_url}/reimport-scan/"
+            data['test'] = test_id
+        else:
+            url = f"{self.api_url}/import-scan/"
+            data['engagement'] = job["engagement"]
+            data['test_title'] = job["test_title"]
+        try:
+            with open(os.path.join(job_dir, job["file_name"]), 'rb') as file:
+                response = self.import_session.post(url, files={'file': file}, data=data, timeout=60*10)
+        except requests.exceptions.RequestException as e:
+            self.logger.error("Failed to upload %s. It will be uploaded in the next run. %s", job["file_name"], e)
+            return None
+        if test_id and response.status_code == 404:
+            # The test was deleted in DefectDojo. Import it again as a new test.
+            with self.lock:
+                self.tests.pop(key, None)
+            return self.import_report(job_dir, job, key)
+        if response.status_code in (200, 201):
+            test_id = response.json().get('test', test_id)
+            self.save_test(key, test_id)
+            shutil.rmtree(job_dir, ignore_errors=True)
+            link = f"{self.dd_url}/test/{test_id}"
+            self.logger.info('Check scan results %s', link)
+            return link
+        self.logger.error('Failed to upload scan %s. Status code: %s', job["file_name"], str(response.status_code))
+        self.logger.error(response.content.decode('utf-8', errors='replace'))
+        if response.status_code not in self.RETRY_STATUS:
+            # DefectDojo rejected the report. Uploading it again won't help.
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return None
 
     def process_stdout(self, stdout):
         pass
 
     def process_files(self, report_path, target, scanner, aux_args):
         """
-        Import scan report into DefectDojo.
+        Queues the import of a scan report into DefectDojo.
 
         Args:
-            engagement_id (int): import the report into this Defectdojo engagement.
-            scan_type (str): scan type format. 
+            report_path (str): path to the report file to be imported.
+            target (str): scanned target. Along with the scanner, it names the DefectDojo test.
+            scanner (str): scanner name.
+            aux_args (dict): defectdojo_format is the scan type format.
                 Reference https://documentation.defectdojo.com/dev/integrations/parsers/file/
-            file_path (str): path to the report file to be imported.
 
         Returns:
-            str: Defectdojo's response
+            dict: the spool folder of the upload
         """
         self.logger.debug("Generating output...")
         random_id=''.join(random.choices(string.ascii_letters + string.digits, k=4))
@@ -70,27 +258,30 @@ class CustomOutputHandler(OutputHandler):
                     f"P{random_id}", "Dummy product",  self.args.dd_product_type_id)
             self.args.dd_engagement_id = self.create_engagement("Temporary engagement", "Temporary engagement to facilitate importing tasks", self.args.dd_product_id)
 
-        url = f"{self.api_url}/import-scan/"
-        with open(report_path, 'rb') as file:
-            files = {'file': file}
-            data = {
-                'engagement': self.args.dd_engagement_id,
-                'scan_type': aux_args["defectdojo_format"],
-                'active': 'true',
-                'verified': 'true'
-            }
-            response = requests.post(
-                url, headers=self.headers, files=files, data=data, timeout=60*10)
-            if response.status_code == 201:
-                self.logger.debug('Scan uploaded successfully!')
-                response_data = response.json()
-                import_results_link=f"{self.dd_url}/test/{response_data.get('test')}"
-                self.logger.info('Check scan results %s/test/%s',self.dd_url,response_data.get('test'))
-            else:
-                self.logger.error('Failed to upload scan. Status code: %s', str(response.status_code))
-                self.logger.error(response.content.decode('utf-8'))
-
-            return {self.name : [{"link": import_results_link}]}
+        job_dir, claim = self.spool(report_path, {
+            "dd_url": self.dd_url,
+            "engagement": self.args.dd_engagement_id,
+            "scan_type": aux_args["defectdojo_format"],
+            "test_title": f"{scanner} {target}",
+            "file_name": os.path.basename(report_path),
+        })
+        self.uploads.append(self.executor.submit(self.upload, job_dir, claim))
+        return {self.name : [{"spool": job_dir}]}
+
+    def finalize(self):
+        """Waits for the pending uploads"""
+        if self.uploads:
+            self.logger.info("Waiting for %d DefectDojo uploads...", sum(not u.done() for u in self.uploads))
+        failed = 0
+        for upload in self.uploads:
+            try:
+                failed += upload.result() is None
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.error("Failed to upload a report: %s", e)
+                failed += 1
+        if failed:
+            self.logger.error("%d reports couldn't be uploaded to DefectDojo", failed)
+        self.uploads = []
 
     def create_product_type(self, name, description):
         url = f"{self.api_url}/product_types/"
@@ -100,8 +291,8 @@ class CustomOutputHandler(OutputHandler):
             "critical_product": True,
             "key_product": True
         }
-        product_type_response = requests.post(
-            f"{url}", headers=self.headers, json=product_type_payload, timeout=60*2)
+        product_type_response = self.session.post(
+            f"{url}", json=product_type_payload, timeout=60*2)
         if product_type_response.status_code == 201:
             product_type_id = product_type_response.json()["id"]
             self.logger.debug("Product Type created, ID = %s", product_type_id)
@@ -118,8 +309,8 @@ class CustomOutputHandler(OutputHandler):
             "description": description,
             "prod_type": type_id
         }
-        product_response = requests.post(
-            f"{url}", headers=self.headers, json=product_payload, timeout=60*2)
+        product_response = self.session.post(
+            f"{url}", json=product_payload, timeout=60*2)
         if product_response.status_code == 201:
             product_id = product_response.json()["id"]
             self.logger.debug("Product created, ID = %s", product_id)
@@ -143,8 +334,8 @@ class CustomOutputHandler(OutputHandler):
             "deduplication_on_engagement": True,
             "close_old_findings": True
         }
-        engagement_response = requests.post(
-            f"{url}", headers=self.headers, json=engagement_payload, timeout=60*2)
+        engagement_response = self.session.post(
+            f"{url}", json=engagement_payload, timeout=60*2)
         if engagement_response.status_code == 201:
             engagement_id = engagement_response.json()["id"]
             self.logger.debug("Engagement created, ID = %s", engagement_id)
@@ -31,9 +31,7 @@ class CustomOutputHandler(OutputHandler):
             return file_path[len(prefix):].lstrip(os.sep)
         return file_path
 
-    def write_pdf(self,pdf_file,json_file):
-        with open(json_file, 'r', encoding='utf-8') as file:
-            json_data = json.load(file)
+    def write_pdf(self,pdf_file,json_data):
         pdf = SimpleDocTemplate(pdf_file, pagesize=letter)
         elements = []
         styles = getSampleStyleSheet()
@@ -104,47 +102,67 @@ class CustomOutputHandler(OutputHandler):
         table.setStyle(table_style)
         elements.append(table)
 
+        if json_data.get("deduplicated"):
+            elements.append(Spacer(1, 0.2*inch))
+            elements.append(Paragraph("Deduplicated findings", title_style_2))
+            elements.append(Paragraph("Findings reported by more than one scanner are counted once, with the highest severity reported.", note_style))
+            dedupe_table = Table(json_data["deduplicated"])
+            dedupe_table.setStyle(table_style)
+            elements.append(dedupe_table)
+
+        if json_data.get("baseline"):
+            elements.append(Spacer(1, 0.2*inch))
+            elements.append(Paragraph("Compared to the baseline", title_style_2))
+            baseline_table = Table(json_data["baseline"])
+            baseline_table.setStyle(table_style)
+            elements.append(baseline_table)
+
         elements.append(Spacer(1, 0.2*inch))
         paragraph_end = Paragraph('For more information, visit https://github.com/jbeduino/cosca', note_style)
         elements.append(paragraph_end)
         pdf.build(elements)
 
-    def create_json_file(self, filename):
-        data = {
+    def create_summary(self):
+        return {
             "title": "Combo Scanner Report",
             "date": datetime.now().strftime('%Y-%m-%d'),
             "time": datetime.now().strftime('%H:%M:%S'),
             "table": [['Target','Scanner', 'Info', 'Low', 'Medium', 'High', 'Critical', 'Unknown']]
         }
-        with open(filename, 'w', encoding='utf-8') as json_file:
-            json.dump(data, json_file, ensure_ascii=False, indent=4)
-
-    def add_row_to_json(self, json_file, new_row):
-        if not os.path.exists(json_file):
-            self.create_json_file(json_file)
-        try:
-            with open(json_file, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            if "table" in data:
-                data["table"].append(new_row)
-            else:
-                self.logger.error("Table not found in the JSON data.")
-                return
-            with open(json_file, 'w', encoding='utf-8') as file:
+
+    def add_row(self, json_path, pdf_path, new_row):
+        """Rows are kept in memory and written once by finalize"""
+        if json_path not in self.summaries:
+            self.summaries[json_path] = (pdf_path, self.create_summary())
+        self.summaries[json_path][1]["table"].append(new_row)
+        self.logger.debug("Row added successfully.")
+
+    def process_summary(self, summary):
+        rows = [['Target', 'Findings', 'Duplicates', 'Info', 'Low', 'Medium', 'High', 'Critical', 'Unknown']]
+        for target, counts in summary["targets"].items():
+            rows.append([target, sum(counts["raw"]), sum(counts["raw"]) - sum(counts["unique"])] + counts["unique"])
+        for _, data in self.summaries.values():
+            data["deduplicated"] = rows
+            if summary.get("baseline"):
+                data["baseline"] = [['', 'Info', 'Low', 'Medium', 'High', 'Critical', 'Unknown']] + [
+                    [name.capitalize()] + summary["baseline"][name] for name in ("new", "fixed", "unchanged")]
+
+    def finalize(self):
+        for json_path, (pdf_path, data) in self.summaries.items():
+            with open(json_path, 'w', encoding='utf-8') as file:
                 json.dump(data, file, ensure_ascii=False, indent=4)
-            self.logger.debug("Row added successfully.")
-        except FileNotFoundError:
-            self.logger.error("The file was not found.")
-        except json.JSONDecodeError:
-            self.logger.error("Error decoding JSON from the file.")
+            self.write_pdf(pdf_path, data)
+            self.logger.info("PDF report: file://%s", pdf_path)
+        self.summaries = {}
 
     def setup(self):
+        self.summaries = {}
         self.tmp_dir = tempfile.gettempdir()
         self.parser.add_argument(
             "--pdf_output_folder", help="Folder to place the pdf file", default=self.tmp_dir)
         self.parser.add_argument(
             "--pdf_file_prefix", help="Filename prefix for the pdf file", default="")
-        self.args = self.parser.parse_args()
+        self.args = self.parse_args()
 
     def process_files(self, report_path, target, scanner, aux_args):
         self.logger.debug("Generating output...")
@@ -152,9 +170,7 @@ class CustomOutputHandler(OutputHandler):
         json_path = f"{self.args.pdf_output_folder}{os.sep}{json_name}"
         pdf_name = f"{self.args.pdf_file_prefix}{os.path.normpath(self.remove_prefix_from_path(report_path, self.tmp_dir)).split(os.sep)[0]}.pdf"
         pdf_path = f"{self.args.pdf_output_folder}{os.sep}{pdf_name}"
-        self.add_row_to_json(json_path, [target,scanner]+aux_args["json_findings"])
-        self.write_pdf(pdf_path,json_path)
-        self.logger.info("PDF report: file://%s", pdf_path)
+        self.add_row(json_path, pdf_path, [target,scanner]+aux_args["json_findings"])
         return {self.name : [{"pdf_summary": pdf_path},{"json_summary": json_path}]}
 
     def process_stdout(self, stdout):
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from output_handler import OutputHandler
+from common import results_db
+from common.baseline import iter_fingerprints
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class CustomOutputHandler(OutputHandler):
+    """
+    Stores the runs, their scans and the normalized findings in a SQLite database,
+    to query the history of the findings later with cosca_query.py.
+    The findings of each scan are inserted in a single transaction. A resumed run
+    keeps its row and the scans it already stored aren't stored again.
+    """
+
+    def setup(self):
+        self.tmp_dir = tempfile.gettempdir()
+        self.parser.add_argument(
+            "--sqlite_db", help="SQLite database where the results are stored", default=results_db.DEFAULT_PATH)
+        self.args = self.parse_args()
+        self.conn = results_db.connect(self.args.sqlite_db)
+        self.runs = {}
+        self.findings = []
+
+    def remove_prefix_from_path(self, file_path, prefix):
+        if file_path.startswith(prefix):
+            return file_path[len(prefix):].lstrip(os.sep)
+        return file_path
+
+    def get_run_id(self, run_name):
+        if run_name not in self.runs:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (name, started_at) VALUES (?, ?)", (run_name, now()))
+            self.runs[run_name] = self.conn.execute(
+                "SELECT id FROM runs WHERE name = ?", (run_name,)).fetchone()[0]
+        return self.runs[run_name]
+
+    def get_scan_id(self, run_id, target, scanner):
+        """Id of the scan of target stored by an earlier attempt of the run, if any"""
+        row = self.conn.execute(
+            "SELECT id FROM scans WHERE run_id = ? AND target = ? AND scanner = ?",
+            (run_id, target, scanner)).fetchone()
+        return row[0] if row else None
+
+    def process_stdout(self, stdout):
+        pass
+
+    def process_findings(self, findings, target, scanner):
+        # Stored along with the scan by process_files, which is called next
+        self.findings = findings
+
+    def process_files(self, report_path, target, scanner, aux_args):
+        self.logger.debug("Generating output...")
+        run_name = os.path.normpath(self.remove_prefix_from_path(report_path, self.tmp_dir)).split(os.sep)[0]
+        with self.conn:
+            run_id = self.get_run_id(run_name)
+            scan_id = self.get_scan_id(run_id, target, scanner)
+            if scan_id is not None:
+                self.logger.debug("%s of %s already stored by this run", scanner, target)
+            else:
+                scan_id = self.conn.execute(
+                    "INSERT INTO scans (run_id, target, scanner, scanned_at) VALUES (?, ?, ?, ?)",
+                    (run_id, target, scanner, now())).lastrowid
+                cursor = self.conn.executemany(
+                    "INSERT INTO findings (scan_id, fingerprint, rule_id, severity, title, location, line) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((scan_id, fp, f.rule_id, f.severity, f.title, f.location, f.line)
+                     for fp, f in iter_fingerprints(target, self.findings)))
+                self.logger.debug("%d findings of %s stored", cursor.rowcount, scanner)
+        self.findings = []
+        return {self.name : [{"sqlite_db": self.args.sqlite_db, "scan_id": scan_id}]}
+
+    def finalize(self):
+        with self.conn:
+            self.conn.executemany("UPDATE runs SET finished_at = ? WHERE id = ?",
+                                  ((now(), run_id) for run_id in self.runs.values()))
+        if self.runs:
+            self.logger.info("Results stored in %s", os.path.expanduser(self.args.sqlite_db))
+        self.runs = {}
@@ -1,32 +1,100 @@
 import zipfile
+import tarfile
 import tempfile
+import sys
 import os
 from output_handler import OutputHandler
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+
+class ZstdTarArchive:
+    """Tar archive compressed with zstd, written as a stream. Requires the zstandard package."""
+
+    def __init__(self, path, level):
+        self.file = open(path, 'wb')
+        self.writer = zstandard.ZstdCompressor(level=level or 3).stream_writer(self.file)
+        self.tar = tarfile.open(fileobj=self.writer, mode='w|')
+
+    def add(self, file_path, arcname):
+        self.tar.add(file_path, arcname)
+
+    def close(self):
+        self.tar.close()
+        self.writer.close()
+        self.file.close()
+
+
+class ZipArchive:
+
+    def __init__(self, path, compression, level):
+        self.zipf = zipfile.ZipFile(path, 'w', compression=compression, compresslevel=level)
+
+    def add(self, file_path, arcname):
+        # ZipFile.write copies the file in chunks, so big SBOMs and logs aren't loaded in memory
+        self.zipf.write(file_path, arcname)
+
+    def close(self):
+        self.zipf.close()
+
 
 class CustomOutputHandler(OutputHandler):
     """
     Creates a zip file with all the output files generated during the scans.
+    The archive is kept open during the run and closed by finalize.
     """
 
     def setup(self):
+        self.archives = {}
         self.tmp_dir = tempfile.gettempdir()
         self.parser.add_argument(
             "--zip_output_folder", help="Folder to place the zip file", default=self.tmp_dir)
         self.parser.add_argument(
             "--zip_file_prefix", help="Filename prefix for the zip file", default="")
-        self.args = self.parser.parse_args()
-        self.stdout=None
+        self.parser.add_argument(
+            "--zip_compression", help="Compression of the zip file. zstd writes a .tar.zst file instead and requires the zstandard package.",
+            choices=list(COMPRESSIONS) + ["zstd"], default="deflate")
+        self.parser.add_argument(
+            "--zip_compression_level", type=int, default=None,
+            help="Compression level. 0-9 for deflate and bzip2, 1-22 for zstd. Ignored by store and lzma.")
+        self.args = self.parse_args()
+        if self.args.zip_compression == "zstd" and zstandard is None:
+            self.logger.error("zstd compression requires the zstandard package. Run pip install zstandard.")
+            sys.exit(1)
+
+    def get_extension(self):
+        return ".tar.zst" if self.args.zip_compression == "zstd" else ".zip"
 
-    def add_files_to_zip(self, folder_name, zip_filename):
-        with zipfile.ZipFile(zip_filename, 'a') as zipf:
-            for root, _, files in os.walk(folder_name):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, folder_name)
-                    if arcname not in zipf.namelist():
-                        zipf.write(file_path, arcname)
+    def get_archive(self, path):
+        """Returns the open archive of path and the set of names already added to it"""
+        if path not in self.archives:
+            if self.args.zip_compression == "zstd":
+                archive = ZstdTarArchive(path, self.args.zip_compression_level)
+            else:
+                archive = ZipArchive(path, COMPRESSIONS[self.args.zip_compression],
+                                     self.args.zip_compression_level)
+            self.archives[path] = (archive, set())
+        return self.archives[path]
 
+    def add_files_to_zip(self, folder_name, zip_filename, base_folder=None):
+        archive, seen = self.get_archive(zip_filename)
+        for root, _, files in os.walk(folder_name):
+            for file in files:
+                file_path = os.path.join(root, file)
+                arcname = os.path.relpath(file_path, base_folder or folder_name)
+                if arcname not in seen:
+                    archive.add(file_path, arcname)
+                    seen.add(arcname)
 
     def remove_prefix_from_path(self, file_path, prefix):
         if file_path.startswith(prefix):
@@ -35,17 +103,22 @@ class CustomOutputHandler(OutputHandler):
 
     def process_files(self, report_path, target, scanner, aux_args):
         self.logger.debug("Generating output...")
-        if self.stdout:
-            stdout_path=f"{os.path.dirname(report_path)}{os.sep}{os.path.splitext(os.path.basename(report_path))[0]}_stdout.log"
-            with open(stdout_path, 'a', encoding='utf-8') as file:
-                file.write(self.stdout)
-        zip_name = f"{self.args.zip_file_prefix}{os.path.normpath(self.remove_prefix_from_path(report_path, self.tmp_dir)).split(os.sep)[0]}.zip"
+        run_name = os.path.normpath(self.remove_prefix_from_path(report_path, self.tmp_dir)).split(os.sep)[0]
+        zip_name = f"{self.args.zip_file_prefix}{run_name}{self.get_extension()}"
         zip_path = f"{self.args.zip_output_folder}{os.sep}{zip_name}"
-        self.add_files_to_zip(os.path.dirname(report_path), zip_path)
-        
+        self.add_files_to_zip(os.path.dirname(report_path), zip_path,
+                              os.path.join(self.tmp_dir, run_name))
+
         self.logger.info("File %s added to zip file: file://%s",
                          os.path.basename(report_path), zip_path)
         return {self.name : [{"zip_file": zip_path}]}
 
+    def finalize(self):
+        for path, (archive, _) in self.archives.items():
+            archive.close()
+            self.logger.info("Zip file: file://%s", path)
+        self.archives = {}
+
     def process_stdout(self, stdout):
-        self.stdout=stdout
\ No newline at end of file
+        # Container logs are already written to the scanner directory, which is zipped as a whole
+        pass
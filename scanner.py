@@ -1,18 +1,62 @@
 from abc import ABC, abstractmethod
+import os
 import sys
+import inspect
 import logging
 import hashlib
+import time
+import threading
 import docker
+from common import docker_client
 from common.logging_setup import setup_logger
+from common.log_stream import LogStream
+from common.metrics import Metrics
 from common.target_type import TargetType
-from typing import List, Dict
+from common import findings
+from common import sbom
+from common.findings import Finding
+from typing import List, Dict, Iterator
+
+
+class ScanStopped(Exception):
+    """Raised by the container methods of a scan that was stopped before it finished"""
+
+
+class ScanTimeout(ScanStopped):
+    """The deadline of the scan has passed"""
+
+
+class ScanCancelled(ScanStopped):
+    """The scan was cancelled, e.g. because another scan exceeded the --cancel_on severity"""
 
 
 class Scanner(ABC):
     """Inherit from this class to integrate a specific scanner. Scanners are tipically based on docker and rely on the run_container method."""
 
-    def __init__(self, target_type, log_level=logging.INFO):
+    # Set to True in scanners of directories that can scan a subset of the files
+    # (see scan_paths) and implement merge_reports
+    INCREMENTAL = False
+
+    def __init__(self, target_type, log_level=logging.INFO, resources=None):
         self.report_path = ""
+        self.output_report_path = ""
+        self.stdout = ""
+        self.scan_paths = None
+        self.findings_cache = None
+        self.containers = {}
+        self.docker_host = None
+        self.sbom_store = None
+        # Replaced by the metrics of the run when the scanner runs in Cosca
+        self.metrics = Metrics()
+        # time.monotonic() value after which the containers of the scan are removed
+        self.deadline = None
+        self.timed_out = False
+        self.cancelled = False
+        # Set when the scan found findings above the fail_fast severity of its combo node
+        self.failed_gate = False
+        # Why the scan failed, when it did
+        self.error = None
+        self.resources = resources or {}
         self.logger = setup_logger(self.NAME, '🔍', level=log_level)
         self.target_type=target_type
         if target_type not in self.ACCEPTED_TARGET_TYPES:
@@ -46,15 +90,19 @@ class Scanner(ABC):
 
     
     @abstractmethod
-    def scan(self, target, working_dir, show_stdout=False, network="") -> List[Dict[str, str]]:
-        """This method must be overriden in all subclasses and must return
-          the path to the report file
-
-          Returns:
-          A json list with details of outputs generated during the scans
-          e.g.
+    def scan(self, target, working_dir, network=""):
+        """This method must be overriden in all subclasses. It runs the scanner
+          and must set self.report_path and self.stdout, which are later handed
+          to the output handlers by process_outputs. It may run in a worker
+          thread, so it must not call the output handlers itself.
           """
 
+    @property
+    @abstractmethod
+    def REPORT_FORMAT(self):
+        """This constant must be defined in all subclasses. Format of self.report_path,
+        one of common.findings.PARSERS (e.g. grype, sarif)"""
+
     @abstractmethod
     def get_aux_args(self) -> str:
         """This method must be overriden in all subclasses and must return 
@@ -65,24 +113,261 @@ class Scanner(ABC):
         the list of accepted target types of the implemented scanner"""
 
 
-    def run_container(self, image, command, volumes={}, environment={}, user='', network=''):
+    def get_output_report_path(self) -> str:
+        """Report file handed to the output handlers. Set self.output_report_path when
+        the format imported by the output handlers differs from self.report_path"""
+        return self.output_report_path or self.report_path
+
+    def get_container_scan_paths(self) -> List[str]:
+        """Paths to scan inside the container: the whole target directory, or only
+        the files in self.scan_paths during an incremental scan"""
+        if self.scan_paths is None:
+            return [self.CONTAINER_TARGET_DIRECTORY]
+        return [f"{self.CONTAINER_TARGET_DIRECTORY}/{p}" for p in sorted(self.scan_paths)]
+
+    def merge_reports(self, baseline_report_path, replaced_paths):
+        """Incremental scanners must override this method. It adds the findings of
+        baseline_report_path, except those in replaced_paths (relative to the target),
+        to the report in self.report_path. self.report_path may not exist when no
+        file had to be rescanned"""
+        raise NotImplementedError
+
+    @classmethod
+    def get_images(cls) -> List[str]:
+        """Docker images run by the scanner"""
+        return [i for i in (getattr(cls, "SBOM_IMAGE", None), cls.DOCKER_IMAGE) if i]
+
+    def get_source_hash(self) -> str:
+        """Hash of the scanner implementation, which defines the commands run"""
+        with open(inspect.getfile(type(self)), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def get_state(self, working_dir) -> Dict:
+        """Paths of the scan results, relative to working_dir"""
+        stdout_paths = self.stdout.paths if isinstance(self.stdout, LogStream) else []
+        return {
+            "report_path": os.path.relpath(self.report_path, working_dir),
+            "output_report_path": os.path.relpath(self.get_output_report_path(), working_dir),
+            "stdout": [os.path.relpath(p, working_dir) for p in stdout_paths],
+        }
+
+    def load_state(self, state, working_dir):
+        """Restores the scan results saved with get_state, without running the scanner"""
+        self.report_path = os.path.join(working_dir, state["report_path"])
+        self.output_report_path = os.path.join(working_dir, state["output_report_path"])
+        self.stdout = LogStream(*[os.path.join(working_dir, p) for p in state["stdout"]])
+
+    def process_outputs(self, outputs, target) -> List[Dict[str, str]]:
+        """Hands the scan results to every output handler and returns
+        the details of the outputs generated"""
+        output_files = []
+        aux_args = self.get_aux_args()
+        for o in outputs:
+            with self.metrics.timer("output", handler=o.name, scanner=self.NAME):
+                o.process_stdout(self.stdout)
+                o.process_findings(self.get_findings(), target, self.NAME)
+                output_files.append(o.process_files(
+                    self.get_output_report_path(), target, self.NAME, aux_args))
+        return output_files
+
+    def parse_findings(self, json_file) -> Iterator[Finding]:
+        """Yields the normalized findings of the report"""
+        return findings.parse_findings(json_file, self.REPORT_FORMAT, self.NAME)
 
-        client = docker.from_env()
-        container = client.containers.run(
+    def load_findings(self):
+        """Returns the normalized findings of self.report_path and their counts by severity.
+        The report is parsed once, in the worker running the scan, and only again if the
+        file changes (e.g. merge_reports rewrote it). The gates, the output handlers and
+        the findings index all read the same findings."""
+        try:
+            st = os.stat(self.report_path)
+            key = (self.report_path, st.st_mtime_ns, st.st_size)
+            if self.findings_cache is None or self.findings_cache[0] != key:
+                self.metrics.observe("report_bytes", st.st_size, scanner=self.NAME)
+                with self.metrics.timer("report_parse", scanner=self.NAME):
+                    parsed = list(self.parse_findings(self.report_path))
+                self.findings_cache = (key, parsed, findings.count_by_severity(parsed))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.error("Couldn't read the findings of %s. %s", self.report_path, e)
+            sys.exit(1)
+        return self.findings_cache[1], self.findings_cache[2]
+
+    def get_findings(self) -> Iterator[Finding]:
+        """Iterates over the normalized findings of the report"""
+        return iter(self.load_findings()[0])
+
+    def count_findings(self) -> List[int]:
+        """Number of findings of each severity in the report: info, low, medium, high, critical and unknown"""
+        return list(self.load_findings()[1])
+
+    def stop(self):
+        """Removes the containers of the scanner that are still running, so the
+        thread waiting on them returns. Other scans keep running."""
+        for container in list(self.containers.values()):
+            try:
+                docker_client.remove_container(container)
+            except docker.errors.DockerException as e:
+                self.logger.error("Couldn't remove container %s: %s", container.short_id, e)
+
+    def get_sbom(self, target, working_dir) -> LogStream:
+        """Puts the SBOM of target generated with self.SBOM_IMAGE in the sbom
+        subdirectory of working_dir and returns the output of the SBOM tool.
+        The SBOM is shared with the other scanners using the same SBOM_IMAGE."""
+        sbom_dir = os.path.join(working_dir, sbom.SBOM_DIRECTORY)
+        os.makedirs(sbom_dir, exist_ok=True)
+        store = self.sbom_store or sbom.SbomStore(log_level=self.logger.level)
+        store.get(self, target, sbom_dir)
+        return LogStream(os.path.join(sbom_dir, sbom.TABLE_FILE))
+
+    def get_log_path(self, working_dir, name="stdout"):
+        return f"{working_dir}/{self.NAME}_{name}.log"
+
+    def get_docker_client(self):
+        """Client of the Docker host the scan was placed on, the local daemon by default"""
+        if self.docker_host:
+            return self.docker_host.get_client()
+        return docker_client.get_client()
+
+    def is_remote(self):
+        return self.docker_host is not None and self.docker_host.is_remote
+
+    def start_container(self, image, command, volumes, environment, user, network):
+        client = self.get_docker_client()
+        if not self.is_remote():
+            container = client.containers.run(
+                image,
+                command=command,
+                volumes=volumes,
+                environment=environment,
+                user=user,
+                network=network,
+                detach=True,
+                stdout=True,
+                stderr=False,
+                **self.resources
+            )
+            docker_client.track_container(container)
+            return container
+        # The bind mounts would refer to directories of the remote machine,
+        # so their content is copied into the container before it starts
+        container = client.containers.create(
             image,
             command=command,
-            volumes=volumes,
             environment=environment,
             user=user,
             network=network,
-            detach=True,
-            stdout=True,
-            stderr=False
+            **self.resources
         )
-        container.wait()
-        logs = container.logs().decode("utf-8")
-        container.remove()
-        return logs
+        docker_client.track_container(container)
+        try:
+            for host_path, mount in volumes.items():
+                docker_client.copy_to_container(container, host_path, mount["bind"])
+            container.start()
+        except BaseException:
+            docker_client.remove_container(container)
+            raise
+        return container
+
+    def copy_reports(self, container, volumes):
+        """Copies the report directory of a remote container back to the working directory"""
+        report_dir = getattr(self, "CONTAINER_REPORT_DIRECTORY", None)
+        for host_path, mount in volumes.items():
+            if mount["bind"] == report_dir:
+                docker_client.copy_from_container(container, report_dir, host_path)
+
+    def expire(self):
+        self.logger.warning("Deadline reached. Stopping the scan...")
+        self.timed_out = True
+        self.stop()
+
+    def cancel(self):
+        """Stops the scan. Its containers are removed and no other container is started."""
+        self.cancelled = True
+        self.stop()
+
+    def get_remaining_time(self):
+        """Seconds left until the deadline of the scan, None without deadline"""
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - time.monotonic())
+
+    def check_stopped(self):
+        if self.cancelled:
+            raise ScanCancelled(f"{self.NAME} was cancelled")
+        if self.timed_out or (self.deadline is not None and time.monotonic() >= self.deadline):
+            self.timed_out = True
+            raise ScanTimeout(f"{self.NAME} didn't finish before its deadline")
+
+    def start_deadline_timer(self):
+        """Removes the containers of the scan at its deadline, which ends the wait on them"""
+        if self.deadline is None:
+            return None
+        timer = threading.Timer(self.get_remaining_time(), self.expire)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def stream_container(self, image, command, volumes={}, environment={}, user='', network=''):
+        """Runs a container and yields its output line by line while it runs.
+        The container is removed once the output is exhausted or the generator is closed.
+        Raises ScanTimeout when the deadline of the scan passes before the container exits
+        and ScanCancelled when the scan is cancelled."""
+        self.check_stopped()
+        labels = {"scanner": self.NAME, "image": image}
+        if self.docker_host:
+            labels["host"] = str(self.docker_host)
+        with self.metrics.timer("container_start", **labels):
+            container = self.start_container(image, command, volumes, environment, user, network)
+        self.containers[container.id] = container
+        timer = self.start_deadline_timer()
+        started = time.perf_counter()
+        log_bytes = 0
+        try:
+            pending = b""
+            for chunk in container.logs(stream=True, follow=True):
+                log_bytes += len(chunk)
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace") + "\n"
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+            exit_code = container.wait().get("StatusCode")
+            self.check_stopped()
+            self.metrics.observe("containers", 1, exit_code=exit_code, **labels)
+            if self.is_remote():
+                self.copy_reports(container, volumes)
+        except Exception:
+            # The container may have been removed at the deadline or on cancel while streaming its output
+            self.check_stopped()
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+            self.metrics.observe("phase_duration_seconds", time.perf_counter() - started,
+                            phase="container_run", **labels)
+            self.metrics.observe("container_log_bytes", log_bytes, **labels)
+            docker_client.remove_container(container)
+            self.containers.pop(container.id, None)
+
+    def write_log(self, log_path, lines):
+        """Writes lines rendered on the host (e.g. a table built from a JSON report)
+        to log_path and returns a LogStream over it."""
+        try:
+            with open(log_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+        except (FileNotFoundError, PermissionError) as e:
+            self.logger.error("Couldn't create output file in host %s. %s", log_path, e)
+            sys.exit(1)
+        return LogStream(log_path)
+
+    def run_container(self, image, command, volumes={}, environment={}, user='', network='', log_path=None):
+        """Runs a container until it exits. When log_path is given, the output is streamed
+        to that file and a LogStream over it is returned. Otherwise the output is returned as a string."""
+        lines = self.stream_container(image, command, volumes, environment, user, network)
+        if not log_path:
+            return "".join(lines)
+        return self.write_log(log_path, lines)
 
     def get_target_id(self, s, length=8):
         hash_object = hashlib.sha256(s.encode('utf-8'))
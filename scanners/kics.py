@@ -1,7 +1,10 @@
 from datetime import datetime
+import os
 import json
+import shlex
 from scanner import Scanner
 from common.target_type import TargetType
+from common.incremental import to_relpath
 
 
 class CustomScanner(Scanner):
@@ -9,42 +12,53 @@ class CustomScanner(Scanner):
     NAME = "kics"
     DOCKER_IMAGE = "checkmarx/kics:latest"
     DEFECTDOJO_IMPORT_FORMAT = "KICS Scan"
+    REPORT_FORMAT = "kics"
     REPORT_FILENAME = f"scan_results_{NAME}_{datetime.now().strftime('%y%m%d%H%M%S')}.json"
     CONTAINER_TARGET_DIRECTORY = "/src"
     CONTAINER_REPORT_DIRECTORY = "/tmp"
     ACCEPTED_TARGET_TYPES = [TargetType.DIRECTORY]
+    INCREMENTAL = True
 
-    def scan(self, target, working_dir, outputs, network):
+    def scan(self, target, working_dir, network=""):
         self.logger.info("Starting to scan target: %s", target)
-        command=f"scan -p {self.CONTAINER_TARGET_DIRECTORY} \
+        paths=shlex.quote(",".join(self.get_container_scan_paths()))
+        command=f"scan -p {paths} \
             --output-path {self.CONTAINER_REPORT_DIRECTORY} \
             --output-name {self.REPORT_FILENAME}"
-        volumes={target: {'bind': self.CONTAINER_TARGET_DIRECTORY, 'mode': 'rw'},
+        volumes={target: {'bind': self.CONTAINER_TARGET_DIRECTORY, 'mode': 'ro'},
             working_dir: {'bind': self.CONTAINER_REPORT_DIRECTORY, 'mode': 'rw'}}
-        logs=self.run_container(self.DOCKER_IMAGE, command, volumes)
+        logs=self.run_container(self.DOCKER_IMAGE, command, volumes, log_path=self.get_log_path(working_dir))
         host_report_path = f"{working_dir}/{self.REPORT_FILENAME}"
         self.report_path = host_report_path
         self.logger.debug("Custom scanning completed.")
         self.logger.info("Scan report generated: %s", host_report_path)
-        output_files=[]
-        for o in outputs:
-            o.process_stdout(logs)
-            output_files.append(o.process_files(host_report_path,target,self.NAME,self.get_aux_args()))
-        return output_files
+        self.stdout = logs
 
 
-    def get_findings_count(self,json_file):
-        severity_index={"INFO":0,"LOW":1,"MEDIUM":2,"HIGH":3,"CRITICAL":4,"TRACE":5}
-        findings_count=[0,0,0,0,0,0]
-        with open(json_file, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        for q in data["queries"]:
-            i=severity_index[q["severity"]]
-            findings_count[i]=findings_count[i]+1*len(q["files"])
-        return findings_count
-
+    def merge_reports(self, baseline_report_path, replaced_paths):
+        with open(baseline_report_path, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        if os.path.exists(self.report_path):
+            with open(self.report_path, 'r', encoding='utf-8') as file:
+                report = json.load(file)
+        else:
+            report = dict(baseline, queries=[])
+        queries = {q["query_id"]: q for q in report.get("queries", [])}
+        for q in baseline.get("queries", []):
+            files = [f for f in q["files"]
+                     if to_relpath(f["file_name"], self.CONTAINER_TARGET_DIRECTORY) not in replaced_paths]
+            if not files:
+                continue
+            if q["query_id"] in queries:
+                queries[q["query_id"]]["files"].extend(files)
+            else:
+                queries[q["query_id"]] = dict(q, files=files)
+        report["queries"] = list(queries.values())
+        report["total_counter"] = sum(len(q["files"]) for q in report["queries"])
+        with open(self.report_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
 
     def get_aux_args(self):
         return {'defectdojo_format': self.DEFECTDOJO_IMPORT_FORMAT,
-                'json_findings': self.get_findings_count(self.report_path)
+                'json_findings': self.count_findings()
                 }
\ No newline at end of file
@@ -1,60 +1,61 @@
 """ Semgrep (https://semgrep.dev/) for Combo Scanner """
-import sys
+import os
 import json
+import shlex
 from datetime import datetime
 from scanner import Scanner
 from common.target_type import TargetType
+from common.incremental import to_relpath
 
 class CustomScanner(Scanner):
     """ Semgrep (https://github.com/semgrep/semgrep) for Combo Scanner """
     NAME = "semgrep"
     DOCKER_IMAGE = "semgrep/semgrep"
     DEFECTDOJO_IMPORT_FORMAT = "Semgrep JSON Report"
+    REPORT_FORMAT = "semgrep"
     CONTAINER_TARGET_DIRECTORY = "/src"
     CONTAINER_REPORT_DIRECTORY = "/tmp"
     ACCEPTED_TARGET_TYPES = [TargetType.DIRECTORY]
+    INCREMENTAL = True
     
     # def __init__(self):
     #     super().__init__(self.NAME, self.DOCKER_IMAGE)
     #     self.report_path = ""
 
-    def scan(self, target, working_dir, outputs, network):
+    def scan(self, target, working_dir, network=""):
         target_id=super().get_target_id(target)
         self.logger.info("Starting to scan target: %s (ID: %s)", target, target_id)
         report_filename=f"{datetime.now().strftime('%y%m%d%H%M%S')}_{self.NAME}_{target_id}.json"
         container_report_path=f"{self.CONTAINER_REPORT_DIRECTORY}/{report_filename}"
-        volumes={target: {'bind': self.CONTAINER_TARGET_DIRECTORY, 'mode': 'rw'},
+        volumes={target: {'bind': self.CONTAINER_TARGET_DIRECTORY, 'mode': 'ro'},
                      working_dir: {'bind': self.CONTAINER_REPORT_DIRECTORY,
                                                   'mode': 'rw'}}
+        paths=" ".join(shlex.quote(p) for p in self.get_container_scan_paths())
         command=f"semgrep --config auto --text --json-output={container_report_path} \
-                {self.CONTAINER_TARGET_DIRECTORY}"
-        logs=self.run_container(self.DOCKER_IMAGE, command, volumes, user="semgrep")
+                {paths}"
+        logs=self.run_container(self.DOCKER_IMAGE, command, volumes, user="semgrep",
+                                log_path=self.get_log_path(working_dir))
         host_report_path = f"{working_dir}/{report_filename}"
         self.report_path = host_report_path
         self.logger.debug("Custom scan completed.")
         self.logger.debug("Temporary scan report generated: %s", host_report_path)
-        output_files=[]
-        for o in outputs:
-            o.process_stdout(logs)
-            output_files.append(o.process_files(host_report_path,target,self.NAME,self.get_aux_args()))
-        return output_files
+        self.stdout = logs
 
-    def get_findings_count(self, json_file):
-        severity_index={"INFO":0,"LOW":1,"MEDIUM":2,"HIGH":3,"CRITICAL":4,"UNKNOWN":5}
-        findings_count=[0,0,0,0,0,0]
-        try:
-            with open(json_file, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            findings = data.get('results', [])
-            for f in findings:
-                i=severity_index[f["extra"]["metadata"]["impact"]]
-                findings_count[i]=findings_count[i]+1
-        except (FileNotFoundError, json.JSONDecodeError, KeyError, IOError) as e:
-            self.logger.error("An I/O error occurred in get_findings_count function. %s", e)
-            sys.exit()
-        return findings_count
+    def merge_reports(self, baseline_report_path, replaced_paths):
+        with open(baseline_report_path, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        if os.path.exists(self.report_path):
+            with open(self.report_path, 'r', encoding='utf-8') as file:
+                report = json.load(file)
+        else:
+            report = dict(baseline, results=[])
+        kept = [r for r in baseline.get("results", [])
+                if to_relpath(r["path"], self.CONTAINER_TARGET_DIRECTORY) not in replaced_paths]
+        report["results"] = kept + report.get("results", [])
+        with open(self.report_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
 
     def get_aux_args(self):
         return {'defectdojo_format': self.DEFECTDOJO_IMPORT_FORMAT,
-                'json_findings': self.get_findings_count(self.report_path)
+                'json_findings': self.count_findings()
                 }
\ No newline at end of file
@@ -0,0 +1,39 @@
+from scanner import Scanner
+from common import sbom
+from common.target_type import TargetType
+from common.renderers import render_trivy_table
+
+
+class CustomScanner(Scanner):
+    """
+    Trivy (https://github.com/aquasecurity/trivy) for
+    Syft (https://github.com/anchore/syft) SBOM scanner for Combo Scanner.
+    It matches the vulnerabilities of the same SBOM as syft_grype.
+    """
+
+    NAME = "syft_trivy"
+    DOCKER_IMAGE = "aquasec/trivy"
+    SBOM_IMAGE = sbom.SYFT_IMAGE
+    DEFECTDOJO_IMPORT_FORMAT = "Trivy Scan"
+    REPORT_FORMAT = "trivy"
+    REPORT_FILE_NAME = f"scan_results_{NAME}.json"
+    CONTAINER_REPORT_DIRECTORY = "/tmp"
+    ACCEPTED_TARGET_TYPES = [TargetType.DIRECTORY, TargetType.DOCKER]
+
+    def scan(self, target, working_dir, network=""):
+        logs_1 = self.get_sbom(target, working_dir)
+        self.logger.info("Scanning SBOM...")
+        command = (f"sbom --quiet --format json --output {self.CONTAINER_REPORT_DIRECTORY}/{self.REPORT_FILE_NAME} "
+                   f"{self.CONTAINER_REPORT_DIRECTORY}/{sbom.SBOM_DIRECTORY}/{sbom.CYCLONEDX_FILE}")
+        volumes = {working_dir: {"bind": self.CONTAINER_REPORT_DIRECTORY, "mode": "rw"}}
+        self.run_container(self.DOCKER_IMAGE, command, volumes,
+                           log_path=self.get_log_path(working_dir, "container"))
+        self.report_path = f"{working_dir}/{self.REPORT_FILE_NAME}"
+        self.stdout = logs_1 + self.write_log(self.get_log_path(working_dir),
+                                              render_trivy_table(self.report_path))
+
+    def get_aux_args(self):
+        return {
+            "defectdojo_format": self.DEFECTDOJO_IMPORT_FORMAT,
+            "json_findings": self.count_findings(),
+        }
@@ -1,10 +1,9 @@
 import os
-import sys
 from datetime import datetime
 import docker
 from scanner import Scanner
-import json
 from common.target_type import TargetType
+from common.renderers import render_trivy_table
 
 class CustomScanner(Scanner):
     """ 
@@ -13,61 +12,32 @@ class CustomScanner(Scanner):
     NAME = "trivy"
     DOCKER_IMAGE = "aquasec/trivy"
     DEFECTDOJO_IMPORT_FORMAT = "Trivy Scan"
-    SEVERITY_INDEX={"INFO":1,"LOW":1,"MEDIUM":2,"HIGH":3,"CRITICAL":4,"UNKNOWN":5}
+    REPORT_FORMAT = "trivy"
     REPORT_FILENAME = f"scan_results_{NAME}_{datetime.now().strftime('%y%m%d%H%M%S')}.json"
     CONTAINER_REPORT_DIRECTORY = "/tmp"
     CONTAINER_REPORT_PATH = f"{CONTAINER_REPORT_DIRECTORY}/{REPORT_FILENAME}"
     ACCEPTED_TARGET_TYPES = [TargetType.DOCKER]
+    # Trivy scanners to run (--scanners), its defaults when None
+    TRIVY_SCANNERS = None
 
-    def scan(self, target, working_dir, outputs, network):
+    def scan(self, target, working_dir, network=""):
         target_id=super().get_target_id(target)
         self.logger.info("Starting to scan target: %s (ID: %s)", target, target_id)
-        command=f"image --format table {target} "
-        volumes={working_dir: {
-                'bind': self.CONTAINER_REPORT_DIRECTORY, 'mode': 'rw'}}
-        logs=self.run_container(self.DOCKER_IMAGE, command, volumes)
-        for o in outputs:
-            o.process_stdout(logs)
-        command=f"image --quiet --format json {target}"
+        report_filename=f"{datetime.now().strftime('%y%m%d%H%M%S')}_{self.NAME}_{target_id}.json"
+        scanners = f"--scanners {self.TRIVY_SCANNERS} " if self.TRIVY_SCANNERS else ""
+        command=f"image --quiet {scanners}--format json --output {self.CONTAINER_REPORT_DIRECTORY}/{report_filename} {target}"
         volumes={working_dir: {
                 'bind': self.CONTAINER_REPORT_DIRECTORY, 'mode': 'rw'}}
-        logs=self.run_container(self.DOCKER_IMAGE, command, volumes)
-        report_filename=f"{datetime.now().strftime('%y%m%d%H%M%S')}_{self.NAME}_{target_id}.json"
+        self.run_container(self.DOCKER_IMAGE, command, volumes,
+                           log_path=self.get_log_path(working_dir, "container"))
         host_report_path = f"{working_dir}/{report_filename}"
         self.report_path = host_report_path
-
-        try:
-            with open(f'{host_report_path}', 'w', encoding='utf-8') as f:
-                f.write(logs)
-        except (FileNotFoundError, PermissionError):
-            self.logger.error(
-                "Could't create output file in host %s", host_report_path)
-            sys.exit(1)
+        self.stdout=self.write_log(self.get_log_path(working_dir),
+                                   render_trivy_table(host_report_path))
         self.logger.debug("Custom scan completed.")
         self.logger.debug("Temporary scan report generated: %s", host_report_path)
-        for o in outputs:
-            o.process_files(host_report_path,target,self.NAME,self.get_aux_args())
-        return f"{host_report_path}"
-
-    def get_findings_count(self, json_file):
-        findings_count=[0,0,0,0,0,0]
-        with open(json_file, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        for r in data["Results"]:
-            try:
-                if "Vulnerabilities" in r:
-                    for v in r["Vulnerabilities"]:
-                        i=self.SEVERITY_INDEX[v["Severity"]]
-                        findings_count[i]=findings_count[i]+1
-                if "Secrets" in r:
-                    for s in r["Secrets"]:
-                        i=self.SEVERITY_INDEX[s["Severity"]]
-                        findings_count[i]=findings_count[i]+1
-            except KeyError as e:
-                self.logger.error("Error reading severity from json: %s", e)
-        return findings_count
 
     def get_aux_args(self):
         return {'defectdojo_format': self.DEFECTDOJO_IMPORT_FORMAT,
-                'json_findings': self.get_findings_count(self.report_path)
+                'json_findings': self.count_findings()
                 }
\ No newline at end of file
@@ -0,0 +1,12 @@
+from scanners import trivy
+
+
+class CustomScanner(trivy.CustomScanner):
+    """
+    Trivy (https://github.com/aquasecurity/trivy) scanner for Combo Scanner, limited
+    to the secrets and misconfigurations of the image. For combos matching the
+    vulnerabilities of the image with SBOM scanners (e.g. syft_trivy), so that the
+    image is only cataloged once and matched once against each database.
+    """
+    NAME = "trivy_secret"
+    TRIVY_SCANNERS = "secret,misconfig"
@@ -0,0 +1,271 @@
+import os
+import re
+import sys
+import hmac
+import json
+import signal
+import logging
+import argparse
+import tempfile
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from docker.errors import DockerException
+from cosca import Cosca
+from common import docker_client
+from common.job_queue import JobQueue
+from common.logging_setup import setup_logger
+from common.target_type import TargetType
+
+# Long-running mode of cosca: python cosca.py serve
+# Scan jobs are submitted through a local HTTP API (TCP or Unix socket), kept in
+# a SQLite queue and run by a pool of workers in the same process, which shares
+# the Docker client, the imported modules and the parsed combos between jobs.
+#
+#   POST /jobs       {"args": ["-t", "https://example.com", "-o", "sqlite"]}
+#   GET  /jobs       ?status=queued|running|done|failed&limit=100
+#   GET  /jobs/<id>
+#   GET  /health
+
+MAX_BODY_SIZE = 1024 * 1024
+
+# Arguments that name files or folders of the service host, or other Docker
+# daemons. Jobs use the defaults of the service instead.
+JOB_FORBIDDEN_OPTIONS = {
+    "--targets_file", "--baseline", "--write_baseline", "--metrics_file", "--docker_hosts",
+    "--cache_dir", "--sbom_cache_dir", "--incremental_dir", "--sqlite_db", "--dd_spool_dir",
+    "--pdf_output_folder", "--pdf_file_prefix", "--zip_output_folder", "--zip_file_prefix",
+    # The service's DefectDojo API key must not be sent to a server of the job
+    "--dd_url", "--dd_api_key",
+    # Reruns the journal of another run
+    "--resume",
+}
+
+
+class InvalidArguments(ValueError):
+    pass
+
+
+def check_job_args(args):
+    for i, arg in enumerate(args):
+        option, sep, value = arg.partition("=")
+        if option in JOB_FORBIDDEN_OPTIONS:
+            raise InvalidArguments(f"jobs can't set {option}")
+        if option == "--incremental_ref":
+            # Passed to git, which would take it for an option
+            value = value if sep else (args[i + 1] if i + 1 < len(args) else "")
+            if value.startswith("-"):
+                raise InvalidArguments(f"invalid --incremental_ref {value}")
+
+
+class JobArgumentParser(argparse.ArgumentParser):
+    """Raises InvalidArguments instead of exiting the service on invalid job arguments.
+    Options must be given in full, so that forbidden ones can't be abbreviated."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, allow_abbrev=False, **kwargs)
+
+    def error(self, message):
+        raise InvalidArguments(message)
+
+
+class JobCosca(Cosca):
+    PARSER_CLASS = JobArgumentParser
+
+    def __init__(self, argv, allowed_dirs=(), **kwargs):
+        super().__init__(argv, **kwargs)
+        self.allowed_dirs = [os.path.realpath(d) for d in allowed_dirs]
+
+    def is_allowed_target(self, target, target_type):
+        """Directories, and any other target naming a path of the host whatever its type,
+        must be inside one of the --allow_dir folders of the service"""
+        if target_type != TargetType.DIRECTORY and not os.path.lexists(target):
+            return True
+        path = os.path.realpath(target)
+        return any(os.path.commonpath([path, d]) == d for d in self.allowed_dirs)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "cosca"
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        self.server.service.logger.debug("%s %s", self.address_string(), format % args)
+
+    def reply(self, status, data):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def is_authorized(self):
+        token = self.server.service.token
+        authorization = self.headers.get("Authorization", "")
+        if token and not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            self.reply(401, {"error": "unauthorized"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.is_authorized():
+            return
+        queue = self.server.service.queue
+        url = urlparse(self.path)
+        match = re.fullmatch(r"/jobs/(\d+)", url.path)
+        if url.path == "/health":
+            self.reply(200, {"status": "ok", "jobs": queue.count()})
+        elif url.path == "/jobs":
+            query = parse_qs(url.query)
+            try:
+                limit = int(query.get("limit", ["100"])[0])
+            except ValueError:
+                self.reply(400, {"error": "limit must be a number"})
+                return
+            self.reply(200, queue.list(query.get("status", [None])[0], limit))
+        elif match:
+            job = queue.get(int(match.group(1)))
+            if job:
+                self.reply(200, job)
+            else:
+                self.reply(404, {"error": "job not found"})
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.is_authorized():
+            return
+        if urlparse(self.path).path != "/jobs":
+            self.reply(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_SIZE:
+            self.reply(413, {"error": "request too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            args = body["args"]
+            if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+                raise TypeError()
+        except (ValueError, KeyError, TypeError):
+            self.reply(400, {"error": 'expected {"args": [cosca arguments]}'})
+            return
+        try:
+            check_job_args(args)
+        except InvalidArguments as e:
+            self.reply(400, {"error": str(e)})
+            return
+        job_id = self.server.service.queue.submit(args)
+        self.reply(201, {"id": job_id, "status": "queued", "url": f"/jobs/{job_id}"})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CoscaService:
+
+    def __init__(self, argv=None):
+        self.args = self.parse_args(argv)
+        self.logger = setup_logger("service", "🛰️ ", level=logging.INFO)
+        self.token = self.args.token
+        self.queue = JobQueue(self.args.queue_db)
+        self.stopping = threading.Event()
+
+    def parse_args(self, argv):
+        parser = argparse.ArgumentParser(
+            prog="cosca.py serve",
+            description="Run cosca as a service that runs the scan jobs submitted to its HTTP API.")
+        parser.add_argument("--host", help="Address to listen on", default="127.0.0.1")
+        parser.add_argument("--port", type=int, help="Port to listen on", default=8765)
+        parser.add_argument("--socket", help="Listen on this Unix socket instead of --host and --port", default=None)
+        parser.add_argument("--workers", type=int, help="Number of jobs run at the same time", default=2)
+        parser.add_argument("--queue_db", help="SQLite database of the job queue",
+                            default=os.path.join("~", ".cache", "cosca", "jobs.db"))
+        parser.add_argument("--token", help="Require this bearer token in the Authorization header. Defaults to the COSCA_SERVICE_TOKEN environment variable. Required unless --socket is used.",
+                            default=os.getenv("COSCA_SERVICE_TOKEN", ""))
+        parser.add_argument("--allow_dir", action="append", default=[],
+                            help="Folder whose subfolders jobs may scan. Can be given several times. Jobs can't scan directories without it.")
+        parser.add_argument("--work_dir", help="Private folder where the jobs keep their working directories and reports",
+                            default=os.path.join("~", ".cache", "cosca", "service"))
+        return parser.parse_args(argv)
+
+    def run_job(self, job_id, args):
+        self.logger.info("Running job %d: %s", job_id, " ".join(args))
+        try:
+            check_job_args(args)
+            exit_code, result = JobCosca(args, self.args.allow_dir, check_docker=False).run()
+            self.queue.finish(job_id, exit_code, result)
+            self.logger.info("Job %d finished with exit code %d", job_id, exit_code)
+        except InvalidArguments as e:
+            self.queue.finish(job_id, 2, error=f"invalid arguments: {e}")
+            self.logger.error("Job %d has invalid arguments: %s", job_id, e)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+            self.queue.finish(job_id, exit_code, error=f"cosca exited with code {exit_code}, see the service log")
+            self.logger.error("Job %d exited with code %d", job_id, exit_code)
+        except Exception as e:  # pylint: disable=broad-except
+            # A failed job must not stop its worker
+            self.queue.finish(job_id, 1, error=str(e))
+            self.logger.exception("Job %d failed", job_id)
+
+    def work(self):
+        while not self.stopping.is_set():
+            job = self.queue.claim(timeout=1)
+            if job:
+                self.run_job(*job)
+
+    def create_server(self):
+        if self.args.socket:
+            if os.path.exists(self.args.socket):
+                os.remove(self.args.socket)
+            # Only the user of the service may connect to the socket
+            umask = os.umask(0o177)
+            try:
+                server = UnixHTTPServer(self.args.socket, ApiHandler)
+            finally:
+                os.umask(umask)
+            self.logger.info("Listening on unix://%s", self.args.socket)
+        else:
+            if not self.token:
+                self.logger.error("Set --token or COSCA_SERVICE_TOKEN to listen on TCP, or use --socket")
+                sys.exit(1)
+            server = ThreadingHTTPServer((self.args.host, self.args.port), ApiHandler)
+            self.logger.info("Listening on http://%s:%d", self.args.host, server.server_address[1])
+        server.service = self
+        return server
+
+    def start_workers(self):
+        for i in range(max(1, self.args.workers)):
+            threading.Thread(target=self.work, name=f"job-{i}", daemon=True).start()
+
+    def serve(self):
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+        try:
+            docker_client.get_client().ping()
+        except DockerException:
+            self.logger.error("Docker daemon is not running. Please start docker daemon and run cosca again.")
+            sys.exit(1)
+        # Working directories and reports of the jobs (which may hold secrets found
+        # by the scanners) are kept out of the shared temporary directory
+        work_dir = os.path.expanduser(self.args.work_dir)
+        os.makedirs(work_dir, mode=0o700, exist_ok=True)
+        os.chmod(work_dir, 0o700)
+        tempfile.tempdir = work_dir
+        server = self.create_server()
+        self.start_workers()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Jobs still running are queued again when the service starts
+            self.stopping.set()
+            self.queue.wake_all()
+            server.server_close()
+            self.logger.info("Service stopped")
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from common import baseline
+from common.dedupe import FindingIndex
+from common.findings import Finding, LOW, HIGH, CRITICAL, UNKNOWN
+
+# python -m unittest discover -s tests
+
+def fingerprints(target, findings):
+    index = FindingIndex()
+    index.add(target, findings)
+    return baseline.get_fingerprints(index)
+
+
+class TestBaseline(unittest.TestCase):
+
+    def test_fingerprints_ignore_line_shifts(self):
+        before = fingerprints("dir", [Finding("semgrep", "r1", HIGH, location="/src/a.py", line=10),
+                                      Finding("semgrep", "r1", HIGH, location="/src/a.py", line=20)])
+        after = fingerprints("dir", [Finding("semgrep", "r1", HIGH, location="/src/a.py", line=12),
+                                     Finding("semgrep", "r1", HIGH, location="/src/a.py", line=22)])
+        self.assertEqual(before, after)
+
+    def test_directory_fingerprints_ignore_the_checkout_path(self):
+        findings = [Finding("semgrep", "r1", HIGH, location="/src/a.py", line=10)]
+        self.addCleanup(os.chdir, os.getcwd())
+        with tempfile.TemporaryDirectory() as one, tempfile.TemporaryDirectory() as other:
+            os.mkdir(os.path.join(one, "repo"))
+            os.mkdir(os.path.join(other, "repo"))
+            os.chdir(one)
+            before = fingerprints(os.path.join(one, "repo"), findings)
+            os.chdir(other)
+            self.assertEqual(before, fingerprints("repo", findings))
+            self.assertEqual(before, dict((fp, f.severity) for fp, f in
+                                          baseline.iter_fingerprints(os.path.join(other, "repo"), findings)))
+
+    def test_directories_with_the_same_name_have_their_own_fingerprints(self):
+        findings = [Finding("semgrep", "r1", HIGH, location="/src/a.py", line=10)]
+        self.addCleanup(os.chdir, os.getcwd())
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as outside:
+            for path in (os.path.join(tmp, "a", "app"), os.path.join(tmp, "b", "app"), os.path.join(outside, "app")):
+                os.makedirs(path)
+            os.chdir(tmp)
+            index = FindingIndex()
+            for target in (os.path.join("a", "app"), os.path.join("b", "app"), os.path.join(outside, "app")):
+                index.add(target, findings)
+            self.assertEqual(3, len(baseline.get_fingerprints(index)))
+
+    def test_compare(self):
+        previous = fingerprints("img", [Finding("trivy", "CVE-1", HIGH, location="a@1"),
+                                        Finding("trivy", "CVE-2", LOW, location="b@1")])
+        current = fingerprints("img", [Finding("trivy", "CVE-1", HIGH, location="a@1"),
+                                       Finding("trivy", "CVE-3", CRITICAL, location="c@1")])
+        result = baseline.compare(current, previous)
+        self.assertEqual([0, 0, 0, 0, 1, 0], result["new"])
+        self.assertEqual([0, 1, 0, 0, 0, 0], result["fixed"])
+        self.assertEqual([0, 0, 0, 1, 0, 0], result["unchanged"])
+
+    def test_write_and_load(self):
+        current = fingerprints("img", [Finding("trivy", "CVE-1", HIGH, location="a@1")])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = baseline.write_baseline(tmp, current)
+            self.assertEqual(os.path.join(tmp, "baseline.json"), path)
+            self.assertEqual(current, baseline.load_baseline(tmp))
+
+    def test_count_at_or_above(self):
+        counts = [5, 4, 3, 2, 1, 9]
+        self.assertEqual(3, baseline.count_at_or_above(counts, "high"))
+        self.assertEqual(15, baseline.count_at_or_above(counts, "info"))
+        self.assertEqual(UNKNOWN, len(counts) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
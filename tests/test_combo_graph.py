@@ -0,0 +1,33 @@
+import unittest
+from common.combo_graph import get_nodes
+
+# python -m unittest discover -s tests
+
+class TestComboGraph(unittest.TestCase):
+
+    def test_nodes_come_after_their_needs(self):
+        nodes = get_nodes([
+            {"name": "semgrep", "needs": ["trufflehog"], "timeout": 600},
+            "kics",
+            {"name": "trufflehog", "fail_fast": "high"},
+        ])
+        self.assertEqual(["kics", "trufflehog", "semgrep"], [n.name for n in nodes])
+        self.assertEqual((600, ["trufflehog"]), (nodes[2].timeout, nodes[2].needs))
+        self.assertEqual("high", nodes[1].fail_fast)
+
+    def test_invalid_graphs(self):
+        invalid = [
+            [{"name": "a", "needs": ["b"]}, {"name": "b", "needs": ["a"]}],
+            [{"name": "a", "needs": ["missing"]}],
+            ["a", "a"],
+            [{"name": "a", "fail_fast": "unknown"}],
+            [{"name": "a", "timeout": 0}],
+            [{"needs": []}],
+        ]
+        for entries in invalid:
+            with self.subTest(entries=entries), self.assertRaises(ValueError):
+                get_nodes(entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
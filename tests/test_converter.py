@@ -0,0 +1,35 @@
+import os
+import json
+import tempfile
+import unittest
+from common.converter import JUnit2Sarif
+
+# python -m unittest discover -s tests
+
+JUNIT = """<testsuites>
+<testsuite name="https://example.com/login" failures="1">
+<testcase name="xss" type="High"><failure message="Cross-site scripting" type="High">details</failure></testcase>
+</testsuite>
+</testsuites>
+"""
+
+
+class TestJUnit2Sarif(unittest.TestCase):
+
+    def test_conversions_are_independent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "report.xml")
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(JUNIT)
+            for i in range(3):
+                destination = JUnit2Sarif().convert(source, os.path.join(tmp, f"report{i}.sarif"))
+                with open(destination, encoding='utf-8') as f:
+                    sarif = json.load(f)
+                self.assertEqual(1, len(sarif["runs"]))
+                self.assertEqual(1, len(sarif["runs"][0]["results"]))
+                self.assertEqual("https://example.com/", sarif["runs"][0]["originalUriBaseIds"]["target"]["uri"])
+            self.assertEqual("PLACEHOLDER", JUnit2Sarif.RUN["originalUriBaseIds"]["target"]["uri"])
+
+
+if __name__ == '__main__':
+    unittest.main()
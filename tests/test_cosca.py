@@ -0,0 +1,84 @@
+import time
+import threading
+import tempfile
+import unittest
+from unittest.mock import Mock
+from common.combo_graph import Node
+from common.target_source import TargetSpec
+from common.target_type import TargetType
+from cosca import Cosca
+
+# python -m unittest discover -s tests
+
+class TestScanBudgets(unittest.TestCase):
+
+    def make_cosca(self, *args):
+        return Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0", *args], check_docker=False)
+
+    def test_deadline_precedence(self):
+        app = self.make_cosca("--timeout", "100", "--scanner_timeout", "zap=10")
+        now = time.monotonic()
+        self.assertAlmostEqual(now + 10, app.get_deadline(Node("zap", timeout=50)), delta=1)
+        self.assertAlmostEqual(now + 50, app.get_deadline(Node("kics", timeout=50)), delta=1)
+        self.assertAlmostEqual(now + 100, app.get_deadline(Node("semgrep")), delta=1)
+        app.run_deadline = now + 5
+        self.assertEqual(now + 5, app.get_deadline(Node("semgrep")))
+        self.assertIsNone(self.make_cosca().get_deadline(Node("semgrep")))
+
+    def test_cancel_stops_the_other_scans(self):
+        app = self.make_cosca("--cancel_on", "high")
+        source, running, queued = Mock(cancelled=False), Mock(cancelled=False), Mock(cancelled=False)
+        app.active_scans.update([source, running])
+        app.cancel_scans("found secrets", source)
+        source.cancel.assert_not_called()
+        running.cancel.assert_called_once()
+        self.assertIs(queued, app.run_scan(queued, "/tmp", "/tmp/x", ""))
+        self.assertTrue(queued.cancelled)
+        queued.scan.assert_not_called()
+        self.assertEqual(1, app.get_exit_code({"targets": {}, "baseline": None}))
+
+
+class TestTargetStream(unittest.TestCase):
+
+    def test_bad_targets_are_skipped(self):
+        app = Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0"], check_docker=False)
+        targets = ["!!not a target!!", TargetSpec("nginx", combo="missing", target_type=TargetType.DOCKER)]
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual([], app.trigger_scans(targets, "default", tmp, [], ""))
+
+
+    def test_combos_of_the_targets_are_pulled(self):
+        app = Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0"], check_docker=False)
+        app.pull_images = Mock()
+        app.is_allowed_target = Mock(return_value=False)
+        targets = [TargetSpec("nginx", combo="full", target_type=TargetType.DOCKER),
+                   TargetSpec("alpine", combo="full", target_type=TargetType.DOCKER),
+                   TargetSpec("/tmp", target_type=TargetType.DIRECTORY)]
+        with tempfile.TemporaryDirectory() as tmp:
+            app.trigger_scans(targets, "default", tmp, [], "")
+        self.assertEqual([(("full",),), (("default",),)], app.pull_images.call_args_list)
+
+    def test_interrupt_cancels_the_pending_scans(self):
+        app = Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0", "--jobs", "4"], check_docker=False)
+        app.pull_images = Mock()
+        started, cancelled = threading.Event(), threading.Event()
+        instance = Mock(cancelled=False, cancel=Mock(side_effect=cancelled.set))
+        instance.get_target_id.return_value = "tmp"
+        app.get_scanner_instance = Mock(return_value=instance)
+        # The scan only returns once cancelled, like a container removed by cancel()
+        app.run_scan = lambda *args: started.set() or cancelled.wait(5)
+
+        def targets():
+            yield TargetSpec("/tmp", target_type=TargetType.DIRECTORY)
+            started.wait(5)
+            raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(KeyboardInterrupt):
+                app.trigger_scans(targets(), "default", tmp, [], "")
+        instance.cancel.assert_called()
+        instance.stop.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
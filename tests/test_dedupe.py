@@ -0,0 +1,42 @@
+import unittest
+from common.dedupe import FindingIndex, normalize_location
+from common.findings import Finding, LOW, MEDIUM, HIGH, CRITICAL, UNKNOWN
+
+# python -m unittest discover -s tests
+
+class TestFindingIndex(unittest.TestCase):
+
+    def test_same_vulnerability_is_merged_across_scanners(self):
+        index = FindingIndex()
+        index.add("img", [Finding("trivy", "CVE-1", HIGH, location="openssl@3.0"),
+                          Finding("trivy", "CVE-2", LOW, location="zlib@1.2")])
+        index.add("img", [Finding("syft_grype", "CVE-1", CRITICAL, location="openssl@3.0"),
+                          Finding("syft_grype", "CVE-1", MEDIUM, location="openssl@3.1")])
+        summary = index.get_summary()
+        self.assertEqual(4, summary["raw"])
+        self.assertEqual(3, summary["unique"])
+        self.assertEqual(1, summary["duplicates"])
+        self.assertEqual([0, 1, 1, 1, 1, 0], summary["targets"]["img"]["raw"])
+        self.assertEqual([0, 1, 1, 0, 1, 0], summary["targets"]["img"]["unique"])
+
+    def test_targets_are_not_merged(self):
+        index = FindingIndex()
+        index.add("a", [Finding("trivy", "CVE-1", HIGH, location="openssl@3.0")])
+        index.add("b", [Finding("trivy", "CVE-1", HIGH, location="openssl@3.0")])
+        self.assertEqual(0, index.get_summary()["duplicates"])
+
+    def test_container_paths_are_merged(self):
+        index = FindingIndex()
+        index.add("dir", [Finding("kics", "r1", UNKNOWN, location="../../src/app/main.tf", line=3),
+                          Finding("semgrep", "r1", MEDIUM, location="/src/app/main.tf", line=3),
+                          Finding("semgrep", "r1", MEDIUM, location="/src/app/main.tf", line=4)])
+        self.assertEqual([0, 0, 2, 0, 0, 0], index.get_summary()["targets"]["dir"]["unique"])
+
+    def test_normalize_location(self):
+        self.assertEqual("a/b.py", normalize_location("/src/a/b.py"))
+        self.assertEqual("openssl@3.0", normalize_location("openssl@3.0"))
+        self.assertEqual("https://example.com/a", normalize_location("https://example.com/a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
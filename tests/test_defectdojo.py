@@ -0,0 +1,138 @@
+import os
+import json
+import argparse
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from output_handlers.defectdojo import CustomOutputHandler
+
+# python -m unittest discover -s tests
+
+class MockDefectDojo(BaseHTTPRequestHandler):
+    """Answers imports with a new test id and reimports with the given one.
+    The first failures requests are answered with failure_status."""
+
+    failures = 0
+    failure_status = 503
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        MockDefectDojo.requests.append((self.path, body))
+        if MockDefectDojo.failures > 0:
+            MockDefectDojo.failures -= 1
+            self.reply(MockDefectDojo.failure_status, {})
+        elif self.path == "/api/v2/import-scan/":
+            self.reply(201, {"test": len(MockDefectDojo.requests)})
+        elif self.path == "/api/v2/reimport-scan/":
+            self.reply(201, {"test": int(body.split(b'name="test"\r\n\r\n')[1].split(b"\r\n")[0])})
+        else:
+            self.reply(404, {})
+
+    def reply(self, status, data):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDefectDojoOutputHandler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockDefectDojo)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        MockDefectDojo.failures = 0
+        MockDefectDojo.failure_status = 503
+        MockDefectDojo.requests = []
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spool_dir = os.path.join(self.tmp.name, "spool")
+        self.report_path = os.path.join(self.tmp.name, "report.json")
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            f.write("{}")
+        patcher = patch.object(CustomOutputHandler, "BACKOFF_FACTOR", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_handler(self):
+        argv = ["cosca.py", "--dd_url", f"http://127.0.0.1:{self.server.server_port}",
+                "--dd_api_key", "key", "--dd_engagement_id", "7", "--dd_spool_dir", self.spool_dir]
+        with patch("sys.argv", argv):
+            return CustomOutputHandler("defectdojo", argparse.ArgumentParser())
+
+    def upload(self, handler):
+        handler.process_files(self.report_path, "target", "kics", {"defectdojo_format": "KICS Scan"})
+        handler.finalize()
+
+    def test_upload_is_retried(self):
+        MockDefectDojo.failures = 2
+        self.upload(self.make_handler())
+        self.assertEqual(3, len(MockDefectDojo.requests))
+        self.assertEqual(["tests.json"], os.listdir(self.spool_dir))
+
+    def test_server_errors_are_not_retried(self):
+        # The import may have been committed before the error
+        MockDefectDojo.failures = 1
+        MockDefectDojo.failure_status = 500
+        self.upload(self.make_handler())
+        self.assertEqual(1, len(MockDefectDojo.requests))
+        self.assertNotIn("tests.json", os.listdir(self.spool_dir))
+
+    def test_concurrent_first_uploads_import_once(self):
+        handler = self.make_handler()
+        for _ in range(4):
+            handler.process_files(self.report_path, "target", "kics", {"defectdojo_format": "KICS Scan"})
+        handler.finalize()
+        paths = [path for path, _ in MockDefectDojo.requests]
+        self.assertEqual(["/api/v2/import-scan/"] + ["/api/v2/reimport-scan/"] * 3, paths)
+
+    def test_second_upload_is_reimported(self):
+        handler = self.make_handler()
+        self.upload(handler)
+        self.upload(handler)
+        self.upload(self.make_handler())
+        self.assertEqual(["/api/v2/import-scan/", "/api/v2/reimport-scan/", "/api/v2/reimport-scan/"],
+                         [path for path, _ in MockDefectDojo.requests])
+
+    def test_failed_upload_is_resumed(self):
+        MockDefectDojo.failures = 100
+        handler = self.make_handler()
+        handler.import_session = handler.create_session(retries=0)
+        self.upload(handler)
+        self.assertNotIn("tests.json", os.listdir(self.spool_dir))
+        self.assertEqual(1, len(os.listdir(self.spool_dir)))
+        MockDefectDojo.failures = 0
+        MockDefectDojo.requests = []
+        self.make_handler().finalize()
+        self.assertEqual(1, len(MockDefectDojo.requests))
+        self.assertEqual(["tests.json"], os.listdir(self.spool_dir))
+
+    def test_claimed_uploads_arent_resumed(self):
+        job_dir, claim = self.make_handler().spool(self.report_path, {
+            "dd_url": f"http://127.0.0.1:{self.server.server_port}", "engagement": "7",
+            "scan_type": "KICS Scan", "test_title": "kics target", "file_name": "report.json"})
+        # Another run sharing the spool folder leaves it to the run that claimed it
+        self.make_handler().finalize()
+        self.assertEqual([], MockDefectDojo.requests)
+        os.close(claim)
+        self.make_handler().finalize()
+        self.assertEqual(["/api/v2/import-scan/"], [path for path, _ in MockDefectDojo.requests])
+        self.assertFalse(os.path.exists(job_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import Mock
+from common import docker_client
+from common.docker_client import DockerHost, HostPool, parse_host
+from common.target_type import TargetType
+from test_scanner import DummyScanner
+
+# python -m unittest discover -s tests
+
+class FakeContainer:
+    """Container of a remote host whose filesystem is a local directory"""
+
+    id = "remote1"
+    short_id = "remote1"
+
+    def __init__(self, root):
+        self.root = root
+
+    def put_archive(self, path, data):
+        with tarfile.open(fileobj=data) as tar:
+            tar.extractall(os.path.join(self.root, path.lstrip("/")), filter="data")
+
+    def get_archive(self, path):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(os.path.join(self.root, path.lstrip("/")), arcname=os.path.basename(path))
+        return [buffer.getvalue()], {}
+
+    def start(self):
+        with open(os.path.join(self.root, "tmp", "report.json"), "w", encoding="utf-8") as f:
+            f.write("{}")
+
+    def logs(self, stream, follow):
+        return iter([b"scanned\n"])
+
+    def wait(self):
+        return {"StatusCode": 0}
+
+    def remove(self, force):
+        pass
+
+
+class ReportScanner(DummyScanner):
+    CONTAINER_REPORT_DIRECTORY = "/tmp"
+
+
+class TestHostPool(unittest.TestCase):
+
+    def test_scans_are_placed_by_weight(self):
+        small, big = DockerHost("tcp://small:2375"), DockerHost("tcp://big:2375", weight=2)
+        pool = HostPool([small, big])
+        placed = [str(pool.acquire()) for _ in range(3)]
+        self.assertEqual(["tcp://big:2375", "tcp://small:2375", "tcp://big:2375"], placed)
+        pool.release(small)
+        self.assertIs(small, pool.acquire())
+
+    def test_parse_host(self):
+        host = parse_host("tcp://build2:2376=2")
+        self.assertEqual(("tcp://build2:2376", 2), (host.url, host.weight))
+        self.assertTrue(host.is_remote)
+        self.assertFalse(parse_host("unix:///var/run/docker.sock").is_remote)
+        with self.assertRaises(ValueError):
+            parse_host("tcp://build2:2376=0")
+        with self.assertRaises(ValueError):
+            parse_host("no-such-context")
+
+
+class TestRemoteContainers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "container")
+        self.target = os.path.join(self.tmp.name, "target")
+        self.working_dir = os.path.join(self.tmp.name, "work")
+        os.makedirs(os.path.join(self.target, "src"))
+        os.makedirs(self.working_dir)
+        with open(os.path.join(self.target, "src", "main.tf"), "w", encoding="utf-8") as f:
+            f.write("resource {}")
+
+    def test_copy_roundtrip(self):
+        container = FakeContainer(self.root)
+        docker_client.copy_to_container(container, self.target, "/src")
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "src", "src", "main.tf")))
+        docker_client.copy_from_container(container, "/src", self.working_dir)
+        self.assertTrue(os.path.isfile(os.path.join(self.working_dir, "src", "main.tf")))
+
+    def test_remote_scan_copies_volumes(self):
+        container = FakeContainer(self.root)
+        host = DockerHost("tcp://remote:2375")
+        host.client = Mock()
+        host.client.containers.create.return_value = container
+        scanner = ReportScanner(TargetType.DIRECTORY)
+        scanner.docker_host = host
+        volumes = {self.target: {"bind": "/src", "mode": "rw"},
+                   self.working_dir: {"bind": "/tmp", "mode": "rw"}}
+        self.assertEqual("scanned\n", scanner.run_container("img", "cmd", volumes))
+        self.assertNotIn("volumes", host.client.containers.create.call_args.kwargs)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "src", "src", "main.tf")))
+        self.assertTrue(os.path.isfile(os.path.join(self.working_dir, "report.json")))
+        # The target isn't written back
+        self.assertEqual(["src"], os.listdir(self.target))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from common import findings
+from common.findings import parse_findings, count_by_severity, normalize_severity, HIGH, CRITICAL, UNKNOWN
+
+# python -m unittest discover -s tests
+
+class TestFindings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, data, name="report.json"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            if isinstance(data, list):
+                f.write("\n".join(json.dumps(d) for d in data) + "\n")
+            else:
+                json.dump(data, f)
+        return path
+
+    def test_grype(self):
+        path = self.write({"matches": [
+            {"vulnerability": {"id": "CVE-1", "severity": "Negligible"}, "artifact": {"name": "a", "version": "1"}},
+            {"vulnerability": {"id": "CVE-2", "severity": "Critical"}, "artifact": {"name": "b", "version": "2"}},
+        ]})
+        result = list(parse_findings(path, "grype", "syft_grype"))
+        self.assertEqual(["CVE-1", "CVE-2"], [f.rule_id for f in result])
+        self.assertEqual("b@2", result[1].location)
+        self.assertEqual("syft_grype", result[1].scanner)
+        self.assertEqual([1, 0, 0, 0, 1, 0], count_by_severity(result))
+
+    def test_trivy(self):
+        path = self.write({"Results": [
+            {"Target": "img", "Vulnerabilities": [{"VulnerabilityID": "CVE-1", "Severity": "HIGH", "PkgName": "p"}]},
+            {"Target": "/app/.env", "Secrets": [{"RuleID": "aws", "Severity": "CRITICAL", "StartLine": 3}]},
+            {"Target": "clean"},
+        ]})
+        self.assertEqual([0, 0, 0, 1, 1, 0], count_by_severity(parse_findings(path, "trivy")))
+
+    def test_kics_counts_files(self):
+        path = self.write({"queries": [
+            {"query_id": "q1", "severity": "MEDIUM", "files": [{"file_name": "a"}, {"file_name": "b"}]},
+            {"query_id": "q2", "severity": "TRACE", "files": [{"file_name": "a"}]},
+        ]})
+        self.assertEqual([1, 0, 2, 0, 0, 0], count_by_severity(parse_findings(path, "kics")))
+
+    def test_semgrep_falls_back_to_severity(self):
+        path = self.write({"results": [
+            {"check_id": "r1", "path": "a.py", "extra": {"metadata": {"impact": "LOW"}}},
+            {"check_id": "r2", "path": "a.py", "extra": {"severity": "ERROR", "metadata": {}}},
+        ]})
+        self.assertEqual([0, 1, 0, 1, 0, 0], count_by_severity(parse_findings(path, "semgrep")))
+
+    def test_zap(self):
+        path = self.write({"site": [{"@name": "https://example.com", "alerts": [
+            {"pluginid": "1", "riskcode": "0"}, {"pluginid": "2", "riskcode": "3"}]}]})
+        self.assertEqual([1, 0, 0, 1, 0, 0], count_by_severity(parse_findings(path, "zap")))
+
+    def test_sarif_counts_results(self):
+        path = self.write({"runs": [{
+            "tool": {"driver": {"rules": [{"id": "r1", "properties": {"security-severity": "7.0"}}]}},
+            "results": [{"ruleId": "r1"}, {"ruleId": "r1"}, {"ruleId": "r2", "level": "note"}],
+        }]})
+        self.assertEqual([0, 1, 0, 2, 0, 0], count_by_severity(parse_findings(path, "sarif")))
+
+    def test_trufflehog(self):
+        path = self.write([
+            {"DetectorName": "AWS", "Verified": True,
+             "SourceMetadata": {"Data": {"Filesystem": {"file": "/src/a", "line": 2}}}},
+            {"DetectorName": "Github", "Verified": False},
+        ], "report.jsonl")
+        result = list(parse_findings(path, "trufflehog"))
+        self.assertEqual([CRITICAL, HIGH], [f.severity for f in result])
+        self.assertEqual(("/src/a", 2), (result[0].location, result[0].line))
+
+    def test_without_ijson(self):
+        path = self.write({"matches": [{"vulnerability": {"id": "CVE-1", "severity": "High"}}]})
+        with patch.object(findings, "ijson", None):
+            self.assertEqual([0, 0, 0, 1, 0, 0], count_by_severity(parse_findings(path, "grype")))
+
+    def test_unknown_severity(self):
+        self.assertEqual(UNKNOWN, normalize_severity("Whatever"))
+        self.assertEqual(UNKNOWN, normalize_severity(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+from docker.errors import ImageNotFound
+from common.image_puller import ImagePuller
+
+# python -m unittest discover -s tests
+
+class TestImagePuller(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.client = Mock()
+        self.client.images.get.return_value = Mock(attrs={"RepoDigests": ["anchore/grype@sha256:old"]})
+        self.client.images.get_registry_data.return_value = Mock(id="sha256:old")
+        patcher = patch('common.docker_client.get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.puller = ImagePuller(os.path.join(self.tmp.name, "pulls.json"), ttl=3600)
+
+    def test_up_to_date_image_is_not_pulled(self):
+        self.assertEqual([], self.puller.pull_all(["anchore/grype"]))
+        self.client.images.pull.assert_not_called()
+
+    def test_outdated_image_is_pulled(self):
+        self.client.images.get_registry_data.return_value = Mock(id="sha256:new")
+        self.puller.pull_all(["anchore/grype"])
+        self.client.images.pull.assert_called_once_with("anchore/grype", tag="latest")
+
+    def test_missing_image_is_pulled(self):
+        self.client.images.get.side_effect = ImageNotFound("missing")
+        self.puller.pull_all(["public.ecr.aws/portswigger/dastardly:latest"])
+        self.client.images.pull.assert_called_once_with(
+            "public.ecr.aws/portswigger/dastardly", tag="latest")
+
+    def test_registry_not_checked_within_ttl(self):
+        self.puller.last_checked["anchore/grype"] = time.time()
+        self.puller.pull_all(["anchore/grype"])
+        self.client.images.get_registry_data.assert_not_called()
+        self.puller.pull_all(["anchore/grype"], force=True)
+        self.client.images.get_registry_data.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import subprocess
+import unittest
+from common.incremental import IncrementalBaseline, to_relpath
+
+# python -m unittest discover -s tests
+
+class TestIncrementalBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.target = os.path.join(self.tmp.name, "target")
+        self.baselines = os.path.join(self.tmp.name, "baselines")
+        os.makedirs(os.path.join(self.target, "sub"))
+        self.write("a.py", "a")
+        self.write("sub/b.py", "b")
+        self.report = os.path.join(self.tmp.name, "report.json")
+        self.write_file(self.report, "{}")
+
+    def write(self, rel_path, content):
+        self.write_file(os.path.join(self.target, rel_path), content)
+
+    def write_file(self, path, content):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def save_baseline(self):
+        baseline = IncrementalBaseline(self.baselines, self.target, "semgrep")
+        baseline.save(baseline.hash_files(), ["img"], self.report)
+
+    def test_no_baseline_requires_full_scan(self):
+        baseline = IncrementalBaseline(self.baselines, self.target, "semgrep")
+        self.assertIsNone(baseline.get_changes(baseline.hash_files(), ["img"]))
+
+    def test_changed_and_removed_files(self):
+        self.save_baseline()
+        self.write("a.py", "changed")
+        self.write("c.py", "new")
+        os.remove(os.path.join(self.target, "sub", "b.py"))
+        baseline = IncrementalBaseline(self.baselines, self.target, "semgrep")
+        changed, removed = baseline.get_changes(baseline.hash_files(), ["img"])
+        self.assertEqual({"a.py", "c.py"}, changed)
+        self.assertEqual({os.path.join("sub", "b.py")}, removed)
+        self.assertEqual("report.json", os.path.basename(baseline.get_report_path()))
+
+    def test_new_scanner_image_requires_full_scan(self):
+        self.save_baseline()
+        baseline = IncrementalBaseline(self.baselines, self.target, "semgrep")
+        self.assertIsNone(baseline.get_changes(baseline.hash_files(), ["other"]))
+
+    def test_git_refs_arent_options(self):
+        subprocess.run(["git", "init", "-q", self.target], check=True)
+        subprocess.run(["git", "-C", self.target, "add", "."], check=True)
+        subprocess.run(["git", "-C", self.target, "-c", "user.name=t", "-c", "user.email=t@t",
+                        "commit", "-qm", "init"], check=True)
+        self.write("a.py", "changed")
+        baseline = IncrementalBaseline(self.baselines, self.target, "semgrep")
+        self.assertEqual({"a.py"}, baseline.get_git_changes("HEAD"))
+        output = os.path.join(self.tmp.name, "written")
+        for ref in (f"--output={output}", "missing"):
+            with self.subTest(ref=ref):
+                with self.assertRaises(ValueError):
+                    baseline.get_git_changes(ref)
+        self.assertFalse(os.path.exists(output))
+
+    def test_to_relpath(self):
+        self.assertEqual("a/b.tf", to_relpath("../../src/a/b.tf", "/src"))
+        self.assertEqual("a/b.tf", to_relpath("/src/a/b.tf", "/src"))
+        self.assertEqual(".env", to_relpath("/src/.env", "/src"))
+
+if __name__ == '__main__':
+    unittest.main()
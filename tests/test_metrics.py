@@ -0,0 +1,62 @@
+import os
+import json
+import tempfile
+import unittest
+from common.metrics import Metrics
+from common.target_type import TargetType
+from cosca import Cosca
+
+# python -m unittest discover -s tests
+
+class TestMetrics(unittest.TestCase):
+
+    def test_timer_records_phase(self):
+        m = Metrics()
+        with m.timer("scan", scanner="kics"):
+            pass
+        sample = m.to_json()["samples"][0]
+        self.assertEqual("phase_duration_seconds", sample["name"])
+        self.assertEqual({"phase": "scan", "scanner": "kics"}, sample["labels"])
+        self.assertGreaterEqual(sample["value"], 0)
+
+    def test_timer_records_on_error(self):
+        m = Metrics()
+        with self.assertRaises(ValueError):
+            with m.timer("output"):
+                raise ValueError()
+        self.assertEqual(1, len(m.to_json()["samples"]))
+
+    def test_prometheus_sums_by_labels(self):
+        m = Metrics()
+        m.observe("container_log_bytes", 10, scanner="kics")
+        m.observe("container_log_bytes", 5, scanner="kics")
+        m.observe("container_log_bytes", 1, scanner="semgrep")
+        text = m.to_prometheus()
+        self.assertIn("# TYPE cosca_container_log_bytes summary", text)
+        self.assertIn('cosca_container_log_bytes_sum{scanner="kics"} 15', text)
+        self.assertIn('cosca_container_log_bytes_count{scanner="kics"} 2', text)
+        self.assertIn('cosca_container_log_bytes_sum{scanner="semgrep"} 1', text)
+
+    def test_runs_have_their_own_metrics(self):
+        first, second = (Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0"], check_docker=False) for _ in range(2))
+        instance = first.get_scanner_instance("kics", TargetType.DIRECTORY)
+        instance.metrics.observe("containers", 1)
+        self.assertEqual(1, len(first.metrics.to_json()["samples"]))
+        self.assertEqual([], second.metrics.to_json()["samples"])
+
+    def test_label_values_are_escaped(self):
+        self.assertEqual('{target="a\\"b"}', Metrics.format_labels([("target", 'a"b')]))
+
+    def test_write(self):
+        m = Metrics()
+        m.observe("containers", 1, exit_code=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            m.write(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual("0", json.load(f)["samples"][0]["labels"]["exit_code"])
+            self.assertTrue(os.path.exists(os.path.join(tmp, "metrics.prom")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import json
+import argparse
+import tempfile
+import unittest
+from unittest.mock import patch
+from output_handlers.pdf import CustomOutputHandler
+
+# python -m unittest discover -s tests
+
+class TestPdfOutputHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with patch("sys.argv", ["cosca.py", "--pdf_output_folder", self.tmp.name]):
+            self.handler = CustomOutputHandler("pdf", argparse.ArgumentParser())
+        self.report = os.path.join(self.handler.tmp_dir, "cosca_run", "abc", "kics", "report.json")
+
+    def test_summary_is_written_once_on_finalize(self):
+        for i in range(3):
+            result = self.handler.process_files(
+                self.report, f"target{i}", "kics", {"json_findings": [0, 1, 0, 0, 0, 0]})
+        pdf_path = result["pdf"][0]["pdf_summary"]
+        json_path = result["pdf"][1]["json_summary"]
+        self.assertFalse(os.path.exists(json_path))
+        with patch.object(self.handler, "write_pdf") as write_pdf:
+            self.handler.finalize()
+        write_pdf.assert_called_once()
+        self.assertEqual(pdf_path, write_pdf.call_args[0][0])
+        with open(json_path, encoding='utf-8') as f:
+            table = json.load(f)["table"]
+        self.assertEqual(4, len(table))
+        self.assertEqual(["target2", "kics", 0, 1, 0, 0, 0, 0], table[-1])
+
+    def test_deduplicated_table(self):
+        result = self.handler.process_files(self.report, "img", "trivy", {"json_findings": [0, 0, 0, 2, 0, 0]})
+        self.handler.process_summary({"targets": {"img": {"raw": [0, 0, 0, 2, 0, 0], "unique": [0, 0, 0, 1, 0, 0]}}})
+        self.handler.finalize()
+        with open(result["pdf"][1]["json_summary"], encoding='utf-8') as f:
+            self.assertEqual(["img", 2, 1, 0, 0, 0, 1, 0, 0], json.load(f)["deduplicated"][1])
+
+    def test_pdf_is_rendered(self):
+        self.handler.process_files(self.report, "target", "kics", {"json_findings": [0, 0, 0, 1, 0, 0]})
+        self.handler.finalize()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "cosca_run.pdf")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import unittest
+from common.renderers import format_table, render_trivy_table, render_trufflehog_plain
+
+# python -m unittest discover -s tests
+
+class TestRenderers(unittest.TestCase):
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_format_table(self):
+        lines = list(format_table(["A", "Bee"], [["long value", 1]]))
+        self.assertEqual("| A          | Bee |\n", lines[1])
+        self.assertEqual("| long value | 1   |\n", lines[3])
+        self.assertEqual(lines[0], lines[-1])
+
+    def test_trivy_table(self):
+        report = {"Results": [
+            {"Target": "alpine (alpine 3.19)", "Type": "alpine", "Vulnerabilities": [
+                {"PkgName": "openssl", "VulnerabilityID": "CVE-1", "Severity": "HIGH",
+                 "InstalledVersion": "1.0", "FixedVersion": "1.1", "Title": "bad"}]},
+            {"Target": "clean", "Type": "npm"}]}
+        text = "".join(render_trivy_table(self.write("t.json", json.dumps(report))))
+        self.assertIn("Total: 1 (UNKNOWN: 0, LOW: 0, MEDIUM: 0, HIGH: 1, CRITICAL: 0)", text)
+        self.assertIn("CVE-1", text)
+        self.assertNotIn("clean", text)
+
+    def test_trufflehog_plain(self):
+        line = {"SourceMetadata": {"Data": {"Filesystem": {"file": "/src/.env", "line": 3}}},
+                "DetectorName": "AWS", "DecoderName": "PLAIN", "Verified": True, "Redacted": "AKIA"}
+        text = "".join(render_trufflehog_plain(self.write("t.json", json.dumps(line) + "\n\n")))
+        self.assertIn("Found verified result", text)
+        self.assertIn("File: /src/.env", text)
+        self.assertIn("Line: 3", text)
+
+if __name__ == '__main__':
+    unittest.main()
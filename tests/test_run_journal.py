@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from common.run_journal import RunJournal, COMPLETED
+from cosca import Cosca
+
+# python -m unittest discover -s tests
+
+class TestRunJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.journal = RunJournal(self.tmp.name)
+
+    def test_latest_entry_of_a_scan_wins(self):
+        self.journal.start(["-t", "/src"])
+        self.journal.record("/src", "kics", COMPLETED, state={"report_path": "a.json"})
+        self.journal.record("/src", "semgrep", "error", error="boom")
+        self.journal.record("/src", "zap", COMPLETED, state={"report_path": "b.json"})
+        self.journal.record("/src", "zap", "timeout")
+        with open(self.journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"event": "scan", "target": "/src"')  # cut by a crash
+        self.journal.start(["--resume", self.journal.run_id])
+        self.assertEqual({("/src", "kics"): {"report_path": "a.json"}}, self.journal.get_completed())
+        self.assertEqual(["-t", "/src"], self.journal.get_argv())
+
+    def test_resume_reuses_the_arguments_of_the_run(self):
+        self.journal.start(["-t", "/src", "-c", "CICD"])
+        # Run directories are looked up in the temporary directory, like this one
+        app = Cosca(["--resume", self.journal.run_id, "-o", "console"], check_docker=False)
+        self.assertEqual(["/src"], app.args.target)
+        self.assertEqual("CICD", app.args.combo)
+        self.assertEqual(["console"], app.args.output)
+
+    def test_completed_scans_are_restored_not_run(self):
+        app = Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0"], check_docker=False)
+        instance = Mock(error=None, timed_out=False, cancelled=False)
+        state = {"report_path": "a.json", "output_report_path": "a.json", "stdout": []}
+        with patch.object(app, "scan_or_restore") as scan:
+            self.assertIs(instance, app.run_scan(instance, "/src", self.tmp.name, "", state=state))
+        scan.assert_not_called()
+        instance.load_state.assert_called_once_with(state, self.tmp.name)
+
+    def test_scanner_exit_fails_only_its_scan(self):
+        app = Cosca(["-t", "/tmp", "--sbom_cache_max_size", "0"], check_docker=False)
+        instance = Mock(error=None, timed_out=False, cancelled=False)
+        instance.NAME = "kics"
+        with patch.object(app, "scan_or_restore", side_effect=SystemExit(1)):
+            app.run_scan(instance, "/src", self.tmp.name, "")
+        self.assertEqual("exited with code 1", instance.error)
+        self.assertFalse(app.has_passed(instance))
+
+
+if __name__ == '__main__':
+    unittest.main()
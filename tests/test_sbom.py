@@ -0,0 +1,87 @@
+import os
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, Mock
+from common import sbom
+from common.sbom import SbomStore
+from common.combo_graph import get_nodes
+from common.scan_cache import ScanCache
+from common.target_type import TargetType
+from test_scanner import DummyScanner
+
+# python -m unittest discover -s tests
+
+class SbomScanner(DummyScanner):
+    SBOM_IMAGE = sbom.SYFT_IMAGE
+    CONTAINER_REPORT_DIRECTORY = "/tmp"
+
+
+class TestSbomStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.generate = Mock(side_effect=self.write_sbom)
+        patcher = patch.dict(sbom.GENERATORS, {sbom.SYFT_IMAGE: self.generate})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_sbom(self, scanner, target, sbom_dir):
+        with open(os.path.join(sbom_dir, sbom.TABLE_FILE), 'w', encoding='utf-8') as f:
+            f.write("NAME VERSION\n")
+
+    def make_working_dir(self, name):
+        working_dir = os.path.join(self.tmp.name, name)
+        os.makedirs(working_dir)
+        return working_dir
+
+    def test_sbom_is_generated_once_per_run(self):
+        store = SbomStore()
+        scanners = []
+        for i in range(4):
+            scanner = SbomScanner(TargetType.DIRECTORY)
+            scanner.sbom_store = store
+            scanners.append((scanner, self.make_working_dir(f"scanner{i}")))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            logs = list(executor.map(lambda s: str(s[0].get_sbom("/src", s[1])), scanners))
+        self.assertEqual(["NAME VERSION\n"] * 4, logs)
+        self.generate.assert_called_once()
+
+    def test_sbom_is_reused_by_later_runs(self):
+        cache = ScanCache(os.path.join(self.tmp.name, "cache"), 1024 * 1024)
+        for run in ("run1", "run2"):
+            scanner = SbomScanner(TargetType.DIRECTORY)
+            scanner.sbom_store = SbomStore(cache)
+            with patch.object(SbomStore, "get_cache_key", return_value="key"):
+                self.assertEqual("NAME VERSION\n", str(scanner.get_sbom("/src", self.make_working_dir(run))))
+        self.generate.assert_called_once()
+
+    def test_cdxgen_gets_a_writable_copy_of_the_target(self):
+        target = os.path.join(self.tmp.name, "target")
+        os.makedirs(target)
+        with open(os.path.join(target, "requirements.txt"), 'w', encoding='utf-8') as f:
+            f.write("requests\n")
+        scanner = SbomScanner(TargetType.DIRECTORY)
+        sbom_dir = self.make_working_dir(os.path.join("cdxgen", sbom.SBOM_DIRECTORY))
+        mounts = []
+        def run_container(image, command, volumes, **kwargs):
+            copy, mount = next((p, v) for p, v in volumes.items() if v["bind"] == sbom.CONTAINER_TARGET_DIRECTORY)
+            mounts.append((mount["mode"], os.listdir(copy)))
+            self.assertNotEqual(target, copy)
+        with patch.object(scanner, "run_container", side_effect=run_container):
+            sbom.generate_cdxgen(scanner, target, sbom_dir)
+        self.assertEqual([("rw", ["requirements.txt"])], mounts)
+        self.assertEqual([sbom.SBOM_DIRECTORY], os.listdir(os.path.dirname(sbom_dir)))
+
+    def test_combos_only_use_existing_scanners(self):
+        with open("combos.json", 'r', encoding='utf-8') as f:
+            combos = json.load(f)["combos"]
+        scanners = {n.name for c in combos for m in c["mappings"] for n in get_nodes(m["scanners"])}
+        missing = [s for s in scanners if not os.path.isfile(os.path.join("scanners", f"{s}.py"))]
+        self.assertEqual([], missing)
+
+
+if __name__ == '__main__':
+    unittest.main()
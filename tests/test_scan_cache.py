@@ -0,0 +1,60 @@
+import os
+import time
+import tempfile
+import unittest
+from common.scan_cache import ScanCache
+from common.fingerprint import hash_tree
+
+# python -m unittest discover -s tests
+
+class TestScanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = ScanCache(os.path.join(self.tmp.name, "cache"), max_size=10)
+
+    def make_dir(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(path)
+        with open(os.path.join(path, "report.json"), 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_store_and_restore(self):
+        src = self.make_dir("src", "12345")
+        key = ScanCache.get_key("kics", ["sha256:1"], "tree:abc")
+        self.cache.store(key, src, {"report_path": "report.json"})
+        dest = os.path.join(self.tmp.name, "dest")
+        self.assertEqual({"report_path": "report.json"}, self.cache.restore(key, dest))
+        with open(os.path.join(dest, "report.json"), encoding='utf-8') as f:
+            self.assertEqual("12345", f.read())
+
+    def test_expired_entries_are_missed(self):
+        self.cache.store("a", self.make_dir("a", "12345"), {})
+        dest = os.path.join(self.tmp.name, "dest")
+        self.assertEqual({}, ScanCache(self.cache.cache_dir, 10, ttl=60).restore("a", dest))
+        self.assertIsNone(ScanCache(self.cache.cache_dir, 10, ttl=0).restore("a", dest))
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.restore("missing", os.path.join(self.tmp.name, "dest")))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.store("a", self.make_dir("a", "12345"), {})
+        time.sleep(0.01)
+        self.cache.store("b", self.make_dir("b", "12345"), {})
+        time.sleep(0.01)
+        self.cache.restore("a", os.path.join(self.tmp.name, "dest"))
+        self.cache.store("c", self.make_dir("c", "12345"), {})
+        self.assertEqual(["a", "c"], sorted(os.listdir(self.cache.cache_dir)))
+
+    def test_tree_hash_follows_content(self):
+        src = self.make_dir("tree", "12345")
+        before = hash_tree(src)
+        self.assertEqual(before, hash_tree(src))
+        with open(os.path.join(src, "report.json"), 'w', encoding='utf-8') as f:
+            f.write("54321")
+        self.assertNotEqual(before, hash_tree(src))
+
+if __name__ == '__main__':
+    unittest.main()
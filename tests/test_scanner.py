@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, Mock
+from common.target_type import TargetType
+from scanner import Scanner, ScanTimeout, ScanCancelled
+from scanners import trufflehog
+
+# python -m unittest discover -s tests
+
+class DummyScanner(Scanner):
+    NAME = "dummy"
+    DOCKER_IMAGE = "dummy/image"
+    DEFECTDOJO_IMPORT_FORMAT = "Dummy"
+    REPORT_FORMAT = "sarif"
+    ACCEPTED_TARGET_TYPES = [TargetType.DIRECTORY]
+
+    def scan(self, target, working_dir, network=""):
+        pass
+
+    def get_aux_args(self):
+        return {}
+
+
+class TestScannerContainers(unittest.TestCase):
+
+    def setUp(self):
+        self.container = Mock(id="c1")
+        self.container.logs.return_value = iter([b"first li", b"ne\nsecond\nthi", b"rd"])
+        client = Mock()
+        client.containers.run.return_value = self.container
+        patcher = patch('common.docker_client.get_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scanner = DummyScanner(TargetType.DIRECTORY)
+
+    def test_stream_container_yields_lines(self):
+        lines = list(self.scanner.stream_container("img", "cmd"))
+        self.assertEqual(["first line\n", "second\n", "third"], lines)
+        self.container.logs.assert_called_with(stream=True, follow=True)
+        self.container.remove.assert_called_once_with(force=True)
+
+    def test_run_container_writes_log_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "out.log")
+            stream = self.scanner.run_container("img", "cmd", log_path=log_path)
+            self.assertEqual("first line\nsecond\nthird", str(stream))
+            self.assertEqual(["first line\n", "second\n", "third"], list(stream))
+
+    def test_container_removed_when_consumer_stops(self):
+        lines = self.scanner.stream_container("img", "cmd")
+        next(lines)
+        lines.close()
+        self.container.remove.assert_called_once_with(force=True)
+
+
+    def test_container_removed_at_deadline(self):
+        removed = threading.Event()
+        def logs(stream, follow):
+            yield b"started\n"
+            removed.wait(5)
+        self.container.logs.side_effect = logs
+        self.container.remove.side_effect = lambda force: removed.set()
+        self.scanner.deadline = time.monotonic() + 0.05
+        with self.assertRaises(ScanTimeout):
+            self.scanner.run_container("img", "cmd")
+        self.assertTrue(self.scanner.timed_out)
+        self.assertTrue(removed.is_set())
+
+    def test_cancel_removes_the_container(self):
+        removed = threading.Event()
+        def logs(stream, follow):
+            yield b"started\n"
+            removed.wait(5)
+        self.container.logs.side_effect = logs
+        self.container.remove.side_effect = lambda force: removed.set()
+        lines = self.scanner.stream_container("img", "cmd")
+        self.assertEqual("started\n", next(lines))
+        threading.Timer(0.05, self.scanner.cancel).start()
+        with self.assertRaises(ScanCancelled):
+            list(lines)
+        self.assertFalse(self.scanner.timed_out)
+
+    def test_no_container_started_after_deadline(self):
+        self.scanner.deadline = time.monotonic() - 1
+        with self.assertRaises(ScanTimeout):
+            self.scanner.run_container("img", "cmd")
+        self.container.logs.assert_not_called()
+
+
+class TestScannerFindings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.scanner = DummyScanner(TargetType.DIRECTORY)
+        self.scanner.report_path = os.path.join(self.tmp.name, "report.json")
+        self.write_report(1)
+
+    def write_report(self, results):
+        with open(self.scanner.report_path, 'w', encoding='utf-8') as f:
+            json.dump({"runs": [{"results": [{"ruleId": "r", "level": "error"}] * results}]}, f)
+
+    def test_report_is_parsed_once(self):
+        with patch.object(self.scanner, "parse_findings", wraps=self.scanner.parse_findings) as parse:
+            self.assertEqual([0, 0, 0, 1, 0, 0], self.scanner.count_findings())
+            self.scanner.count_findings()
+            self.assertEqual(1, len(list(self.scanner.get_findings())))
+            self.scanner.process_outputs([Mock(), Mock()], "target")
+        parse.assert_called_once()
+
+    def test_report_is_parsed_again_when_it_changes(self):
+        self.scanner.count_findings()
+        self.write_report(3)
+        self.assertEqual([0, 0, 0, 3, 0, 0], self.scanner.count_findings())
+
+    def test_aux_args_are_computed_once(self):
+        outputs = [Mock(), Mock()]
+        with patch.object(self.scanner, "get_aux_args", return_value={}) as get_aux_args:
+            self.scanner.process_outputs(outputs, "target")
+        get_aux_args.assert_called_once()
+        self.assertEqual(1, len(list(outputs[1].process_findings.call_args[0][0])))
+
+class TestTrufflehog(unittest.TestCase):
+
+    def test_github_targets_arent_local_paths(self):
+        scanner = trufflehog.CustomScanner(TargetType.GITHUB)
+        scanner.stream_container = Mock()
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(SystemExit):
+                scanner.scan(tmp, tmp)
+        scanner.stream_container.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
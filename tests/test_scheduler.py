@@ -0,0 +1,62 @@
+import time
+import unittest
+from common.scheduler import ScanScheduler, Skipped
+
+# python -m unittest discover -s tests
+
+class TestScanScheduler(unittest.TestCase):
+
+    def test_results_in_submission_order(self):
+        scheduler = ScanScheduler(jobs=4)
+        delays = [0.05, 0.01, 0.03, 0.0]
+        for i, d in enumerate(delays):
+            scheduler.submit(i, lambda d=d, i=i: time.sleep(d) or i * 10)
+        results = list(scheduler.ready()) + list(scheduler.drain())
+        scheduler.shutdown()
+        self.assertEqual([(0, 0), (1, 10), (2, 20), (3, 30)], results)
+
+    def test_pending_is_bounded(self):
+        scheduler = ScanScheduler(jobs=1, max_pending=2)
+        consumed = []
+        for i in range(5):
+            scheduler.submit(i, lambda i=i: i)
+            consumed.extend(scheduler.ready())
+            self.assertLessEqual(len(scheduler.pending), 2)
+        consumed.extend(scheduler.drain())
+        scheduler.shutdown()
+        self.assertEqual(list(range(5)), [k for k, _ in consumed])
+
+    def test_exceptions_reach_the_consumer(self):
+        scheduler = ScanScheduler(jobs=2)
+        def fail():
+            raise SystemExit(1)
+        scheduler.submit("bad", fail)
+        with self.assertRaises(SystemExit):
+            list(scheduler.drain())
+        scheduler.shutdown()
+
+    def test_jobs_start_after_their_needs(self):
+        scheduler = ScanScheduler(jobs=4)
+        done = []
+        slow = scheduler.submit("slow", lambda: time.sleep(0.05) or done.append("slow"))
+        scheduler.submit("fast", lambda: done.append("fast"))
+        scheduler.submit("after", lambda: list(done), needs=[slow])
+        results = dict(scheduler.drain())
+        scheduler.shutdown()
+        self.assertIn("slow", results["after"])
+
+    def test_jobs_are_skipped_when_a_need_fails(self):
+        scheduler = ScanScheduler(jobs=2, passed=lambda result: result != "gate")
+        gate = scheduler.submit("gate", lambda: "gate")
+        ok = scheduler.submit("ok", lambda: "ok")
+        gated = scheduler.submit("gated", lambda: "ran", needs=[gate])
+        scheduler.submit("after_skip", lambda: "ran", needs=[ok, gated])
+        scheduler.submit("after_ok", lambda: "ran", needs=[ok])
+        results = dict(scheduler.drain())
+        scheduler.shutdown()
+        self.assertIsInstance(results["gated"], Skipped)
+        self.assertIsInstance(results["after_skip"], Skipped)
+        self.assertEqual("ran", results["after_ok"])
+
+if __name__ == '__main__':
+    unittest.main()
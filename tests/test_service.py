@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import unittest
+import requests
+from common.job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+from common.target_type import TargetType
+from service import CoscaService, JobCosca
+
+# python -m unittest discover -s tests
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+
+    def test_jobs_are_claimed_in_order(self):
+        queue = JobQueue(self.path)
+        first = queue.submit(["-t", "a"])
+        queue.submit(["-t", "b"])
+        self.assertEqual((first, ["-t", "a"]), queue.claim(timeout=0))
+        self.assertEqual(RUNNING, queue.get(first)["status"])
+        queue.finish(first, 0, [{"scanner": "kics"}])
+        job = queue.get(first)
+        self.assertEqual((DONE, 0, [{"scanner": "kics"}]), (job["status"], job["exit_code"], job["result"]))
+        self.assertEqual(["-t", "b"], queue.claim(timeout=0)[1])
+        self.assertIsNone(queue.claim(timeout=0))
+
+    def test_running_jobs_are_queued_again_on_restart(self):
+        queue = JobQueue(self.path)
+        job_id = queue.submit(["-t", "a"])
+        queue.claim(timeout=0)
+        self.assertEqual(QUEUED, JobQueue(self.path).get(job_id)["status"])
+
+
+class TestService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.service = CoscaService(["--port", "0", "--queue_db", os.path.join(self.tmp.name, "jobs.db"),
+                                     "--token", "secret"])
+        server = self.service.create_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}"
+        self.headers = {"Authorization": "Bearer secret"}
+
+    def test_submit_and_get_job(self):
+        response = requests.post(f"{self.url}/jobs", json={"args": ["-t", "nginx"]}, headers=self.headers, timeout=5)
+        self.assertEqual(201, response.status_code)
+        job = requests.get(f"{self.url}{response.json()['url']}", headers=self.headers, timeout=5).json()
+        self.assertEqual((QUEUED, ["-t", "nginx"]), (job["status"], job["args"]))
+        jobs = requests.get(f"{self.url}/jobs?status=queued", headers=self.headers, timeout=5).json()
+        self.assertEqual([job["id"]], [j["id"] for j in jobs])
+
+    def test_invalid_requests(self):
+        self.assertEqual(401, requests.get(f"{self.url}/health", timeout=5).status_code)
+        self.assertEqual(400, requests.post(f"{self.url}/jobs", json={"args": "-t nginx"},
+                                            headers=self.headers, timeout=5).status_code)
+        self.assertEqual(404, requests.get(f"{self.url}/jobs/99", headers=self.headers, timeout=5).status_code)
+        self.assertEqual(401, requests.get(f"{self.url}/health", headers={"Authorization": "Bearer secreT"},
+                                           timeout=5).status_code)
+
+    def test_jobs_cant_set_host_paths(self):
+        for args in (["-t", "nginx", "--write_baseline", "/etc/x"], ["-t", "nginx", "--zip_output_folder=/srv"],
+                     ["-t", "nginx", "--dd_url", "https://attacker"], ["-t", "nginx", "--resume", "run"],
+                     ["-t", "nginx", "--incremental_ref=--output=/tmp/x"]):
+            with self.subTest(args=args):
+                response = requests.post(f"{self.url}/jobs", json={"args": args}, headers=self.headers, timeout=5)
+                self.assertEqual(400, response.status_code)
+        # Abbreviations of the forbidden options aren't accepted either
+        job_id = self.service.queue.submit(["-t", "nginx", "--write_base", "/etc/x"])
+        self.service.run_job(*self.service.queue.claim(timeout=0))
+        self.assertEqual(2, self.service.queue.get(job_id)["exit_code"])
+
+    def test_jobs_only_scan_allowed_directories(self):
+        app = JobCosca(["-t", "nginx", "--sbom_cache_max_size", "0"], [self.tmp.name], check_docker=False)
+        self.assertTrue(app.is_allowed_target(os.path.join(self.tmp.name, "src"), TargetType.DIRECTORY))
+        self.assertFalse(app.is_allowed_target("/root", TargetType.DIRECTORY))
+        self.assertFalse(app.is_allowed_target(f"{self.tmp.name}_other", TargetType.DIRECTORY))
+        self.assertTrue(app.is_allowed_target("nginx", TargetType.DOCKER))
+        # Paths of the host are checked whatever the type of the target
+        self.assertFalse(app.is_allowed_target("/etc", TargetType.GITHUB))
+        self.assertTrue(app.is_allowed_target(self.tmp.name, TargetType.GITHUB))
+
+    def test_tcp_requires_a_token(self):
+        service = CoscaService(["--port", "0", "--queue_db", os.path.join(self.tmp.name, "jobs.db"), "--token", ""])
+        with self.assertRaises(SystemExit):
+            service.create_server()
+        service = CoscaService(["--socket", os.path.join(self.tmp.name, "cosca.sock"),
+                                "--queue_db", os.path.join(self.tmp.name, "jobs.db"), "--token", ""])
+        server = service.create_server()
+        self.addCleanup(server.server_close)
+        self.assertEqual(0o600, os.stat(service.args.socket).st_mode & 0o777)
+
+    def test_invalid_job_arguments_fail_the_job(self):
+        job_id = self.service.queue.submit(["--jobs", "many", "-t", "nginx"])
+        self.service.run_job(*self.service.queue.claim(timeout=0))
+        job = self.service.queue.get(job_id)
+        self.assertEqual((FAILED, 2), (job["status"], job["exit_code"]))
+        self.assertIn("--jobs", job["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
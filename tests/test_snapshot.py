@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from common.fingerprint import hash_tree
+from common.snapshot import SnapshotStore
+from common.target_type import TargetType
+
+# python -m unittest discover -s tests
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.run_dir = os.path.join(self.tmp.name, "run")
+        self.target = self.make_target("target")
+
+    def make_target(self, name):
+        target = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.join(target, "src"))
+        with open(os.path.join(target, "src", "a.py"), 'w', encoding='utf-8') as f:
+            f.write("print('a')\n")
+        os.chmod(os.path.join(target, "src", "a.py"), 0o755)
+        os.symlink("src/a.py", os.path.join(target, "a.py"))
+        os.symlink("src", os.path.join(target, "lib"))
+        return target
+
+    def test_snapshot_hash_is_the_fingerprint(self):
+        store = SnapshotStore("link")
+        path = store.take(self.target, self.run_dir)
+        self.assertEqual(hash_tree(self.target), hash_tree(path))
+        self.assertEqual(f"tree:{hash_tree(self.target)}", store.fingerprints.get(self.target, TargetType.DIRECTORY))
+        self.assertEqual("src/a.py", os.readlink(os.path.join(path, "a.py")))
+        self.assertEqual("src", os.readlink(os.path.join(path, "lib")))
+
+    def test_link_and_copy_modes(self):
+        source = os.stat(os.path.join(self.target, "src", "a.py"))
+        for mode, linked in (("link", True), ("copy", False)):
+            with self.subTest(mode=mode):
+                path = SnapshotStore(mode).take(self.target, os.path.join(self.run_dir, mode))
+                snapshot = os.stat(os.path.join(path, "src", "a.py"))
+                self.assertEqual(linked, os.path.samestat(source, snapshot))
+                self.assertEqual(0o755, snapshot.st_mode & 0o777)
+
+    def test_targets_with_the_same_content_share_a_snapshot(self):
+        store = SnapshotStore("copy")
+        other = self.make_target("other")
+        self.assertEqual(store.take(self.target, self.run_dir), store.take(other, self.run_dir))
+        self.assertEqual(1, len(os.listdir(os.path.join(self.run_dir, "snapshots"))))
+
+    def test_unreadable_files_are_left_out(self):
+        store = SnapshotStore("copy")
+        with patch("common.snapshot.copy_file", side_effect=PermissionError("denied")):
+            path = store.take(self.target, self.run_dir)
+        self.assertTrue(os.path.islink(os.path.join(path, "a.py")))
+        self.assertFalse(os.path.exists(os.path.join(path, "src", "a.py")))
+        # Not the content of the target, so not its fingerprint
+        self.assertEqual(f"tree:{hash_tree(self.target)}", store.fingerprints.get(self.target, TargetType.DIRECTORY))
+        store.remove_all()
+        self.assertFalse(os.path.exists(path))
+
+    def test_none_scans_the_target_in_place(self):
+        store = SnapshotStore()
+        self.assertEqual(self.target, store.take(self.target, self.run_dir))
+        self.assertFalse(os.path.exists(self.run_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import argparse
+import tempfile
+import unittest
+from unittest.mock import patch
+from common import results_db
+from common.findings import Finding, HIGH, CRITICAL
+from output_handlers.sqlite import CustomOutputHandler
+
+# python -m unittest discover -s tests
+
+class TestSqliteOutputHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "results.db")
+
+    def make_handler(self):
+        with patch("sys.argv", ["cosca.py", "--sqlite_db", self.db_path]):
+            handler = CustomOutputHandler("sqlite", argparse.ArgumentParser())
+        self.addCleanup(handler.conn.close)
+        return handler
+
+    def scan(self, handler, run_name, findings, target="img"):
+        report = os.path.join(handler.tmp_dir, run_name, "abc", "trivy", "report.json")
+        handler.process_findings(findings, target, "trivy")
+        return handler.process_files(report, target, "trivy", {})
+
+    def test_findings_are_stored(self):
+        handler = self.make_handler()
+        self.scan(handler, "cosca_1", [Finding("trivy", "CVE-1", HIGH, location="a@1"),
+                                       Finding("trivy", "CVE-2", CRITICAL, location="b@1")])
+        self.scan(handler, "cosca_1", [], target="img2")
+        handler.finalize()
+        conn = results_db.connect(self.db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual([(1,)], conn.execute("SELECT COUNT(*) FROM runs WHERE finished_at IS NOT NULL").fetchall())
+        self.assertEqual([(2,)], conn.execute("SELECT COUNT(*) FROM scans").fetchall())
+        self.assertEqual([("CVE-1", HIGH), ("CVE-2", CRITICAL)],
+                         conn.execute("SELECT rule_id, severity FROM findings ORDER BY rule_id").fetchall())
+        weekly = {target: counts for (target, _), counts in results_db.get_weekly_findings(conn).items()}
+        self.assertEqual({"img": [0, 0, 0, 1, 1, 0], "img2": [0, 0, 0, 0, 0, 0]}, weekly)
+
+    def test_resumed_run_keeps_its_scans(self):
+        findings = [Finding("trivy", "CVE-1", HIGH, location="a@1")]
+        first = self.scan(self.make_handler(), "cosca_1", findings)
+        # The resumed run replays the completed scan with a new handler
+        resumed = self.make_handler()
+        self.assertEqual(first, self.scan(resumed, "cosca_1", findings))
+        self.scan(resumed, "cosca_1", [], target="img2")
+        conn = results_db.connect(self.db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual([(1, 2, 1)], conn.execute(
+            "SELECT (SELECT COUNT(*) FROM runs), (SELECT COUNT(*) FROM scans), (SELECT COUNT(*) FROM findings)"
+        ).fetchall())
+
+    def test_time_to_fix(self):
+        conn = results_db.connect(self.db_path)
+        self.addCleanup(conn.close)
+        conn.execute("INSERT INTO runs (id, name, started_at) VALUES (1, 'r', '2026-01-01')")
+        for scan_id, day in ((1, "2026-01-01"), (2, "2026-01-03"), (3, "2026-01-08")):
+            conn.execute("INSERT INTO scans (id, run_id, target, scanner, scanned_at) VALUES (?, 1, 'img', 'trivy', ?)",
+                         (scan_id, f"{day} 00:00:00"))
+        # fixed in the third scan, and still open
+        conn.executemany("INSERT INTO findings (scan_id, fingerprint, rule_id, severity) VALUES (?, ?, ?, ?)",
+                         [(1, "fixed", "CVE-1", HIGH), (2, "fixed", "CVE-1", HIGH), (3, "open", "CVE-2", HIGH)])
+        self.assertEqual([(HIGH, 1, 1, 7.0, 7.0)], results_db.get_time_to_fix(conn))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from common.target_source import iter_targets, parse_line
+from common.target_type import TargetType
+
+# python -m unittest discover -s tests
+
+class TestTargetSource(unittest.TestCase):
+
+    def test_parse_plain_and_json_lines(self):
+        self.assertIsNone(parse_line("   \n"))
+        self.assertIsNone(parse_line("# comment"))
+        self.assertEqual("nginx:latest", parse_line("nginx:latest\n").target)
+        spec = parse_line('{"target": "https://x.example.com", "combo": "full", "type": "web"}')
+        self.assertEqual(("https://x.example.com", "full", TargetType.WEB),
+                         (spec.target, spec.combo, spec.target_type))
+
+    def test_invalid_line_reports_its_position(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "targets.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('a\n{"target": "b", "type": "nope"}\n')
+            with self.assertRaisesRegex(ValueError, "targets.txt:2"):
+                list(iter_targets(targets_file=path))
+
+    def test_invalid_lines_can_be_skipped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "targets.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('a\n{"target": "b", "type": "nope"}\n{"target"\n{"combo": "full"}\nd\n')
+            errors = []
+            targets = [s.target for s in iter_targets(targets_file=path, on_error=errors.append)]
+        self.assertEqual(["a", "d"], targets)
+        self.assertEqual(["targets.txt:2", "targets.txt:3", "targets.txt:4"],
+                         [os.path.basename(e.split(": ")[0]) for e in errors])
+
+    def test_stdin_is_read_lazily(self):
+        stdin = io.StringIO("first\nsecond\n")
+        with patch('sys.stdin', stdin):
+            targets = iter_targets(["cli"], "-")
+            self.assertEqual("cli", next(targets).target)
+            self.assertEqual("first", next(targets).target)
+            self.assertEqual("second\n", stdin.readline())
+
+if __name__ == '__main__':
+    unittest.main()
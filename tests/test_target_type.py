@@ -1,9 +1,15 @@
+import os
+import time
+import tempfile
 import unittest
 from unittest.mock import patch, Mock
-from common.target_type import TargetType
+from common.target_type import TargetType, TargetTypeCache
 
 # python -m unittest discover -s tests
 
+def response(status_code, text):
+    return Mock(status_code=status_code, iter_content=Mock(return_value=[text.encode('utf-8')]))
+
 class TestTargetType(unittest.TestCase):
 
     @patch('os.path.exists')
@@ -15,23 +21,28 @@ class TestTargetType(unittest.TestCase):
     @patch('requests.get')
     def test_github(self, mock_get, mock_url):
         mock_url.return_value = True
-        mock_get.return_value = Mock(status_code=200, text='')
+        mock_get.return_value = response(200, '')
         with patch('urllib.parse.urlparse', return_value=Mock(netloc='github.com')):
             self.assertEqual(TargetType.GITHUB, TargetType.get_target_type('https://github.com/some/repo'))
 
     @patch('validators.url')
+    @patch('requests.post')
     @patch('requests.get')
-    def test_openapi(self, mock_get, mock_url):
+    def test_openapi(self, mock_get, mock_post, mock_url):
         mock_url.return_value = True
-        mock_get.return_value = Mock(status_code=200, text='"openapi"')
+        mock_get.return_value = response(200, '"openapi"')
+        mock_post.return_value = response(404, '')
         self.assertEqual(TargetType.OPENAPI, TargetType.get_target_type('https://petstore.swagger.io'))
 
     #TODO review
     @patch('validators.url')
+    @patch('requests.post')
     @patch('requests.get')
-    def test_soap(self, mock_get, mock_url):
+    def test_soap(self, mock_get, mock_post, mock_url):
         mock_url.return_value = True
-        mock_get.return_value = Mock(status_code=200, text='<soapenv:Envelope>')
+        mock_get.side_effect = lambda url, **kwargs: response(
+            200, '<wsdl:definitions>' if url.endswith('?wsdl') else '<soapenv:Envelope>')
+        mock_post.return_value = response(500, '<soapenv:Envelope>')
         self.assertEqual(TargetType.SOAP, TargetType.get_target_type('https://www.dataaccess.com/webservicesserver/NumberConversion.wso'))
 
     @patch('validators.url')
@@ -39,17 +50,68 @@ class TestTargetType(unittest.TestCase):
     @patch('requests.get')
     def test_graphql(self, mock_get, mock_post, mock_url):
         mock_url.return_value = True
-        mock_get.return_value = Mock(status_code=200, text='')
-        mock_post.return_value = Mock(status_code=200, text='{"data": {"__schema": {}}}')
+        mock_get.return_value = response(200, '')
+        mock_post.return_value = response(200, '{"data": {"__schema": {}}}')
         self.assertEqual(TargetType.GRAPHQL, TargetType.get_target_type('https://graphqlzero.almansi.me/api'))
 
     @patch('validators.url')
+    @patch('requests.post')
     @patch('requests.get')
-    def test_web(self, mock_get, mock_url):
+    def test_web(self, mock_get, mock_post, mock_url):
         mock_url.return_value = True
-        mock_get.return_value = Mock(status_code=200, text='httpbin')
+        mock_get.return_value = response(200, 'httpbin')
+        mock_post.return_value = response(405, '')
         self.assertEqual(TargetType.WEB, TargetType.get_target_type('https://httpbin.org'))
 
+    @patch('validators.url')
+    @patch('requests.post')
+    @patch('requests.get')
+    def test_body_read_is_capped(self, mock_get, mock_post, mock_url):
+        mock_url.return_value = True
+        chunks = iter([b'x' * 1024 * 1024, b'"openapi"'])
+        big = Mock(status_code=200, iter_content=Mock(return_value=chunks))
+        mock_get.side_effect = lambda url, **kwargs: response(404, '') if url.endswith('?wsdl') else big
+        mock_post.return_value = response(405, '')
+        self.assertEqual(TargetType.WEB, TargetType.get_target_type('https://big.example.com'))
+        self.assertEqual(b'"openapi"', next(chunks))
+
+    @patch('requests.post')
+    @patch('requests.get')
+    def test_cached_type_skips_probes(self, mock_get, mock_post):
+        cache = TargetTypeCache('/nonexistent/target_types.json', ttl=60)
+        cache.entries['https://api.example.com'] = ['graphql', time.time()]
+        self.assertEqual(TargetType.GRAPHQL, TargetType.get_target_type('https://api.example.com', cache))
+        mock_get.assert_not_called()
+        mock_post.assert_not_called()
+
+    def test_cache_is_saved_in_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "target_types.json")
+            cache = TargetTypeCache(path, ttl=60)
+            cache.set('https://a.example.com', TargetType.WEB)
+            self.assertFalse(os.path.exists(path))
+            # Written by another run in the meantime
+            other = TargetTypeCache(path, ttl=60)
+            other.set('https://b.example.com', TargetType.SOAP)
+            other.save()
+            cache.save()
+            self.assertEqual(TargetType.SOAP, TargetTypeCache(path, ttl=60).get('https://b.example.com'))
+            self.assertEqual(TargetType.WEB, TargetTypeCache(path, ttl=60).get('https://a.example.com'))
+            self.assertEqual(["target_types.json"], os.listdir(tmp))
+
+    def test_explicit_type(self):
+        self.assertEqual(('https://x.example.com/api', TargetType.OPENAPI),
+                         TargetType.parse_target('openapi=https://x.example.com/api'))
+        self.assertEqual(('nginx:latest', TargetType.DOCKER), TargetType.parse_target('docker=nginx:latest'))
+        self.assertEqual(('https://x.example.com', None), TargetType.parse_target('https://x.example.com'))
+
+    def test_image_tags_are_not_types(self):
+        self.assertEqual(('docker:dind', None), TargetType.parse_target('docker:dind'))
+        self.assertEqual(('docker:24.0', None), TargetType.parse_target('docker:24.0'))
+        self.assertEqual(('web:latest', None), TargetType.parse_target('web:latest'))
+        self.assertEqual(TargetType.DOCKER, TargetType.get_target_type('docker:dind'))
+        self.assertEqual(TargetType.DOCKER, TargetType.get_target_type('web:latest'))
+
     def test_valid_image_names(self):
         valid_names = [
             "myrepo/myimage:latest",
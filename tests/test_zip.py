@@ -0,0 +1,56 @@
+import os
+import shutil
+import argparse
+import tempfile
+import zipfile
+import unittest
+from unittest.mock import patch
+from output_handlers.zip import CustomOutputHandler
+
+# python -m unittest discover -s tests
+
+class TestZipOutputHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.run_dir = tempfile.mkdtemp(prefix="cosca_")
+        self.addCleanup(shutil.rmtree, self.run_dir)
+
+    def make_handler(self, *args):
+        with patch("sys.argv", ["cosca.py", "--zip_output_folder", self.tmp.name, *args]):
+            return CustomOutputHandler("zip", argparse.ArgumentParser())
+
+    def make_report(self, scanner):
+        scanner_dir = os.path.join(self.run_dir, "abc", scanner)
+        os.makedirs(scanner_dir)
+        report_path = os.path.join(scanner_dir, "report.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("{}" * 100)
+        with open(os.path.join(scanner_dir, f"{scanner}_stdout.log"), 'w', encoding='utf-8') as f:
+            f.write("log\n")
+        return report_path
+
+    def test_files_are_added_once(self):
+        handler = self.make_handler()
+        report = self.make_report("kics")
+        result = handler.process_files(report, "target", "kics", {})
+        handler.process_files(report, "target", "kics", {})
+        handler.process_files(self.make_report("semgrep"), "target", "semgrep", {})
+        handler.finalize()
+        with zipfile.ZipFile(result["zip"][0]["zip_file"]) as zipf:
+            names = zipf.namelist()
+            self.assertEqual(4, len(names))
+            self.assertIn(os.path.join("abc", "kics", "report.json"), names)
+            self.assertEqual(zipfile.ZIP_DEFLATED, zipf.getinfo(names[0]).compress_type)
+
+    def test_compression(self):
+        handler = self.make_handler("--zip_compression", "lzma")
+        result = handler.process_files(self.make_report("kics"), "target", "kics", {})
+        handler.finalize()
+        with zipfile.ZipFile(result["zip"][0]["zip_file"]) as zipf:
+            self.assertEqual(zipfile.ZIP_LZMA, zipf.infolist()[0].compress_type)
+
+
+if __name__ == '__main__':
+    unittest.main()